@@ -0,0 +1,65 @@
+"""
+Reading and aggregating jsonl check results, with and without NumPy.
+
+$ python -m benchmarks.bench_aggregate --rows 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from piprot.utils.aggregate import aggregate, numpy, read_results
+
+
+STATUSES = ("up_to_date", "rotten", "rotten", "no_delay_info", "cannot_fetch")
+
+
+def write_results(path: str, rows: int, packages: int, services: int) -> None:
+    rng = random.Random(0)
+    with open(path, "w") as results:
+        for _ in range(rows):
+            status = rng.choice(STATUSES)
+            record = {
+                "package": f"package-{rng.randrange(packages)}",
+                "status": status,
+                "libyears": None if status == "cannot_fetch" else round(rng.random() * 5, 2),
+                "source": f"service-{rng.randrange(services)}/requirements.txt",
+            }
+            results.write(json.dumps(record) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--packages", type=int, default=5_000)
+    parser.add_argument("--services", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for run in range(args.runs):
+            path = os.path.join(directory, f"run-{run}.jsonl")
+            write_results(path, args.rows // args.runs, args.packages, args.services)
+            paths.append(path)
+
+        started = time.perf_counter()
+        columns = read_results(paths)
+        elapsed = time.perf_counter() - started
+        print(f"read       {len(columns):>8} rows  {elapsed:>8.2f}s")
+
+        for use_numpy in (True, False):
+            if use_numpy and numpy is None:
+                continue
+            started = time.perf_counter()
+            aggregate(columns, use_numpy=use_numpy)
+            elapsed = time.perf_counter() - started
+            label = "numpy" if use_numpy else "python"
+            print(f"{label:<10} {len(columns):>8} rows  {elapsed:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
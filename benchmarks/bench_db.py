@@ -0,0 +1,88 @@
+"""
+Import speed and lookup throughput of the offline release database.
+
+$ python -m benchmarks.bench_db --projects 50000 --lookups 200000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from piprot.models import ReleaseIndex
+from piprot.testing import FIRST_RELEASE_DATE, release_versions
+from piprot.utils.pypi import PypiPackageInfoDownloader
+from piprot.utils.release_db import DatabaseBackend, ReleaseDatabase
+from typing import List
+
+
+def write_dump(path: str, projects: int, releases: int) -> None:
+    versions = release_versions(releases)
+    first_release = FIRST_RELEASE_DATE.toordinal()
+    with open(path, "w") as dump:
+        for number in range(projects):
+            index = ReleaseIndex(
+                f"Package_{number}",
+                None,
+                {version: first_release + 7 * week for week, version in enumerate(versions)},
+            )
+            dump.write(json.dumps(index.to_dict()) + "\n")
+
+
+def bench_get_many(
+    database: ReleaseDatabase, names: List[str], batch: int, resolve: bool = False
+) -> float:
+    started = time.perf_counter()
+    for start in range(0, len(names), batch):
+        indexes = database.get_many(names[start : start + batch])
+        if resolve:
+            # what a check needs: the latest version and its release date
+            for index in indexes.values():
+                index.release_date(index.latest_version())
+    return len(names) / (time.perf_counter() - started)
+
+
+async def bench_downloader(database: ReleaseDatabase, names: List[str], batch: int) -> float:
+    started = time.perf_counter()
+    for start in range(0, len(names), batch):
+        # a fresh downloader per batch, so lookups aren't answered from its memo
+        async with PypiPackageInfoDownloader(backend=DatabaseBackend(database)) as downloader:
+            await asyncio.gather(*map(downloader.project_info, names[start : start + batch]))
+    return len(names) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--projects", type=int, default=50_000)
+    parser.add_argument("--releases", type=int, default=30)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        dump_path = os.path.join(directory, "dump.jsonl")
+        write_dump(dump_path, args.projects, args.releases)
+        database = ReleaseDatabase(os.path.join(directory, "releases.sqlite3"))
+
+        started = time.perf_counter()
+        with open(dump_path) as dump:
+            imported = database.import_lines(dump)
+        import_time = time.perf_counter() - started
+        print(f"import      {imported:>8} projects  {imported / import_time:>12,.0f} projects/s")
+
+        rng = random.Random(0)
+        names = [f"package-{rng.randrange(args.projects)}" for _ in range(args.lookups)]
+        rate = bench_get_many(database, names, args.batch)
+        print(f"get_many    {len(names):>8} lookups   {rate:>12,.0f} lookups/s")
+        rate = bench_get_many(database, names, args.batch, resolve=True)
+        print(f"+ resolve   {len(names):>8} lookups   {rate:>12,.0f} lookups/s")
+        rate = asyncio.run(bench_downloader(database, names, args.batch))
+        print(f"downloader  {len(names):>8} lookups   {rate:>12,.0f} lookups/s")
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Decode time and peak memory of turning a big PyPI project document into what
+piprot keeps around, compared to decoding the whole document.
+
+$ python -m benchmarks.bench_decode --releases 3000
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from piprot.testing import project_document
+from piprot.utils.metadata import JSON_DECODERS, index_from_json_api
+from typing import Any, Callable, List
+
+
+def measure(name: str, function: Callable[[], Any], repeat: int) -> None:
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    result = function()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    print(
+        f"  {name:<28} {min(timings) * 1000:8.1f} ms"
+        f"  peak {peak / 2 ** 20:7.1f} MiB  retained {retained / 2 ** 20:7.2f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--releases", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    document = project_document("project", args.releases, files_per_release=6)
+    document["info"]["description"] = "x" * 50_000
+    body = json.dumps(document).encode()
+    print(f"{args.releases} releases, {len(body) / 2 ** 20:.1f} MiB document")
+
+    measure("before: full json.loads", lambda: json.loads(body), args.repeat)
+    for name, decoder in sorted(JSON_DECODERS.items()):
+        measure(
+            f"after: {name} -> ReleaseIndex",
+            lambda: index_from_json_api(decoder(body)),
+            args.repeat,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+End-to-end throughput of piprot against an in-process PyPI stand-in, no network needed.
+
+$ python -m benchmarks.bench_fetch --sizes 10 100 1000 10000 --latency 0.02
+$ python -m benchmarks.bench_fetch --sizes 10000 --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from piprot.models import CheckResult
+from piprot.piprot import Piprot
+from piprot.testing import PypiStandIn, StandInConfig, release_versions
+from piprot.utils.indexes import PackageIndex
+from piprot.utils.pypi import PypiPackageInfoDownloader
+from piprot.utils.scheduler import FetchScheduler
+from piprot.utils.writers import ResultWriter
+from typing import Any, Dict, Optional
+
+
+class TimingWriter(ResultWriter):
+    def __init__(self) -> None:
+        super().__init__()
+        self.started = time.perf_counter()
+        self.first_result: Optional[float] = None
+        self.results = 0
+
+    def write(self, result: CheckResult) -> None:
+        if self.first_result is None:
+            self.first_result = time.perf_counter() - self.started
+        self.results += 1
+
+
+def write_requirements(directory: str, packages: int, releases: int) -> str:
+    versions = release_versions(releases)
+    path = os.path.join(directory, f"requirements-{packages}.txt")
+    with open(path, "w") as file:
+        for number in range(packages):
+            file.write(f"package-{number}=={versions[number % len(versions)]}\n")
+    return path
+
+
+async def run_scenario(
+    packages: int, config: StandInConfig, concurrency: int, workers: int
+) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as directory:
+        requirements_file = write_requirements(directory, packages, config.releases)
+        async with PypiStandIn(config) as stand_in:
+            with stand_in.patch():
+                writer = TimingWriter()
+                pypi = PypiPackageInfoDownloader(
+                    scheduler=FetchScheduler(concurrency=concurrency, backoff_base=0.05),
+                    # worker processes don't see the patched class attribute
+                    indexes=[PackageIndex(stand_in.pypi_url)] if workers > 1 else None,
+                )
+                piprot = Piprot([requirements_file], pypi=pypi, writer=writer, workers=workers)
+                await piprot._main()
+                wall_time = time.perf_counter() - writer.started
+
+    requests = sum(stand_in.requests.values())
+    return {
+        "packages": packages,
+        "workers": workers,
+        "results": writer.results,
+        "wall_time_s": round(wall_time, 3),
+        "requests": requests,
+        "requests_per_s": round(requests / wall_time, 1),
+        "time_to_first_result_s": round(writer.first_result or 0, 4),
+        "peak_rss_mib": round(peak_rss_mib(), 1),
+        "retries": sum(pypi.scheduler.stats.retries.values()),
+        "failures": sum(pypi.scheduler.stats.failures.values()),
+    }
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def scenario(arguments) -> Dict[str, Any]:
+    packages, config, concurrency, workers = arguments
+    return asyncio.run(run_scenario(packages, config, concurrency, workers))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--releases", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = parser.parse_args()
+
+    config = StandInConfig(
+        releases=args.releases,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+    )
+    # every scenario runs in a fresh process, so peak RSS isn't carried over
+    context = multiprocessing.get_context("spawn")
+    for packages in args.sizes:
+        for workers in args.workers:
+            # not a multiprocessing pool, its processes can't start workers of their own
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                arguments = (packages, config, args.concurrency, workers)
+                result = executor.submit(scenario, arguments).result()
+            print_result(result, args.json)
+
+
+def print_result(result: Dict[str, Any], as_json: bool) -> None:
+    if as_json:
+        print(json.dumps(result))
+    else:
+        print(
+            f"{result['packages']:>6} packages  {result['workers']:>2} workers  "
+            f"{result['wall_time_s']:8.3f} s  "
+            f"{result['requests']:>6} requests  {result['requests_per_s']:>8} req/s  "
+            f"first result {result['time_to_first_result_s']:.4f} s  "
+            f"peak RSS {result['peak_rss_mib']} MiB  "
+            f"retries {result['retries']}  failures {result['failures']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
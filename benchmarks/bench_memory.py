@@ -0,0 +1,96 @@
+"""
+Peak RSS of a run over many requirements, resolved from an offline release database so only
+piprot's own memory is measured.
+
+$ python -m benchmarks.bench_memory --requirements 1000000
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from piprot.piprot import Piprot
+from piprot.testing import release_versions
+from piprot.utils.pypi import PypiPackageInfoDownloader
+from piprot.utils.release_db import DatabaseBackend, ReleaseDatabase
+from piprot.utils.writers import JsonLinesWriter, SummaryWriter
+from typing import Any, Dict, List
+
+from benchmarks.bench_db import write_dump
+from benchmarks.bench_fetch import peak_rss_mib
+
+
+class NullStream(io.TextIOBase):
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+def write_requirements(
+    directory: str, requirements: int, files: int, packages: int, releases: int
+) -> List[str]:
+    versions = release_versions(releases)
+    paths = []
+    per_file = requirements // files
+    for file_number in range(files):
+        path = os.path.join(directory, f"service-{file_number}", "requirements.txt")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w") as file:
+            for line in range(per_file):
+                number = file_number * per_file + line
+                package = (number * 7919) % packages
+                file.write(f"package-{package}=={versions[number % len(versions)]}\n")
+        paths.append(path)
+    return paths
+
+
+def run(arguments) -> Dict[str, Any]:
+    requirements, files, packages, releases = arguments
+    with tempfile.TemporaryDirectory() as directory:
+        dump_path = os.path.join(directory, "dump.jsonl")
+        write_dump(dump_path, packages, releases)
+        database = ReleaseDatabase(os.path.join(directory, "releases.sqlite3"))
+        with open(dump_path) as dump:
+            database.import_lines(dump)
+        paths = write_requirements(directory, requirements, files, packages, releases)
+
+        baseline = peak_rss_mib()
+        started = time.perf_counter()
+        writer = SummaryWriter(JsonLinesWriter(NullStream()))
+        pypi = PypiPackageInfoDownloader(backend=DatabaseBackend(database))
+        asyncio.run(Piprot(paths, pypi=pypi, writer=writer)._main())
+        wall_time = time.perf_counter() - started
+        database.close()
+
+    return {
+        "requirements": requirements,
+        "wall_time_s": round(wall_time, 2),
+        "baseline_rss_mib": round(baseline, 1),
+        "peak_rss_mib": round(peak_rss_mib(), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requirements", type=int, default=1_000_000)
+    parser.add_argument("--files", type=int, default=1_000)
+    parser.add_argument("--packages", type=int, default=5_000)
+    parser.add_argument("--releases", type=int, default=30)
+    args = parser.parse_args()
+
+    # a fresh process, so the peak isn't carried over from anything else
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+        arguments = (args.requirements, args.files, args.packages, args.releases)
+        result = executor.submit(run, arguments).result()
+    print(
+        f"{result['requirements']:>8} requirements  {result['wall_time_s']:8.2f} s  "
+        f"peak RSS {result['peak_rss_mib']} MiB (from {result['baseline_rss_mib']} MiB)"
+    )
+
+
+if __name__ == "__main__":
+    main()
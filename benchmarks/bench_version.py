@@ -0,0 +1,92 @@
+"""
+Micro-benchmarks for picking the latest release out of a big release list,
+the way PypiPackageInfoDownloader does it for projects like boto3.
+
+$ python -m benchmarks.bench_version
+"""
+
+import argparse
+import re
+import timeit
+
+from piprot.models import PiprotVersion
+from typing import List
+
+
+class LegacyPiprotVersion:
+    # the comparison path PiprotVersion used to have, kept only as a baseline
+    PRERELEASE_REGEX = re.compile(r"(a|b|c|rc|alpha|beta|pre|preview|dev|svn|git)")
+
+    def __init__(self, version: str) -> None:
+        self.version = version
+        self.parts = [
+            int(re.sub(r"\D", "", part) or 0)
+            for part in version.strip().replace("-", ".").split(".")
+        ]
+
+    def __cmp__(self, to_compare: "LegacyPiprotVersion") -> int:
+        if self.version == to_compare.version:
+            return 0
+        our_parts, parts_to_compare = self.parts, to_compare.parts
+        while len(our_parts) > len(parts_to_compare):
+            parts_to_compare.append(0)
+        while len(parts_to_compare) > len(our_parts):
+            our_parts.append(0)
+        if self.is_prerelease():
+            return 1
+        if to_compare.is_prerelease():
+            return -1
+        for us, them in zip(self.parts, to_compare.parts):
+            if us != them:
+                return us - them
+        return 0
+
+    def __lt__(self, other: "LegacyPiprotVersion") -> bool:
+        return self.__cmp__(other) < 0
+
+    def __gt__(self, other: "LegacyPiprotVersion") -> bool:
+        return self.__cmp__(other) > 0
+
+    def is_prerelease(self) -> bool:
+        return bool(self.PRERELEASE_REGEX.search(self.version))
+
+
+def releases(count: int) -> List[str]:
+    return [f"1.{minor}.{patch}" for minor in range(count // 100 + 1) for patch in range(100)][
+        :count
+    ]
+
+
+def latest(version_class, keys: List[str]):
+    versions = [version_class(key) for key in keys]
+    stable = [version for version in versions if not version.is_prerelease()]
+    return max(stable or versions)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--releases", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    keys = releases(args.releases)
+
+    def cold() -> None:
+        PiprotVersion._interned.clear()
+        latest(PiprotVersion, keys)
+
+    timings = {
+        "legacy": lambda: latest(LegacyPiprotVersion, keys),
+        "cold (parse + max)": cold,
+        "warm (interned)": lambda: latest(PiprotVersion, keys),
+    }
+    baseline = None
+    print(f"max() over {len(keys)} releases, best of {args.repeat} runs")
+    for name, function in timings.items():
+        best = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"  {name:<20} {best * 1000:8.2f} ms  {baseline / best:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
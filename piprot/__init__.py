@@ -0,0 +1,14 @@
+from piprot.models import CheckResult, Requirement, Status
+from piprot.piprot import Piprot, check, iter_check
+from piprot.utils.pypi import PypiPackageInfoDownloader
+
+
+__all__ = [
+    "CheckResult",
+    "Piprot",
+    "PypiPackageInfoDownloader",
+    "Requirement",
+    "Status",
+    "check",
+    "iter_check",
+]
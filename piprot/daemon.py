@@ -0,0 +1,143 @@
+import asyncio
+import http.client
+import json
+import logging
+
+from dataclasses import asdict
+from itertools import islice
+from piprot.models import Requirement
+from piprot.piprot import iter_check
+from piprot.utils.pypi import PypiPackageInfoDownloader
+from piprot.utils.result_table import ResultTable
+from typing import Iterable, Iterator, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+CONNECT_TIMEOUT = 0.5
+CHECK_TIMEOUT = 300.0
+# requirements per chunk of a streamed check request
+BATCH_SIZE = 1000
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class PiprotDaemon:
+    # answers checks over localhost HTTP from a downloader that stays open, so every
+    # project is fetched once and then kept warm by refreshing it in the background
+    def __init__(
+        self,
+        downloader: Optional[PypiPackageInfoDownloader] = None,
+        address: str = DEFAULT_ADDRESS,
+        refresh_interval: float = 3600,
+    ) -> None:
+        self.downloader = downloader or PypiPackageInfoDownloader()
+        self.host, self.port = parse_address(address)
+        self.refresh_interval = refresh_interval
+        self._runner = None
+        self._refresh_task: Optional["asyncio.Future[None]"] = None
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    async def __aenter__(self) -> "PiprotDaemon":
+        from aiohttp import web
+
+        await self.downloader.__aenter__()
+        app = web.Application()
+        app.router.add_post("/check", self._check)
+        app.router.add_get("/health", self._health)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        # the real port, in case we were asked for any free one
+        self.port = self._runner.addresses[0][1]
+        self._refresh_task = asyncio.ensure_future(self._refresh_periodically())
+        logger.info(f"Serving piprot checks on {self.address}.")
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._refresh_task.cancel()
+        await self._runner.cleanup()
+        await self.downloader.__aexit__(*exc_info)
+
+    async def serve_forever(self) -> None:
+        async with self:
+            await asyncio.Event().wait()
+
+    async def _check(self, request):
+        from aiohttp import web
+
+        try:
+            body = await request.json()
+            requirements = [Requirement(**requirement) for requirement in body["requirements"]]
+            delay = int(body.get("delay", 5))
+        except (ValueError, KeyError, TypeError):
+            return web.json_response({"error": "invalid request"}, status=400)
+
+        results = [
+            result.to_dict()
+            async for result in iter_check(requirements, delay=delay, downloader=self.downloader)
+        ]
+        return web.json_response({"results": results})
+
+    async def _health(self, request):
+        from aiohttp import web
+
+        return web.json_response({"status": "ok"})
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.downloader.refresh()
+            except Exception as e:
+                logger.warning(f"Couldn't refresh the release data. Error: {e!r}")
+
+
+def check_with_daemon(
+    address: str, requirements: Iterable[Requirement], delay: int
+) -> Optional[ResultTable]:
+    # returns None when there's no daemon to ask, so the caller can check in-process
+    host, port = parse_address(address)
+    connection = http.client.HTTPConnection(host, port, timeout=CONNECT_TIMEOUT)
+    try:
+        connection.connect()
+        # connecting has to be quick, a check on a cold daemon may take a while
+        connection.sock.settimeout(CHECK_TIMEOUT)
+        # a body without a length is sent chunked, requirements go out as they're read
+        body = _request_body(requirements, delay)
+        connection.request("POST", "/check", body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        if response.status != 200:
+            logger.debug(f"piprot daemon on {address} answered with {response.status}.")
+            return None
+        table = ResultTable()
+        for result in json.load(response)["results"]:
+            table.add_dict(result)
+        return table
+    except (OSError, http.client.HTTPException, ValueError, KeyError, TypeError) as e:
+        logger.debug(f"Couldn't check with piprot daemon on {address}. Error: {e!r}")
+        return None
+    finally:
+        connection.close()
+
+
+def _request_body(requirements: Iterable[Requirement], delay: int) -> Iterator[bytes]:
+    yield f'{{"delay": {int(delay)}, "requirements": ['.encode()
+    requirements = iter(requirements)
+    separator = ""
+    while True:
+        batch = [
+            json.dumps(asdict(requirement)) for requirement in islice(requirements, BATCH_SIZE)
+        ]
+        if not batch:
+            break
+        yield (separator + ", ".join(batch)).encode()
+        separator = ", "
+    yield b"]}"
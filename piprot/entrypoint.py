@@ -1,13 +1,59 @@
 import argparse
+import asyncio
+import json
+import logging
 import os
 import sys
 
+from itertools import chain
+from piprot.daemon import DEFAULT_ADDRESS, PiprotDaemon, check_with_daemon
+from piprot.models import Requirement
 from piprot.piprot import Piprot
+from piprot.utils.cache import MetadataCache, default_cache_dir
+from piprot.utils.environment import EnvironmentScanner
+from piprot.utils.indexes import PackageIndex
+from piprot.utils.metadata import DEFAULT_JSON_DECODER, JSON_DECODERS
+from piprot.utils.pypi import DEFAULT_HEDGE_AFTER, PypiPackageInfoDownloader
+from piprot.utils.release_db import DatabaseBackend, ReleaseDatabase
+from piprot.utils.result_store import ResultStore
+from piprot.utils.scanner import DEFAULT_EXCLUDE, DEFAULT_INCLUDE, RequirementsScanner
+from piprot.utils.scheduler import FetchScheduler
+from piprot.utils.tracing import Profiler
+from piprot.utils.writers import WRITERS, SummaryWriter
+from typing import Iterator, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# options that apply the same whether the checks run in-process or in a daemon
+DAEMON_OPTIONS = {
+    "daemon",
+    "daemon_address",
+    "delay",
+    "env",
+    "exclude",
+    "fail_fast",
+    "files",
+    "format",
+    "include",
+    "no_daemon",
+    "scan",
+    "scan_workers",
+}
 
 
 def entrypoint():
+    if sys.argv[1:2] == ["serve"]:
+        return serve(sys.argv[2:])
+    if sys.argv[1:2] == ["db"]:
+        return db(sys.argv[2:])
+    if sys.argv[1:2] == ["report"]:
+        return report(sys.argv[2:])
+
     cli_parser = argparse.ArgumentParser(
-        epilog="Here's hoping your requirements are nice and fresh!"
+        epilog="Here's hoping your requirements are nice and fresh! "
+        "Run 'piprot serve' to start a daemon that keeps release data warm (checks use it with "
+        "--daemon), 'piprot report' to aggregate jsonl results."
     )
 
     cli_parser.add_argument(
@@ -18,20 +64,541 @@ def entrypoint():
         help="Delay before an outdated package triggers an error. (in days, defaults to 5).",
     )
 
-    if os.path.isfile("requirements.txt"):
-        nargs = "*"
-        default = ["requirements.txt"]
-    else:
-        nargs = "+"
-        default = None
+    cli_parser.add_argument(
+        "-f",
+        "--format",
+        choices=sorted(WRITERS),
+        default="text",
+        help="Output format (defaults to text). Results are written as soon as they're ready.",
+    )
+
+    cli_parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop at the first outdated requirement. Requirements that were rotten or slow "
+        "in earlier runs are checked first.",
+    )
+
+    cli_parser.add_argument(
+        "--deadline",
+        metavar="SECONDS",
+        type=float,
+        default=None,
+        help="Report requirements that aren't checked within this many seconds as unchecked.",
+    )
+
+    cli_parser.add_argument(
+        "--workers",
+        metavar="N",
+        type=int,
+        default=1,
+        help="Look packages up in N processes, each with its own connections (defaults to 1). "
+        "Results are written once all are in, in the order requirements were read.",
+    )
+
+    cli_parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=100,
+        help="Maximum number of simultaneous connections to PyPI (defaults to 100).",
+    )
+
+    cli_parser.add_argument(
+        "--max-connections-per-host",
+        type=int,
+        default=20,
+        help="Maximum number of simultaneous connections to a single host (defaults to 20).",
+    )
+
+    cli_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=20,
+        help="Maximum number of PyPI requests in flight (defaults to 20).",
+    )
+
+    cli_parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=None,
+        help="Maximum number of PyPI requests per second (unlimited by default).",
+    )
+
+    cli_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30.0,
+        help="Timeout for a single PyPI request in seconds (defaults to 30).",
+    )
+
+    cli_parser.add_argument(
+        "--total-timeout",
+        type=float,
+        default=None,
+        help="Timeout for all PyPI requests in seconds (unlimited by default).",
+    )
+
+    cli_parser.add_argument(
+        "--retries",
+        type=int,
+        default=3,
+        help="How many times a failed PyPI request is retried (defaults to 3).",
+    )
+
+    cli_parser.add_argument(
+        "--api",
+        choices=["json", "simple"],
+        default="json",
+        help="PyPI API to fetch release data from (defaults to json). "
+        "'simple' uses the PEP 691 JSON simple API with PEP 700 upload times.",
+    )
+
+    cli_parser.add_argument(
+        "--index-url",
+        metavar="URL",
+        action="append",
+        default=None,
+        help="Base URL of a PyPI JSON API compatible index, like https://pypi.org/pypi (can be "
+        "repeated, indexes are asked in the given order; defaults to PyPI).",
+    )
+
+    cli_parser.add_argument(
+        "--hedge-after",
+        type=float,
+        default=DEFAULT_HEDGE_AFTER,
+        help="Seconds an index is given before the next --index-url is asked as well, "
+        "adapted to each index's response times as they come in "
+        f"(defaults to {DEFAULT_HEDGE_AFTER}).",
+    )
+
+    cli_parser.add_argument(
+        "--no-hedge",
+        action="store_true",
+        help="Only ask the next --index-url once the previous ones failed.",
+    )
+
+    cli_parser.add_argument(
+        "--json-decoder",
+        choices=sorted(JSON_DECODERS),
+        default=DEFAULT_JSON_DECODER,
+        help=f"JSON decoder for PyPI responses (defaults to {DEFAULT_JSON_DECODER}).",
+    )
+
+    cli_parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=default_cache_dir(),
+        help="Directory to cache PyPI responses in (defaults to ~/.cache/piprot).",
+    )
+
+    cli_parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=3600,
+        help="Seconds a cached response is used without revalidation (defaults to 3600).",
+    )
+
+    cli_parser.add_argument(
+        "--resolution-ttl",
+        type=int,
+        default=86400,
+        help="Seconds a project that wasn't found, or that redirected elsewhere, is remembered "
+        "as such (defaults to 86400).",
+    )
+
+    cli_parser.add_argument(
+        "--no-changelog",
+        action="store_true",
+        help="Revalidate stale cached responses one by one instead of skipping the ones "
+        "PyPI's changelog reports as unchanged.",
+    )
+
+    cli_parser.add_argument(
+        "--result-ttl",
+        type=int,
+        default=3600,
+        help="Seconds a stored result of an unchanged requirement is reused without asking "
+        "PyPI (defaults to 3600).",
+    )
+
+    cli_parser.add_argument(
+        "--result-max-stale",
+        type=int,
+        default=0,
+        help="Seconds past --result-ttl a stored result is still reported while it's refreshed "
+        "in the background (defaults to 0).",
+    )
+
+    cli_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't read nor write the response cache and the stored results.",
+    )
+
+    cli_parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Only use cached responses, never connect to PyPI.",
+    )
+
+    cli_parser.add_argument(
+        "--release-db",
+        metavar="PATH",
+        type=str,
+        default=None,
+        help="Resolve release data from a database made by 'piprot db import' instead of PyPI.",
+    )
+
+    cli_parser.add_argument(
+        "--scan",
+        metavar="DIR",
+        type=str,
+        default=None,
+        help="Find and check all requirements files in a directory tree.",
+    )
+
+    cli_parser.add_argument(
+        "--include",
+        metavar="PATTERN",
+        action="append",
+        default=None,
+        help="Glob pattern of requirements files to check in --scan mode (can be repeated, "
+        f"defaults to {', '.join(DEFAULT_INCLUDE)}).",
+    )
+
+    cli_parser.add_argument(
+        "--exclude",
+        metavar="PATTERN",
+        action="append",
+        default=None,
+        help="Glob pattern of files and directories to skip in --scan mode (can be repeated, "
+        f"always skips {', '.join(DEFAULT_EXCLUDE)}).",
+    )
+
+    cli_parser.add_argument(
+        "--scan-workers",
+        type=int,
+        default=None,
+        help="Number of threads parsing requirements files in --scan mode and reading "
+        "metadata in --env mode.",
+    )
+
+    cli_parser.add_argument(
+        "--env",
+        metavar="PATH",
+        action="append",
+        default=None,
+        help="Check the distributions installed in a virtualenv, Python install or container "
+        "root filesystem (can be repeated).",
+    )
+
+    cli_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print per-phase timing percentiles and the slowest packages after the run.",
+    )
+
+    cli_parser.add_argument(
+        "--trace-file",
+        type=str,
+        default=None,
+        help="Write a Chrome trace-event JSON of the run, viewable in chrome://tracing.",
+    )
+
+    cli_parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Hand the checks over to a 'piprot serve' daemon, checks run in-process when there's "
+        "none or other settings are given (the default when $PIPROT_DAEMON is set).",
+    )
+
+    cli_parser.add_argument(
+        "--daemon-address",
+        metavar="HOST:PORT",
+        type=str,
+        default=os.environ.get("PIPROT_DAEMON", DEFAULT_ADDRESS),
+        help="Address of the 'piprot serve' daemon "
+        f"(defaults to $PIPROT_DAEMON or {DEFAULT_ADDRESS}).",
+    )
 
     cli_parser.add_argument(
-        "files", nargs=nargs, type=str, default=default, help="requirements file(s)"
+        "--no-daemon", action="store_true", help="Always check in-process, never ask a daemon."
     )
 
+    cli_parser.add_argument("files", nargs="*", type=str, help="requirements file(s)")
+
     cli_args = cli_parser.parse_args()
-    piprot = Piprot(req_files=cli_args.files, delay_in_days=cli_args.delay)
-    sys.exit(piprot.main())
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if not cli_args.files and not cli_args.scan and not cli_args.env:
+        if not os.path.isfile("requirements.txt"):
+            cli_parser.error("the following arguments are required: files")
+        cli_args.files = ["requirements.txt"]
+
+    if cli_args.index_url and cli_args.api != "json":
+        cli_parser.error("--index-url only works with the json API")
+
+    stops_early = cli_args.fail_fast or cli_args.deadline is not None
+    if cli_args.workers > 1 and (stops_early or cli_args.profile or cli_args.trace_file):
+        cli_parser.error(
+            "--workers can't be combined with --fail-fast, --deadline, --profile or --trace-file"
+        )
+
+    if cli_args.no_cache and cli_args.offline:
+        cli_parser.error("--offline requires the cache, it can't be used with --no-cache")
+
+    cache = None
+    result_store = None
+    if not cli_args.no_cache:
+        cache = MetadataCache(
+            cli_args.cache_dir, ttl=cli_args.cache_ttl, resolution_ttl=cli_args.resolution_ttl
+        )
+        result_store = ResultStore(
+            os.path.join(cli_args.cache_dir, "results.sqlite3"),
+            ttl=cli_args.result_ttl,
+            max_stale=cli_args.result_max_stale,
+        )
+
+    profiler = None
+    if cli_args.profile or cli_args.trace_file:
+        profiler = Profiler()
+
+    pypi = PypiPackageInfoDownloader(
+        max_connections=cli_args.max_connections,
+        max_connections_per_host=cli_args.max_connections_per_host,
+        cache=cache,
+        offline=cli_args.offline,
+        api=cli_args.api,
+        json_decoder=JSON_DECODERS[cli_args.json_decoder],
+        profiler=profiler,
+        use_changelog=not cli_args.no_changelog,
+        indexes=[
+            PackageIndex(url, priority=priority)
+            for priority, url in enumerate(cli_args.index_url or [])
+        ],
+        hedge_after=None if cli_args.no_hedge else cli_args.hedge_after,
+        scheduler=FetchScheduler(
+            concurrency=cli_args.concurrency,
+            rate_limit=cli_args.rate_limit,
+            request_timeout=cli_args.timeout,
+            total_timeout=cli_args.total_timeout,
+            max_retries=cli_args.retries,
+        ),
+    )
+    writer = WRITERS[cli_args.format]()
+    if cli_args.scan or cli_args.env:
+        writer = SummaryWriter(writer)
+
+    if cli_args.release_db:
+        if not os.path.isfile(cli_args.release_db):
+            cli_parser.error(f"release database {cli_args.release_db} doesn't exist")
+        pypi.backend = DatabaseBackend(ReleaseDatabase(cli_args.release_db))
+
+    results = None
+    if use_daemon(cli_parser, cli_args):
+        # requirements are streamed to the daemon as they're read; when it doesn't answer
+        # they're read again below and checked in-process
+        parsed = Piprot(cli_args.files, requirements=scanned_requirements(cli_args)).requirements
+        results = check_with_daemon(cli_args.daemon_address, parsed, cli_args.delay)
+
+    piprot = Piprot(
+        req_files=cli_args.files,
+        delay_in_days=cli_args.delay,
+        pypi=pypi,
+        writer=writer,
+        requirements=scanned_requirements(cli_args),
+        result_store=result_store,
+        fail_fast=cli_args.fail_fast,
+        deadline=cli_args.deadline,
+        workers=cli_args.workers,
+    )
+    if results is not None:
+        sys.exit(piprot.report(results))
+
+    exit_code = piprot.main()
+    if result_store:
+        result_store.close()
+    if cli_args.trace_file:
+        profiler.dump_chrome_trace(cli_args.trace_file)
+    sys.exit(exit_code)
+
+
+def scanned_requirements(cli_args) -> Optional[Iterator[Requirement]]:
+    # lazy, nothing is scanned until the requirements are iterated
+    requirements = None
+    if cli_args.scan:
+        scanner = RequirementsScanner(
+            cli_args.scan,
+            include=cli_args.include or DEFAULT_INCLUDE,
+            exclude=[*DEFAULT_EXCLUDE, *(cli_args.exclude or [])],
+            workers=cli_args.scan_workers,
+        )
+        requirements = scanner.requirements()
+    if cli_args.env:
+        environment = EnvironmentScanner(cli_args.env, workers=cli_args.scan_workers)
+        requirements = chain(requirements or [], environment.requirements())
+    return requirements
+
+
+def use_daemon(cli_parser, cli_args) -> bool:
+    # a daemon checks with its own cache, indexes and settings; it's only asked when every
+    # option it can't honour is left at its default
+    if cli_args.no_daemon or not (cli_args.daemon or "PIPROT_DAEMON" in os.environ):
+        return False
+    ignored = [
+        f"--{dest.replace('_', '-')}"
+        for dest, value in vars(cli_args).items()
+        if dest not in DAEMON_OPTIONS and value != cli_parser.get_default(dest)
+    ]
+    if ignored:
+        logger.info(f"Checking in-process, a piprot daemon doesn't take {', '.join(ignored)}.")
+    return not ignored
+
+
+def serve(argv):
+    cli_parser = argparse.ArgumentParser(
+        prog="piprot serve",
+        description="Answer piprot checks from a long-running process with warm release data.",
+    )
+
+    cli_parser.add_argument(
+        "--address",
+        metavar="HOST:PORT",
+        type=str,
+        default=os.environ.get("PIPROT_DAEMON", DEFAULT_ADDRESS),
+        help=f"Local address to listen on (defaults to $PIPROT_DAEMON or {DEFAULT_ADDRESS}).",
+    )
+
+    cli_parser.add_argument(
+        "--refresh-interval",
+        type=float,
+        default=3600.0,
+        help="Seconds between background refreshes of the release data (defaults to 3600).",
+    )
+
+    cli_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=20,
+        help="Maximum number of PyPI requests in flight (defaults to 20).",
+    )
+
+    cli_parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=default_cache_dir(),
+        help="Directory to cache PyPI responses in (defaults to ~/.cache/piprot).",
+    )
+
+    cli_parser.add_argument(
+        "--no-cache", action="store_true", help="Don't read nor write the response cache."
+    )
+
+    cli_args = cli_parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    cache = None
+    if not cli_args.no_cache:
+        # entries past the ttl are revalidated by the next refresh
+        cache = MetadataCache(cli_args.cache_dir, ttl=cli_args.refresh_interval)
+
+    pypi = PypiPackageInfoDownloader(
+        cache=cache, scheduler=FetchScheduler(concurrency=cli_args.concurrency)
+    )
+    daemon = PiprotDaemon(pypi, cli_args.address, cli_args.refresh_interval)
+    try:
+        asyncio.run(daemon.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+def db(argv):
+    cli_parser = argparse.ArgumentParser(
+        prog="piprot db", description="Manage a local release database for offline checks."
+    )
+    commands = cli_parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser(
+        "import",
+        help="Load a JSON lines dump of PyPI JSON API documents or compact release indexes.",
+    )
+    import_parser.add_argument("dump", type=str, help="dump file, '-' reads stdin")
+    import_parser.add_argument(
+        "--db",
+        type=str,
+        default=os.path.join(default_cache_dir(), "releases.sqlite3"),
+        help="Database file (defaults to ~/.cache/piprot/releases.sqlite3).",
+    )
+
+    cli_args = cli_parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    database = ReleaseDatabase(cli_args.db)
+    try:
+        if cli_args.dump == "-":
+            imported = database.import_lines(sys.stdin)
+        else:
+            with open(cli_args.dump, "r") as dump:
+                imported = database.import_lines(dump)
+        logging.info(f"Imported {imported} projects into {cli_args.db}.")
+    finally:
+        database.close()
+
+
+def report(argv):
+    # NumPy is only loaded for reports, it would add to the startup of every run
+    from piprot.utils.aggregate import aggregate, read_results
+
+    cli_parser = argparse.ArgumentParser(
+        prog="piprot report",
+        description="Aggregate results written with --format jsonl across services and runs.",
+    )
+
+    cli_parser.add_argument(
+        "files",
+        nargs="+",
+        type=str,
+        help="jsonl result file(s), one per run and in chronological order; '-' reads stdin",
+    )
+
+    cli_parser.add_argument(
+        "--service-depth",
+        type=int,
+        default=1,
+        help="Leading directories of a requirement's source that name its service "
+        "(defaults to 1).",
+    )
+
+    cli_parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Number of most lagging dependencies to list (defaults to 10).",
+    )
+
+    cli_parser.add_argument(
+        "-f",
+        "--format",
+        choices=["text", "json"],
+        default="text",
+        help="Report format (defaults to text).",
+    )
+
+    cli_parser.add_argument(
+        "--no-numpy", action="store_true", help="Aggregate in pure Python even if NumPy is there."
+    )
+
+    cli_args = cli_parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    columns = read_results(cli_args.files, service_depth=cli_args.service_depth)
+    summary = aggregate(columns, top=cli_args.top, use_numpy=not cli_args.no_numpy)
+    if cli_args.format == "json":
+        json.dump(summary.to_dict(), sys.stdout)
+        sys.stdout.write("\n")
+    else:
+        for line in summary.lines():
+            logging.info(line)
 
 
 if __name__ == "__main__":
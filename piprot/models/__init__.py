@@ -1,7 +1,20 @@
+from .check_result import CheckResult, Status
 from .messages import Messages
 from .package_info import PackageInfo
+from .release_index import ReleaseIndex
+from .release_timeline import ReleaseTimeline
 from .requirement import Requirement, NotFrozenRequirement
 from .version import PiprotVersion
 
 
-__all__ = ["Requirement", "PiprotVersion", "PackageInfo", "NotFrozenRequirement", "Messages"]
+__all__ = [
+    "Requirement",
+    "PiprotVersion",
+    "PackageInfo",
+    "NotFrozenRequirement",
+    "Messages",
+    "CheckResult",
+    "Status",
+    "ReleaseIndex",
+    "ReleaseTimeline",
+]
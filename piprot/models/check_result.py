@@ -0,0 +1,120 @@
+from dataclasses import asdict, dataclass
+from datetime import date
+from enum import Enum
+from piprot.models.package_info import PackageInfo
+from piprot.models.requirement import Requirement
+from piprot.models.version import PiprotVersion
+from typing import Any, Dict, Optional
+
+
+class Status(str, Enum):
+    UP_TO_DATE = "up_to_date"
+    ROTTEN = "rotten"
+    NO_DELAY_INFO = "no_delay_info"
+    IGNORED = "ignored"
+    CANNOT_FETCH = "cannot_fetch"
+    # not checked before the deadline
+    UNCHECKED = "unchecked"
+
+
+def _isoformat(value: Optional[date]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _str_or_none(value: Any) -> Optional[str]:
+    return str(value) if value is not None else None
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def _date_or_none(value: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(value) if value else None
+
+
+def _version_or_none(value: Optional[str]) -> Optional[PiprotVersion]:
+    return PiprotVersion(value) if value is not None else None
+
+
+@dataclass
+class CheckResult:
+    requirement: Requirement
+    package: PackageInfo
+    status: Status
+    message: str
+    rotten_days: Optional[int] = None
+
+    FIELDS = (
+        "package",
+        "status",
+        "current_version",
+        "current_release_date",
+        "latest_version",
+        "latest_release_date",
+        "rotten_days",
+        "releases_behind",
+        "libyears",
+        "first_newer_release_date",
+        "source",
+        "line",
+    )
+
+    @property
+    def is_outdated(self) -> bool:
+        return self.status in (Status.ROTTEN, Status.NO_DELAY_INFO)
+
+    def as_record(self) -> Dict[str, Any]:
+        return {
+            "package": self.requirement.package,
+            "status": self.status.value,
+            "current_version": _str_or_none(self.package.current_version)
+            or self.requirement.version
+            or None,
+            "current_release_date": _isoformat(self.package.current_release_date),
+            "latest_version": _str_or_none(self.package.latest_version),
+            "latest_release_date": _isoformat(self.package.latest_release_date),
+            "rotten_days": self.rotten_days,
+            "releases_behind": self.package.releases_behind,
+            "libyears": _rounded(self.package.libyears),
+            "first_newer_release_date": _isoformat(self.package.first_newer_release_date),
+            "source": self.requirement.source or None,
+            "line": self.requirement.line_number or None,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        # lossless counterpart of from_dict, unlike the flat as_record
+        return {
+            "requirement": asdict(self.requirement),
+            "package": {
+                "name": self.package.name,
+                "latest_version": _str_or_none(self.package.latest_version),
+                "latest_release_date": _isoformat(self.package.latest_release_date),
+                "current_version": _str_or_none(self.package.current_version),
+                "current_release_date": _isoformat(self.package.current_release_date),
+                "releases_behind": self.package.releases_behind,
+                "first_newer_release_date": _isoformat(self.package.first_newer_release_date),
+            },
+            "status": self.status.value,
+            "message": self.message,
+            "rotten_days": self.rotten_days,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CheckResult":
+        package = data["package"]
+        return cls(
+            requirement=Requirement(**data["requirement"]),
+            package=PackageInfo(
+                name=package["name"],
+                latest_version=_version_or_none(package["latest_version"]),
+                latest_release_date=_date_or_none(package["latest_release_date"]),
+                current_version=_version_or_none(package["current_version"]),
+                current_release_date=_date_or_none(package["current_release_date"]),
+                releases_behind=package.get("releases_behind"),
+                first_newer_release_date=_date_or_none(package.get("first_newer_release_date")),
+            ),
+            status=Status(data["status"]),
+            message=data["message"],
+            rotten_days=data["rotten_days"],
+        )
@@ -2,6 +2,7 @@ class Messages:
     NOT_ROTTEN: str = "{package} ({version}) is up to date"
     IGNORED: str = "Ignoring updates for {package}."
     CANNOT_FETCH: str = "Skipping {package} ({version}). Cannot fetch info from PyPI"
+    UNCHECKED: str = "Skipping {package} ({version}). Ran out of time before it was checked"
     NO_DELAY_INFO: str = (
         "{package} ({current_version}) is out of date. "
         "No delay info available. "
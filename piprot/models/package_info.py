@@ -1,14 +1,108 @@
 from dataclasses import dataclass
 from datetime import date
-from piprot.models.requirement import Requirement
+from piprot.models.requirement import COMPACT
 from piprot.models.version import PiprotVersion
-from typing import  Optional
+from typing import Optional
 
 
-@dataclass
+FIELDS = (
+    "name",
+    "latest_version",
+    "latest_release_ordinal",
+    "current_version",
+    "current_release_ordinal",
+    "releases_behind",
+    "first_newer_release_ordinal",
+)
+
+
+def to_ordinal(value: Optional[date]) -> int:
+    return value.toordinal() if value else 0
+
+
+def from_ordinal(ordinal: int) -> Optional[date]:
+    return date.fromordinal(ordinal) if ordinal else None
+
+
+def libyears_between(latest_release_ordinal: int, current_release_ordinal: int) -> Optional[float]:
+    # time between the current and the latest release, in years
+    if not (latest_release_ordinal and current_release_ordinal):
+        return None
+    return max(latest_release_ordinal - current_release_ordinal, 0) / 365.25
+
+
+@dataclass(init=False, **COMPACT)
 class PackageInfo:
+    # release dates are kept as day ordinals, 0 where unknown, and handed out as dates
     name: str
     latest_version: Optional[PiprotVersion]
-    latest_release_date: Optional[date]
+    latest_release_ordinal: int
     current_version: Optional[PiprotVersion]
-    current_release_date: Optional[date]
+    current_release_ordinal: int
+    # how many releases came out after the current version, up to the latest one
+    releases_behind: Optional[int]
+    first_newer_release_ordinal: int
+
+    def __init__(
+        self,
+        name: str,
+        latest_version: Optional[PiprotVersion],
+        latest_release_date: Optional[date],
+        current_version: Optional[PiprotVersion],
+        current_release_date: Optional[date],
+        releases_behind: Optional[int] = None,
+        first_newer_release_date: Optional[date] = None,
+    ) -> None:
+        self._assign(
+            name,
+            latest_version,
+            to_ordinal(latest_release_date),
+            current_version,
+            to_ordinal(current_release_date),
+            releases_behind,
+            to_ordinal(first_newer_release_date),
+        )
+
+    @classmethod
+    def from_ordinals(
+        cls,
+        name: str,
+        latest_version: Optional[PiprotVersion],
+        latest_release_ordinal: int,
+        current_version: Optional[PiprotVersion],
+        current_release_ordinal: int,
+        releases_behind: Optional[int] = None,
+        first_newer_release_ordinal: int = 0,
+    ) -> "PackageInfo":
+        package_info = cls.__new__(cls)
+        package_info._assign(
+            name,
+            latest_version,
+            latest_release_ordinal,
+            current_version,
+            current_release_ordinal,
+            releases_behind,
+            first_newer_release_ordinal,
+        )
+        return package_info
+
+    def _assign(self, *values) -> None:
+        # the class is frozen, fields can only be set around its __setattr__
+        for field_name, value in zip(FIELDS, values):
+            object.__setattr__(self, field_name, value)
+
+    @property
+    def latest_release_date(self) -> Optional[date]:
+        return from_ordinal(self.latest_release_ordinal)
+
+    @property
+    def current_release_date(self) -> Optional[date]:
+        return from_ordinal(self.current_release_ordinal)
+
+    @property
+    def first_newer_release_date(self) -> Optional[date]:
+        return from_ordinal(self.first_newer_release_ordinal)
+
+    @property
+    def libyears(self) -> Optional[float]:
+        return libyears_between(self.latest_release_ordinal, self.current_release_ordinal)
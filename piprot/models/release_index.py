@@ -0,0 +1,51 @@
+from dataclasses import dataclass, field
+from datetime import date
+from piprot.models.release_timeline import ReleaseTimeline
+from piprot.models.version import PiprotVersion
+from typing import Any, Dict, Mapping, Optional
+
+
+@dataclass
+class ReleaseIndex:
+    name: str
+    stable_version: Optional[str]
+    # version -> upload date as an ordinal, None for releases without any files
+    releases: Mapping[str, Optional[int]]
+    # built on first use and kept for as long as the index, keyed by whether prereleases count
+    _timelines: Dict[bool, ReleaseTimeline] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    def latest_version(self) -> Optional[PiprotVersion]:
+        if self.stable_version:
+            return PiprotVersion(self.stable_version)
+        if not self.releases:
+            return None
+
+        all_versions = [PiprotVersion(v) for v in self.releases]
+        stable_versions = [v for v in all_versions if not v.is_prerelease()]
+        # if there are no stable versions, try with a prereleases
+        return max(stable_versions or all_versions)
+
+    def release_date(self, version: PiprotVersion) -> Optional[date]:
+        ordinal = self.releases.get(str(version))
+        if ordinal is None:
+            return None
+        return date.fromordinal(ordinal)
+
+    def timeline(self, prereleases: bool = False) -> ReleaseTimeline:
+        timeline = self._timelines.get(prereleases)
+        if timeline is None:
+            timeline = self._timelines[prereleases] = ReleaseTimeline(self.releases, prereleases)
+        return timeline
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "stable_version": self.stable_version,
+            "releases": dict(self.releases),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReleaseIndex":
+        return cls(data["name"], data["stable_version"], data["releases"])
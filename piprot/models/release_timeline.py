@@ -0,0 +1,54 @@
+from array import array
+from bisect import bisect_right
+from datetime import date
+from piprot.models.version import PiprotVersion
+from typing import List, Mapping, Optional
+
+
+class ReleaseTimeline:
+    # releases of a project sorted by version, kept as parallel arrays of sort keys and upload
+    # date ordinals, so position queries are a binary search instead of a scan of the history;
+    # releases without any files were never installable and are left out
+    __slots__ = ("keys", "versions", "dates", "_first_dates")
+
+    def __init__(self, releases: Mapping[str, Optional[int]], prereleases: bool = False) -> None:
+        timeline = sorted(
+            (version.sort_key, str(version), ordinal)
+            for version, ordinal in (
+                (PiprotVersion(version_string), ordinal)
+                for version_string, ordinal in releases.items()
+                if ordinal
+            )
+            if prereleases or not version.is_prerelease()
+        )
+        self.keys: List[tuple] = [key for key, _, _ in timeline]
+        self.versions: List[str] = [version for _, version, _ in timeline]
+        self.dates = array("i", [ordinal for _, _, ordinal in timeline])
+        # the earliest upload date from each position onwards, releases aren't uploaded in
+        # version order when older branches get backports
+        self._first_dates = array("i", self.dates)
+        for position in range(len(self._first_dates) - 2, -1, -1):
+            self._first_dates[position] = min(
+                self._first_dates[position], self._first_dates[position + 1]
+            )
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def releases_between(self, current: PiprotVersion, latest: PiprotVersion) -> int:
+        # releases newer than current, up to and including latest
+        return max(0, bisect_right(self.keys, latest.sort_key) - self._after(current))
+
+    def first_release_after(self, current: PiprotVersion) -> Optional[date]:
+        ordinal = self.first_ordinal_after(current)
+        return date.fromordinal(ordinal) if ordinal else None
+
+    def first_ordinal_after(self, current: PiprotVersion) -> int:
+        # the upload date ordinal of the first release after current, 0 if there's none
+        position = self._after(current)
+        if position == len(self._first_dates):
+            return 0
+        return self._first_dates[position]
+
+    def _after(self, version: PiprotVersion) -> int:
+        return bisect_right(self.keys, version.sort_key)
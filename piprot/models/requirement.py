@@ -1,35 +1,43 @@
 import re
+import sys
 
-from dataclasses import dataclass
-from piprot.utils.requirements import remove_comments
+from dataclasses import dataclass, field
+from piprot.utils.requirements import remove_comments, remove_options
 
 
 REQUIREMENT_REGEX = re.compile(r"\s*(?P<package>[^\s\[\]]+)(?P<extras>\[\S+\])?==(?P<version>\S+)")
 NOROT_REGEX = re.compile(r"^.*?\s+#\s*no\s?rot\s*$")
+# a large run holds millions of these models: they're immutable, and have no per-instance
+# __dict__ on Pythons whose dataclasses can generate __slots__
+COMPACT = {"frozen": True, "slots": True} if sys.version_info >= (3, 10) else {"frozen": True}
 
 
 class NotFrozenRequirement(Exception):
     pass
 
 
-@dataclass
+@dataclass(**COMPACT)
 class Requirement:
     package: str
     version: str = ""
     ignore: bool = False
+    # where the requirement comes from, doesn't take part in comparisons
+    source: str = field(default="", compare=False)
+    line_number: int = field(default=0, compare=False)
 
     @staticmethod
-    def from_line(line: str) -> "Requirement":
+    def from_line(line: str, source: str = "", line_number: int = 0) -> "Requirement":
         ignore = bool(NOROT_REGEX.fullmatch(line))
 
-        # ignore comments (part after #) and clean whitespace
-        clean_line = remove_comments(line)
+        # ignore comments (part after #), options and clean whitespace
+        clean_line = remove_options(remove_comments(line))
         match = REQUIREMENT_REGEX.fullmatch(clean_line)
 
         if not match:
             raise NotFrozenRequirement(f"Line: '{line}' does not contain frozen requirement.")
 
-        package = match.group("package")
-        version = match.group("version")
+        # the same few names and versions come up over and over in a large tree
+        package = sys.intern(match.group("package"))
+        version = sys.intern(match.group("version"))
 
-        return Requirement(package, version, ignore)
+        return Requirement(package, version, ignore, source, line_number)
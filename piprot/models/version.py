@@ -1,66 +1,180 @@
 import re
-from typing import List, Tuple
+from typing import Dict, Optional, Tuple
 
 PRERELEASE_REGEX = re.compile(r"(a|b|c|rc|alpha|beta|pre|preview|dev|svn|git)")
+PEP440_REGEX = re.compile(
+    r"""
+    v?
+    (?:(?P<epoch>[0-9]+)!)?
+    (?P<release>[0-9]+(?:\.[0-9]+)*)
+    (?P<pre>
+        [-_.]?
+        (?P<pre_l>alpha|beta|preview|pre|rc|a|b|c)
+        [-_.]?
+        (?P<pre_n>[0-9]+)?
+    )?
+    (?P<post>
+        (?:-(?P<post_n1>[0-9]+))
+        |
+        (?:[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>[0-9]+)?)
+    )?
+    (?P<dev>
+        [-_.]?
+        (?P<dev_l>dev)
+        [-_.]?
+        (?P<dev_n>[0-9]+)?
+    )?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+PRE_LABEL_RANKS = {"a": 0, "alpha": 0, "b": 1, "beta": 1, "c": 2, "rc": 2, "pre": 2, "preview": 2}
+# versions are interned, but we don't want to grow without bounds in long-running processes
+MAX_INTERNED_VERSIONS = 100_000
+
+SortKey = Tuple[int, Tuple[int, ...], tuple, tuple, tuple, tuple]
 
 
 class PiprotVersion:
-    def __init__(self, version: str) -> None:
-        self.version = version
-        self.parts = self.__version_to_parts()
+    __slots__ = ("version", "parts", "_key", "_is_prerelease")
+
+    _interned: Dict[str, "PiprotVersion"] = {}
+
+    version: str
+    parts: Tuple[int, ...]
+    _key: SortKey
+    _is_prerelease: bool
+
+    def __new__(cls, version: str) -> "PiprotVersion":
+        # equal strings always give the very same (immutable) object, so parsing
+        # happens once per distinct version string
+        instance = cls._interned.get(version)
+        if instance is not None:
+            return instance
+
+        instance = super().__new__(cls)
+        instance.version = version
+        instance.parts, instance._key, instance._is_prerelease = _parse(version)
+        if len(cls._interned) >= MAX_INTERNED_VERSIONS:
+            cls._interned.clear()
+        cls._interned[version] = instance
+        return instance
+
+    def __reduce__(self):
+        return PiprotVersion, (self.version,)
 
     def is_direct_successor(self, other: "PiprotVersion") -> bool:
         if len(self.parts) != len(other.parts):
             return False
 
-        return all(
-            self.parts[index] - other.parts[index] <= 1 for index, diff in enumerate(self.parts)
-        )
+        return all(ours - theirs <= 1 for ours, theirs in zip(self.parts, other.parts))
 
     def __str__(self) -> str:  # pragma: no cover
         return str(self.version)
 
+    def __repr__(self) -> str:  # pragma: no cover
+        return f"PiprotVersion({self.version!r})"
+
+    @property
+    def sort_key(self) -> SortKey:
+        return self._key
+
     def __cmp__(self, to_compare: "PiprotVersion") -> int:
-        if self.version == to_compare.version:
+        if self._key == to_compare._key:
             return 0
+        return 1 if self._key > to_compare._key else -1
 
-        our_parts = self.parts
-        parts_to_compare = to_compare.parts
+    def __lt__(self, other: "PiprotVersion") -> bool:
+        return self._key < other._key
 
-        # ensure both _parts_ lists have the same length
-        our_parts, parts_to_compare = PiprotVersion.align_parts(our_parts, parts_to_compare)
+    def __le__(self, other: "PiprotVersion") -> bool:
+        return self._key <= other._key
 
-        if self.is_prerelease():
-            return 1
-        if to_compare.is_prerelease():
-            return -1
+    def __gt__(self, other: "PiprotVersion") -> bool:
+        return self._key > other._key
 
-        for us, them in zip(self.parts, to_compare.parts):
-            if us != them:
-                return us - them
-        return 0
+    def __ge__(self, other: "PiprotVersion") -> bool:
+        return self._key >= other._key
 
-    def __lt__(self, other: "PiprotVersion") -> bool:
-        return self.__cmp__(other) < 0
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PiprotVersion):
+            return NotImplemented
+        return self._key == other._key
 
-    def __gt__(self, other: "PiprotVersion") -> bool:
-        return self.__cmp__(other) > 0
-
-    def __eq__(self, other: "PiprotVersion") -> bool:
-        return self.__cmp__(other) == 0
-
-    def is_prerelease(self):
-        return bool(PRERELEASE_REGEX.search(self.version))
-
-    def __version_to_parts(self) -> List[int]:
-        version = self.version.strip().replace("-", ".")
-        parts = version.split(".")
-        return [int(re.sub(r"\D", "", part) or 0) for part in parts]
-
-    @staticmethod
-    def align_parts(first_parts: List[int], second_parts: List[int]) -> Tuple[List[int], List[int]]:
-        while len(first_parts) > len(second_parts):
-            second_parts.append(0)
-        while len(second_parts) > len(first_parts):
-            first_parts.append(0)
-        return first_parts, second_parts
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    def is_prerelease(self) -> bool:
+        return self._is_prerelease
+
+
+def _parse(version: str) -> Tuple[Tuple[int, ...], SortKey, bool]:
+    normalized = version.strip().lower()
+    parts = normalized.split(".")
+    if all(part.isdecimal() for part in parts):
+        # fast path for plain final releases, by far the most common kind
+        release = tuple(map(int, parts))
+        return release, (0, _strip_trailing_zeros(release), (1,), (-1,), (1,), ()), False
+
+    match = PEP440_REGEX.fullmatch(normalized)
+    if not match:
+        # non-standard separators, e.g. "1-0-0"
+        match = PEP440_REGEX.fullmatch(normalized.replace("-", ".").replace("_", "."))
+    if not match:
+        return _parse_legacy(normalized)
+
+    release = tuple(int(part) for part in match.group("release").split("."))
+    pre = _pre_key(match.group("pre_l"), match.group("pre_n"))
+    post_number = match.group("post_n1") or match.group("post_n2")
+    post = _post_key(match.group("post") is not None, post_number)
+    dev = _dev_key(match.group("dev") is not None, match.group("dev_n"))
+    if pre is None:
+        # a dev release of a final version goes before its pre-releases
+        pre = (-1,) if dev != (1,) and match.group("post") is None else (1,)
+    local = _local_key(match.group("local"))
+
+    key = (int(match.group("epoch") or 0), _strip_trailing_zeros(release), pre, post, dev, local)
+    is_prerelease = match.group("pre") is not None or match.group("dev") is not None
+    return release, key, is_prerelease
+
+
+def _parse_legacy(version: str) -> Tuple[Tuple[int, ...], SortKey, bool]:
+    parts = version.replace("-", ".").split(".")
+    release = tuple(int(re.sub(r"\D", "", part) or 0) for part in parts)
+    is_prerelease = bool(PRERELEASE_REGEX.search(version))
+    pre = (0, 0, 0) if is_prerelease else (1,)
+    key = (0, _strip_trailing_zeros(release), pre, (-1,), (1,), ())
+    return release, key, is_prerelease
+
+
+def _pre_key(label: Optional[str], number: Optional[str]) -> Optional[tuple]:
+    if label is None:
+        return None
+    return 0, PRE_LABEL_RANKS[label], int(number or 0)
+
+
+def _post_key(is_post: bool, number: Optional[str]) -> tuple:
+    if not is_post:
+        return (-1,)
+    return 0, int(number or 0)
+
+
+def _dev_key(is_dev: bool, number: Optional[str]) -> tuple:
+    if not is_dev:
+        return (1,)
+    return 0, int(number or 0)
+
+
+def _local_key(local: Optional[str]) -> tuple:
+    if local is None:
+        return ()
+    return tuple(
+        (1, int(part)) if part.isdigit() else (0, part) for part in re.split(r"[-_.]", local)
+    )
+
+
+def _strip_trailing_zeros(release: Tuple[int, ...]) -> Tuple[int, ...]:
+    end = len(release)
+    while end > 1 and release[end - 1] == 0:
+        end -= 1
+    return release[:end]
@@ -1,129 +1,453 @@
 import asyncio
 import logging
-from dataclasses import astuple
+import time
+
 from datetime import timedelta, date
-from itertools import chain
-from piprot.models import Requirement, PackageInfo, Messages
+from piprot.models import CheckResult, Requirement, PackageInfo, Messages, Status
+from piprot.models.package_info import to_ordinal
 from piprot.utils.pypi import PypiPackageInfoDownloader
-from piprot.utils.requirements_parser import RequirementsParser
-from typing import Optional, Tuple, List
+from piprot.utils.requirements import canonicalize_name
+from piprot.utils.requirements_parser import RequirementsGraph, RequirementsParser
+from piprot.utils.result_store import ResultStore
+from piprot.utils.result_table import ResultTable
+from piprot.utils.workers import PackageKey, check_in_workers, expand, package_key
+from piprot.utils.writers import ResultWriter, TextWriter
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 
 logger: logging.Logger = logging.getLogger(__name__)
-loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
 
 
 class Piprot:
-    def __init__(self, req_files: List[str], delay_in_days: int = 5) -> None:
-        self.pypi = PypiPackageInfoDownloader()
+    def __init__(
+        self,
+        req_files: List[str],
+        delay_in_days: int = 5,
+        pypi: Optional[PypiPackageInfoDownloader] = None,
+        max_pending: int = 1000,
+        writer: Optional[ResultWriter] = None,
+        requirements: Optional[Iterable[Requirement]] = None,
+        result_store: Optional[ResultStore] = None,
+        fail_fast: bool = False,
+        deadline: Optional[float] = None,
+        workers: int = 1,
+    ) -> None:
+        self.pypi = pypi or PypiPackageInfoDownloader()
+        self.writer = writer or TextWriter()
         self.delay_timedelta = timedelta(days=delay_in_days)
-        self.requirements = list(
-            chain.from_iterable([RequirementsParser(req_file).parse() for req_file in req_files])
-        )
+        self.req_files = req_files
+        self._requirements = requirements
+        self.requirements_graph = RequirementsGraph()
+        self.max_pending = max_pending
+        self.result_store = result_store
+        # stop at the first outdated requirement, the exit code won't change after it
+        self.fail_fast = fail_fast
+        # seconds after which requirements that haven't been checked are reported unchecked
+        self.deadline = deadline
+        # with more than one, lookups are sharded across as many processes
+        self.workers = workers
+        self._revalidations: Set["asyncio.Future[PackageInfo]"] = set()
+
+    @property
+    def requirements(self) -> Iterator[Requirement]:
+        if self._requirements is not None:
+            yield from self._requirements
+        profiler = self.pypi.profiler
+        for req_file in self.req_files:
+            requirements = iter(RequirementsParser(req_file, self.requirements_graph))
+            if profiler:
+                requirements = profiler.timed_iter("parse", req_file, requirements)
+            yield from requirements
 
     def main(self) -> int:
-        tasks = [self._handle_single_requirement(requirement) for requirement in self.requirements]
-        has_outdated_packages = loop.run_until_complete(asyncio.gather(*tasks))
-        if any(has_outdated_packages):
-            return 1
-        return 0
-
-    async def _handle_single_requirement(self, requirement: Requirement) -> bool:
-        current_version, current_release_date = await self.pypi.version_and_release_date(
-            requirement
-        )
-        latest_version, latest_release_date = await self.pypi.version_and_release_date(
-            Requirement(requirement.package)
+        return asyncio.run(self._main())
+
+    async def _main(self) -> int:
+        # results are packed into a table as they come in, and written out from its columns
+        table = ResultTable()
+        results = self.results()
+        try:
+            async for result in results:
+                table.add(result)
+                if self.fail_fast and result.is_outdated:
+                    logger.debug("Found an outdated requirement, cancelling the other checks.")
+                    break
+        finally:
+            # cancels the outstanding checks right away rather than whenever it's collected
+            await results.aclose()
+        exit_code = self.report(table)
+        self._log_stats()
+        return exit_code
+
+    def report(self, table: ResultTable) -> int:
+        # writes out checked results, whether checked here or e.g. by a piprot daemon
+        first_outdated = table.first_outdated()
+        if self.fail_fast and first_outdated is not None:
+            table.truncate(first_outdated + 1)
+        self.writer.write_table(table)
+        self.writer.close()
+        return int(first_outdated is not None)
+
+    async def results(self) -> AsyncIterator[CheckResult]:
+        if self.workers > 1:
+            async for result in self._results_from_workers():
+                yield result
+            return
+
+        # requirements are checked as soon as they're parsed and handed out in completion
+        # order; at most `max_pending` of them are in progress, so memory stays flat
+        pending: Dict["asyncio.Future[CheckResult]", Requirement] = {}
+        completed: "asyncio.Queue[asyncio.Future[CheckResult]]" = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        deadline = None if self.deadline is None else loop.time() + self.deadline
+        expired = False
+
+        async with self.pypi:
+            try:
+                for requirement in self._prioritized(self.requirements):
+                    if expired or (deadline is not None and loop.time() >= deadline):
+                        expired = True
+                        yield self._unchecked(requirement)
+                        continue
+
+                    task = asyncio.ensure_future(self._handle_single_requirement(requirement))
+                    task.add_done_callback(completed.put_nowait)
+                    pending[task] = requirement
+
+                    if len(pending) >= self.max_pending:
+                        task = await self._next_completed(completed, deadline)
+                        if task is None:
+                            expired = True
+                        else:
+                            del pending[task]
+                            yield task.result()
+                    else:
+                        # let the fetches make progress before reading further
+                        await asyncio.sleep(0)
+
+                    while not completed.empty():
+                        task = completed.get_nowait()
+                        del pending[task]
+                        yield task.result()
+
+                while pending:
+                    task = None if expired else await self._next_completed(completed, deadline)
+                    if task is None:
+                        # out of time, whatever hasn't finished yet is cancelled below
+                        expired = True
+                        for task, requirement in pending.items():
+                            yield task.result() if task.done() else self._unchecked(requirement)
+                        break
+                    del pending[task]
+                    yield task.result()
+
+                # stale results have been handed out already, their refresh still has to land
+                if self._revalidations and not expired:
+                    remaining = None if deadline is None else max(0.0, deadline - loop.time())
+                    await asyncio.wait(self._revalidations, timeout=remaining)
+            finally:
+                for task in {*pending, *self._revalidations}:
+                    task.cancel()
+                if self.result_store:
+                    self.result_store.flush()
+
+    async def _results_from_workers(self) -> AsyncIterator[CheckResult]:
+        # every distinct project and version is looked up once, in one of the worker processes;
+        # results come once all of them are in, in the order the requirements were read
+        requirements = list(self.requirements)
+        store = self.result_store
+        delay = self.delay_timedelta.days
+        stored: Dict[PackageKey, PackageInfo] = {}
+        keys: Set[PackageKey] = set()
+        for requirement in requirements:
+            key = package_key(requirement)
+            if requirement.ignore or key in stored or key in keys:
+                continue
+            stored_result = store.get(requirement, delay) if store else None
+            if stored_result and stored_result.is_fresh(store.ttl):
+                store.stats.hits += 1
+                stored[key] = stored_result.package_info
+                continue
+            if store:
+                store.stats.misses += 1
+            keys.add(key)
+
+        compact_infos = await check_in_workers(self.pypi, sorted(keys), self.workers)
+        try:
+            for requirement in requirements:
+                key = package_key(requirement)
+                if requirement.ignore:
+                    package_info = PackageInfo(requirement.package, None, None, None, None)
+                elif key in stored:
+                    package_info = stored[key]
+                else:
+                    package_info = expand(requirement.package, compact_infos.get(key))
+                    if store and package_info.latest_version and package_info.current_version:
+                        store.set(requirement, delay, package_info)
+                yield self._result(package_info, requirement)
+        finally:
+            if store:
+                store.flush()
+
+    @staticmethod
+    async def _next_completed(
+        completed: "asyncio.Queue[asyncio.Future[CheckResult]]", deadline: Optional[float]
+    ) -> Optional["asyncio.Future[CheckResult]"]:
+        # None once the deadline has passed
+        if deadline is None:
+            return await completed.get()
+        timeout = max(0.0, deadline - asyncio.get_running_loop().time())
+        try:
+            return await asyncio.wait_for(completed.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _prioritized(self, requirements: Iterator[Requirement]) -> Iterable[Requirement]:
+        # a run that can stop early checks first what was rotten last time, then what was
+        # slowest to fetch; that means reading all requirements upfront, so only then
+        if not (self.result_store and (self.fail_fast or self.deadline is not None)):
+            return requirements
+        requirements = list(requirements)
+        history = self.result_store.history(requirement.package for requirement in requirements)
+
+        def priority(requirement: Requirement) -> Tuple[bool, float]:
+            rotten, fetch_seconds = history.get(canonicalize_name(requirement.package), (False, 0))
+            return not rotten, -fetch_seconds
+
+        return sorted(requirements, key=priority)
+
+    @staticmethod
+    def _unchecked(requirement: Requirement) -> CheckResult:
+        package = PackageInfo(requirement.package, None, None, None, None)
+        message = Messages.UNCHECKED.format(
+            package=requirement.package, version=requirement.version
         )
+        return CheckResult(requirement, package, Status.UNCHECKED, message)
 
-        package_info = PackageInfo(
-            name=requirement.package,
-            latest_version=latest_version,
-            latest_release_date=latest_release_date,
-            current_version=current_version,
-            current_release_date=current_release_date,
+    def _log_stats(self) -> None:
+        stats = self.pypi.stats
+        logger.debug(
+            f"Issued {stats.requests} requests over {stats.connections_created} connections "
+            f"({stats.connections_reused} reused)."
         )
+        scheduler_stats = self.pypi.scheduler.stats
+        if scheduler_stats.retries or scheduler_stats.failures:
+            logger.info(
+                f"Retried requests: {dict(scheduler_stats.retries)}, "
+                f"failed requests: {dict(scheduler_stats.failures)}."
+            )
+        cache = self.pypi.cache
+        if cache and cache.stats.lookups:
+            logger.info(
+                f"Cache hit rate: {cache.stats.hit_rate:.0%} "
+                f"({cache.stats.hits} fresh, {cache.stats.revalidated} revalidated, "
+                f"{cache.stats.misses} missed)."
+            )
+        if cache and cache.stats.resolved:
+            logger.info(
+                f"Resolved {cache.stats.resolved} missing or moved projects from earlier runs."
+            )
+        if self.result_store and self.result_store.stats.lookups:
+            store_stats = self.result_store.stats
+            logger.info(
+                f"Reused {store_stats.hits + store_stats.stale} of {store_stats.lookups} "
+                f"stored results ({store_stats.stale} stale, revalidated)."
+            )
+        if len(self.pypi.indexes) > 1:
+            for index in self.pypi.indexes:
+                logger.info(index.summary())
+        if self.pypi.profiler:
+            for line in self.pypi.profiler.summary():
+                logger.info(line)
 
-        is_outdated, message = self.__handle_single_requirement(package_info, requirement)
-        logger.error(message)
-        return is_outdated
+    async def _handle_single_requirement(self, requirement: Requirement) -> CheckResult:
+        if requirement.ignore:
+            # no need to ask PyPI about packages we're not going to report on
+            package_info = PackageInfo(requirement.package, None, None, None, None)
+        else:
+            package_info = await self._package_info(requirement)
+
+        return self._result(package_info, requirement)
+
+    def _result(self, package_info: PackageInfo, requirement: Requirement) -> CheckResult:
+        result = self.__handle_single_requirement(package_info, requirement)
+        if self.result_store and not requirement.ignore:
+            self.result_store.record_status(requirement.package, result.status == Status.ROTTEN)
+        return result
+
+    async def _package_info(self, requirement: Requirement) -> PackageInfo:
+        store = self.result_store
+        if store is None:
+            return await self.pypi.package_info(requirement)
+
+        stored = store.get(requirement, self.delay_timedelta.days)
+        if stored and stored.is_fresh(store.ttl):
+            store.stats.hits += 1
+            return stored.package_info
+        if stored and stored.is_fresh(store.ttl + store.max_stale):
+            store.stats.stale += 1
+            task = asyncio.ensure_future(self._fetch_and_store(requirement))
+            self._revalidations.add(task)
+            task.add_done_callback(self._revalidations.discard)
+            return stored.package_info
+
+        store.stats.misses += 1
+        return await self._fetch_and_store(requirement)
+
+    async def _fetch_and_store(self, requirement: Requirement) -> PackageInfo:
+        started = time.perf_counter()
+        package_info = await self.pypi.package_info(requirement)
+        self.result_store.record_fetch(requirement.package, time.perf_counter() - started)
+        # failed lookups aren't remembered, they might work out next time
+        if package_info.latest_version and package_info.current_version:
+            self.result_store.set(requirement, self.delay_timedelta.days, package_info)
+        return package_info
 
     def __handle_single_requirement(
         self, package: PackageInfo, requirement: Requirement
-    ) -> Tuple[bool, str]:
-        package_name, latest_version, _, current_version, _ = astuple(package)
+    ) -> CheckResult:
+        package_name = package.name
+        latest_version, current_version = package.latest_version, package.current_version
 
         if requirement.ignore:
             message = Messages.IGNORED.format(package=requirement.package)
-            return False, message
+            return CheckResult(requirement, package, Status.IGNORED, message)
 
         if not all([latest_version, current_version]):
             message = Messages.CANNOT_FETCH.format(
                 package=package_name, version=requirement.version
             )
-            return False, message
+            return CheckResult(requirement, package, Status.CANNOT_FETCH, message)
 
         if latest_version > current_version:
-            return self._is_rotten(package)
+            return self._is_rotten(package, requirement)
 
         message = Messages.NOT_ROTTEN.format(
             package=requirement.package, version=str(current_version)
         )
-        return False, message
+        return CheckResult(requirement, package, Status.UP_TO_DATE, message)
+
+    def _is_rotten(self, package: PackageInfo, requirement: Requirement) -> CheckResult:
+        if package.releases_behind is not None:
+            is_direct_successor = package.releases_behind == 1
+        else:
+            is_direct_successor = package.latest_version.is_direct_successor(
+                package.current_version
+            )
+        if not is_direct_successor:
+            return self._is_not_direct_successor_rotten(package, requirement)
+        return self._is_direct_successor_rotten(package, requirement)
 
-    def _is_rotten(self, package: PackageInfo) -> Tuple[bool, str]:
-        if not package.latest_version.is_direct_successor(package.current_version):
-            return self._is_not_direct_successor_rotten(package)
-        return self._is_direct_successor_rotten(package)
+    def _is_direct_successor_rotten(
+        self, package: PackageInfo, requirement: Requirement
+    ) -> CheckResult:
+        if not package.latest_release_ordinal:
+            return self._no_delay_info(package, requirement)
 
-    def _is_direct_successor_rotten(self, package: PackageInfo) -> Tuple[bool, str]:
-        rotten_time = self.calculate_rotten_time(package.latest_release_date)
-        if rotten_time > self.delay_timedelta:
+        rotten_days = self.calculate_rotten_days(package.latest_release_ordinal)
+        if rotten_days > self.delay_timedelta.days:
             message = Messages.ROTTEN_DIRECT_SUCCESSOR.format(
                 package=package.name,
                 current_version=str(package.current_version),
-                rotten_days=rotten_time.days,
+                rotten_days=rotten_days,
                 latest_version=str(package.latest_version),
             )
-            return True, message
+            return CheckResult(requirement, package, Status.ROTTEN, message, rotten_days)
 
         message = Messages.NOT_ROTTEN.format(
             package=package.name, version=str(package.current_version)
         )
-        return False, message
+        return CheckResult(requirement, package, Status.UP_TO_DATE, message, rotten_days)
 
-    def _is_not_direct_successor_rotten(self, package: PackageInfo) -> Tuple[bool, str]:
-        if not all([package.latest_release_date, package.current_release_date]):
+    def _is_not_direct_successor_rotten(
+        self, package: PackageInfo, requirement: Requirement
+    ) -> CheckResult:
+        if not (package.latest_release_ordinal and package.current_release_ordinal):
             # since we cannot calculate if it's actually rotten, we assume it is
-            message = Messages.NO_DELAY_INFO.format(
-                package=package.name,
-                current_version=str(package.current_version),
-                latest_version=str(package.latest_version),
-            )
-            return True, message
+            return self._no_delay_info(package, requirement)
 
-        rotten_time = self.calculate_rotten_time(
-            package.latest_release_date, package.current_release_date
+        rotten_days = self.calculate_rotten_days(
+            package.latest_release_ordinal, package.current_release_ordinal
         )
-        if rotten_time > self.delay_timedelta:
-            timedelta_since_last_release = self.calculate_rotten_time(package.latest_release_date)
+        if rotten_days > self.delay_timedelta.days:
+            days_since_last_release = self.calculate_rotten_days(package.latest_release_ordinal)
             message = Messages.ROTTEN_NOT_DIRECT_SUCCESSOR.format(
                 package=package.name,
                 current_version=str(package.current_version),
-                rotten_days=rotten_time.days,
+                rotten_days=rotten_days,
                 latest_version=str(package.latest_version),
-                days_since_last_release=timedelta_since_last_release.days,
+                days_since_last_release=days_since_last_release,
             )
-            return True, message
+            return CheckResult(requirement, package, Status.ROTTEN, message, rotten_days)
         message = Messages.NOT_ROTTEN.format(
             package=package.name, version=str(package.current_version)
         )
-        return False, message
+        return CheckResult(requirement, package, Status.UP_TO_DATE, message, rotten_days)
+
+    def _no_delay_info(self, package: PackageInfo, requirement: Requirement) -> CheckResult:
+        message = Messages.NO_DELAY_INFO.format(
+            package=package.name,
+            current_version=str(package.current_version),
+            latest_version=str(package.latest_version),
+        )
+        return CheckResult(requirement, package, Status.NO_DELAY_INFO, message)
 
     @staticmethod
     def calculate_rotten_time(
         latest_release_date: date, current_release_date: Optional[date] = None
     ) -> timedelta:
-        if current_release_date:
-            return latest_release_date - current_release_date
-        return date.today() - latest_release_date
+        return timedelta(
+            days=Piprot.calculate_rotten_days(
+                to_ordinal(latest_release_date), to_ordinal(current_release_date)
+            )
+        )
+
+    @staticmethod
+    def calculate_rotten_days(latest_release_ordinal: int, current_release_ordinal: int = 0) -> int:
+        if current_release_ordinal:
+            return latest_release_ordinal - current_release_ordinal
+        return date.today().toordinal() - latest_release_ordinal
+
+
+async def iter_check(
+    requirements: Iterable[Union[Requirement, str]],
+    *,
+    delay: int = 5,
+    downloader: Optional[PypiPackageInfoDownloader] = None,
+    result_store: Optional[ResultStore] = None,
+    max_pending: int = 1000,
+) -> AsyncIterator[CheckResult]:
+    # runs on the caller's loop; an open downloader, or one sharing the caller's session,
+    # is reused as it is and left open
+    piprot = Piprot(
+        req_files=[],
+        delay_in_days=delay,
+        pypi=downloader,
+        max_pending=max_pending,
+        requirements=_as_requirements(requirements),
+        result_store=result_store,
+    )
+    async for result in piprot.results():
+        yield result
+
+
+async def check(
+    requirements: Iterable[Union[Requirement, str]],
+    *,
+    delay: int = 5,
+    downloader: Optional[PypiPackageInfoDownloader] = None,
+    result_store: Optional[ResultStore] = None,
+) -> List[CheckResult]:
+    return [
+        result
+        async for result in iter_check(
+            requirements, delay=delay, downloader=downloader, result_store=result_store
+        )
+    ]
+
+
+def _as_requirements(requirements: Iterable[Union[Requirement, str]]) -> Iterator[Requirement]:
+    for requirement in requirements:
+        if isinstance(requirement, str):
+            requirement = Requirement.from_line(requirement)
+        yield requirement
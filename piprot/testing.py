@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import random
+import time
+import xmlrpc.client
+
+from aiohttp import web
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+from piprot.utils.pypi import PypiPackageInfoDownloader
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+FIRST_RELEASE_DATE = date(2015, 1, 1)
+
+
+def release_versions(releases: int) -> List[str]:
+    return [f"1.{number // 10}.{number % 10}" for number in range(releases)]
+
+
+def project_document(name: str, releases: int, files_per_release: int = 2) -> Dict[str, Any]:
+    def file(version: str, released: date, index: int) -> Dict[str, Any]:
+        return {
+            "comment_text": "",
+            "digests": {"md5": "0" * 32, "sha256": f"{index:064x}"},
+            "filename": f"{name}-{version}-cp3{index}-cp3{index}-manylinux1_x86_64.whl",
+            "packagetype": "bdist_wheel",
+            "python_version": f"cp3{index}",
+            "requires_python": ">=3.7",
+            "size": 123456,
+            "upload_time": f"{released.isoformat()}T12:00:00",
+            "url": f"https://files.example.org/packages/{name}-{version}.whl",
+            "yanked": False,
+        }
+
+    versions = release_versions(releases)
+    documents = {}
+    for number, version in enumerate(versions):
+        released = FIRST_RELEASE_DATE + timedelta(days=7 * number)
+        documents[version] = [file(version, released, index) for index in range(files_per_release)]
+    return {
+        "info": {"name": name, "version": versions[-1], "description": f"The {name} project."},
+        "releases": documents,
+        "urls": documents[versions[-1]],
+    }
+
+
+@dataclass
+class StandInConfig:
+    releases: int = 30
+    files_per_release: int = 2
+    # seconds added to every response
+    latency: float = 0.0
+    # share of requests answered with a 500 or a 429
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: int = 0
+    seed: int = 0
+
+
+class PypiStandIn:
+    # in-process stand-in for the PyPI JSON API and its XML-RPC changelog, serving generated
+    # project documents; projects whose name starts with "missing" don't exist, and the ones
+    # in `moved` redirect to their new name
+    def __init__(self, config: Optional[StandInConfig] = None) -> None:
+        self.config = config or StandInConfig()
+        self.requests: Counter = Counter()
+        self.responses: Counter = Counter()
+        self.moved: Dict[str, str] = {}
+        self.url = ""
+        # every project starts out at serial 1, each release() bumps the index serial
+        self.serial = 1
+        self.changelog: List[Tuple[str, str, int, str, int]] = []
+        self._random = random.Random(self.config.seed)
+        self._documents: Dict[str, bytes] = {}
+        self._releases: Counter = Counter()
+        self._serials: Dict[str, int] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def pypi_url(self) -> str:
+        return f"{self.url}/pypi"
+
+    async def __aenter__(self) -> "PypiStandIn":
+        app = web.Application()
+        app.router.add_get("/pypi/{package}/json", self._project)
+        app.router.add_post("/pypi", self._xmlrpc)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._runner.cleanup()
+
+    @contextmanager
+    def patch(self) -> Iterator["PypiStandIn"]:
+        original_url = PypiPackageInfoDownloader.PYPI_BASE_URL
+        PypiPackageInfoDownloader.PYPI_BASE_URL = self.pypi_url
+        try:
+            yield self
+        finally:
+            PypiPackageInfoDownloader.PYPI_BASE_URL = original_url
+
+    def document(self, package: str) -> bytes:
+        if package not in self._documents:
+            document = project_document(
+                package,
+                self.config.releases + self._releases[package],
+                self.config.files_per_release,
+            )
+            self._documents[package] = json.dumps(document).encode()
+        return self._documents[package]
+
+    def release(self, package: str) -> None:
+        # publishes the next version of a project
+        self._releases[package] += 1
+        self._documents.pop(package, None)
+        self.serial += 1
+        self._serials[package] = self.serial
+        version = release_versions(self.config.releases + self._releases[package])[-1]
+        self.changelog.append((package, version, int(time.time()), "new release", self.serial))
+
+    async def _xmlrpc(self, request: web.Request) -> web.Response:
+        params, method = xmlrpc.client.loads(await request.text())
+        self.requests[method] += 1
+        if method == "changelog_last_serial":
+            result: Any = self.serial
+        elif method == "changelog_since_serial":
+            result = [list(event) for event in self.changelog if event[4] > params[0]]
+        else:
+            fault = xmlrpc.client.Fault(1, f"unknown method {method}")
+            return web.Response(body=xmlrpc.client.dumps(fault), content_type="text/xml")
+        body = xmlrpc.client.dumps((result,), methodresponse=True)
+        return web.Response(body=body, content_type="text/xml")
+
+    async def _project(self, request: web.Request) -> web.Response:
+        package = request.match_info["package"]
+        self.requests[package] += 1
+        response = await self._respond(request, package)
+        self.responses[response.status] += 1
+        return response
+
+    async def _respond(self, request: web.Request, package: str) -> web.Response:
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+
+        roll = self._random.random()
+        if roll < self.config.error_rate:
+            return web.Response(status=500)
+        if roll < self.config.error_rate + self.config.throttle_rate:
+            return web.Response(status=429, headers={"Retry-After": str(self.config.retry_after)})
+        if package in self.moved:
+            return web.Response(
+                status=301, headers={"Location": f"/pypi/{self.moved[package]}/json"}
+            )
+        if package.startswith("missing"):
+            return web.Response(status=404)
+
+        body = self.document(package)
+        headers = {
+            "ETag": f'"{hashlib.sha1(body).hexdigest()}"',
+            "X-PyPI-Last-Serial": str(self._serials.get(package, 1)),
+        }
+        if request.headers.get("If-None-Match") == headers["ETag"]:
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type="application/json", headers=headers)
@@ -0,0 +1,285 @@
+import json
+import logging
+import math
+import os
+import sys
+
+from array import array
+from dataclasses import asdict, dataclass, field
+from piprot.utils.requirements import canonicalize_name
+from piprot.utils.result_table import OUTDATED, STATUSES, Codes
+from piprot.utils.tracing import percentile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (0.5, 0.9)
+MISSING = float("nan")
+
+
+def service_of(source: Optional[str], depth: int = 1) -> str:
+    # the leading directories of a requirement's source, e.g. a repository in --scan mode or
+    # an image layer in --env mode; a source without any directory is a service of its own
+    if not source:
+        return ""
+    parts = source.replace(os.sep, "/").split("/")
+    if len(parts) == 1:
+        return source
+    return "/".join(parts[: min(depth, len(parts) - 1)])
+
+
+class ResultColumns:
+    # check results as parallel typed arrays, one entry per result row; libyears are NaN
+    # where unknown
+    def __init__(self, service_depth: int = 1) -> None:
+        self.service_depth = service_depth
+        self.packages = Codes()
+        self.services = Codes()
+        self.runs = Codes()
+        self.package = array("i")
+        self.service = array("i")
+        self.run = array("i")
+        self.status = array("b")
+        self.libyears = array("d")
+        self._status_codes = {status.value: code for code, status in enumerate(STATUSES)}
+
+    def __len__(self) -> int:
+        return len(self.package)
+
+    def add(self, record: Dict[str, Any], run: str = "") -> None:
+        # record is a CheckResult.as_record() row, as written by the jsonl writer; it's
+        # validated in full before any column grows, so an invalid one leaves them all aligned
+        package = canonicalize_name(record["package"])
+        service = service_of(record.get("source"), self.service_depth)
+        status = self._status_codes[record["status"]]
+        libyears = record.get("libyears")
+        libyears = MISSING if libyears is None else float(libyears)
+        self.package.append(self.packages.code(package))
+        self.service.append(self.services.code(service))
+        self.run.append(self.runs.code(run))
+        self.status.append(status)
+        self.libyears.append(libyears)
+
+    def read_jsonl(self, lines: Iterable[bytes], run: str = "") -> int:
+        loads: Callable[[bytes], Any] = orjson.loads if orjson is not None else json.loads
+        added = 0
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                self.add(loads(line), run)
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(
+                    f"Skipping invalid result in {run} on line {line_number}. Error: {e!r}"
+                )
+                continue
+            added += 1
+        return added
+
+
+@dataclass
+class PackageStaleness:
+    package: str
+    requirements: int
+    outdated: int
+    libyears: float
+    # nearest-rank libyears percentiles over the requirements with known release dates
+    p50: Optional[float]
+    p90: Optional[float]
+    max: Optional[float]
+
+
+@dataclass
+class GroupTotals:
+    name: str
+    requirements: int
+    outdated: int
+    libyears: float
+
+
+@dataclass
+class Report:
+    requirements: int
+    packages: List[PackageStaleness] = field(default_factory=list)
+    services: List[GroupTotals] = field(default_factory=list)
+    runs: List[GroupTotals] = field(default_factory=list)
+    top: int = 10
+
+    @property
+    def most_lagging(self) -> List[PackageStaleness]:
+        lagging = [package for package in self.packages if package.libyears > 0]
+        return sorted(lagging, key=lambda package: (-package.libyears, package.package))[: self.top]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requirements": self.requirements,
+            "packages": [asdict(package) for package in self.packages],
+            "services": [asdict(service) for service in self.services],
+            "most_lagging": [package.package for package in self.most_lagging],
+            "trend": [asdict(run) for run in self.runs],
+        }
+
+    def lines(self) -> List[str]:
+        lines = [
+            f"Aggregated {self.requirements} results of {len(self.packages)} packages in "
+            f"{len(self.services)} services."
+        ]
+        if self.most_lagging:
+            lines.append("Most lagging dependencies (total libyears, p50/p90/max per requirement):")
+            for package in self.most_lagging:
+                lines.append(
+                    f"  {package.package}: {package.libyears:.2f} "
+                    f"({_format(package.p50)}/{_format(package.p90)}/{_format(package.max)}), "
+                    f"{package.outdated} of {package.requirements} outdated"
+                )
+        lines.append("Libyears per service:")
+        for service in sorted(self.services, key=lambda service: (-service.libyears, service.name)):
+            lines.append(f"  {service.name or '-'}: {service.libyears:.2f} ({_outdated(service)})")
+        if len(self.runs) > 1:
+            lines.append("Trend:")
+            for run in self.runs:
+                lines.append(f"  {run.name or '-'}: {run.libyears:.2f} libyears ({_outdated(run)})")
+        return lines
+
+
+def _format(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def _outdated(totals: GroupTotals) -> str:
+    return f"{totals.outdated} of {totals.requirements} outdated"
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def aggregate(columns: ResultColumns, top: int = 10, use_numpy: bool = True) -> Report:
+    aggregator = _numpy_aggregates if use_numpy and numpy is not None else _python_aggregates
+    package_totals, service_totals, run_totals, staleness = aggregator(columns)
+    packages = [
+        PackageStaleness(name, *package_totals[code], *map(_optional, staleness[code]))
+        for code, name in enumerate(columns.packages.names)
+    ]
+    return Report(
+        requirements=len(columns),
+        packages=packages,
+        services=[
+            GroupTotals(name, *service_totals[code])
+            for code, name in enumerate(columns.services.names)
+        ],
+        runs=[GroupTotals(name, *run_totals[code]) for code, name in enumerate(columns.runs.names)],
+        top=top,
+    )
+
+
+Totals = List[Tuple[int, int, float]]
+
+
+def _numpy_aggregates(
+    columns: ResultColumns,
+) -> Tuple[Totals, Totals, Totals, List[Tuple[float, ...]]]:
+    # every statistic is a handful of whole-column passes, never a loop over the rows
+    package = numpy.frombuffer(columns.package, dtype=numpy.int32)
+    service = numpy.frombuffer(columns.service, dtype=numpy.int32)
+    run = numpy.frombuffer(columns.run, dtype=numpy.int32)
+    outdated = numpy.frombuffer(OUTDATED, dtype=numpy.int8)[
+        numpy.frombuffer(columns.status, dtype=numpy.int8)
+    ].astype(bool)
+    libyears = numpy.frombuffer(columns.libyears, dtype=numpy.float64)
+    known = ~numpy.isnan(libyears)
+    known_libyears = numpy.where(known, libyears, 0.0)
+
+    def totals(codes, groups: int) -> Totals:
+        return list(
+            zip(
+                numpy.bincount(codes, minlength=groups).tolist(),
+                numpy.bincount(codes[outdated], minlength=groups).tolist(),
+                numpy.bincount(codes, weights=known_libyears, minlength=groups).tolist(),
+            )
+        )
+
+    groups = len(columns.packages)
+    codes, values = package[known], libyears[known]
+    # sorted by package, then libyears, so each package's values are a sorted slice
+    order = numpy.lexsort((values, codes))
+    values = values[order]
+    counts = numpy.bincount(codes, minlength=groups)
+    starts = numpy.cumsum(counts) - counts
+    staleness = []
+    for fraction in PERCENTILES:
+        ranks = numpy.maximum(numpy.ceil(fraction * counts).astype(numpy.int64) - 1, 0)
+        staleness.append(_take(values, starts + ranks, counts))
+    staleness.append(_take(values, starts + counts - 1, counts))
+
+    return (
+        totals(package, groups),
+        totals(service, len(columns.services)),
+        totals(run, len(columns.runs)),
+        list(zip(*(column.tolist() for column in staleness))),
+    )
+
+
+def _take(values, positions, counts):
+    if not len(values):
+        return numpy.full(len(counts), MISSING)
+    return numpy.where(counts > 0, values[numpy.minimum(positions, len(values) - 1)], MISSING)
+
+
+def _python_aggregates(
+    columns: ResultColumns,
+) -> Tuple[Totals, Totals, Totals, List[Tuple[float, ...]]]:
+    # same statistics without NumPy, in one pass over the rows
+    package_totals = [[0, 0, 0.0] for _ in range(len(columns.packages))]
+    service_totals = [[0, 0, 0.0] for _ in range(len(columns.services))]
+    run_totals = [[0, 0, 0.0] for _ in range(len(columns.runs))]
+    values: List[List[float]] = [[] for _ in range(len(columns.packages))]
+    for package, service, run, status, libyears in zip(
+        columns.package, columns.service, columns.run, columns.status, columns.libyears
+    ):
+        known = libyears == libyears
+        if known:
+            values[package].append(libyears)
+        for group in (package_totals[package], service_totals[service], run_totals[run]):
+            group[0] += 1
+            group[1] += OUTDATED[status]
+            if known:
+                group[2] += libyears
+
+    staleness = []
+    for package_values in values:
+        if not package_values:
+            staleness.append((MISSING,) * (len(PERCENTILES) + 1))
+            continue
+        package_values.sort()
+        percentiles = (percentile(package_values, fraction) for fraction in PERCENTILES)
+        staleness.append((*percentiles, package_values[-1]))
+    return (
+        [tuple(group) for group in package_totals],
+        [tuple(group) for group in service_totals],
+        [tuple(group) for group in run_totals],
+        staleness,
+    )
+
+
+def read_results(paths: Sequence[str], service_depth: int = 1) -> ResultColumns:
+    # every file is a run of its own, in the given order, for the trend
+    columns = ResultColumns(service_depth)
+    for path in paths:
+        if path == "-":
+            columns.read_jsonl(sys.stdin.buffer, run="-")
+            continue
+        with open(path, "rb") as file:
+            columns.read_jsonl(file, run=path)
+    return columns
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Type, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def default_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "piprot")
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    payload: Any
+    stored_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # the index serial this entry is known to be current as of
+    serial: Optional[int] = None
+    # where it was fetched from, its validators mean nothing to any other index
+    origin: Optional[str] = None
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.stored_at < ttl
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass
+class Resolution:
+    # where a project URL leads: the URL it redirects to, or None when there's no such project
+    url: str
+    location: Optional[str]
+    stored_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.stored_at < ttl
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    revalidated: int = 0
+    misses: int = 0
+    # lookups of missing or moved projects answered from resolutions of earlier runs
+    resolved: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.revalidated + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        if not self.lookups:
+            return 0.0
+        return (self.hits + self.revalidated) / self.lookups
+
+
+class MetadataCache:
+    def __init__(
+        self,
+        directory: str,
+        ttl: float = 3600,
+        max_size: int = 512 * 1024 * 1024,
+        resolution_ttl: float = 86400,
+    ) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        # projects are rarely created or renamed, so where a URL leads is kept for longer
+        self.resolution_ttl = resolution_ttl
+        self.stats = CacheStats()
+        self._size: Optional[int] = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        entry = self._read(self._path(url), CacheEntry)
+        if entry is None or entry.url != url:
+            return None
+        return entry
+
+    def set(self, entry: CacheEntry) -> None:
+        self._store(self._path(entry.url), asdict(entry))
+
+    def touch(self, entry: CacheEntry) -> None:
+        entry.stored_at = time.time()
+        self.set(entry)
+
+    def get_resolution(self, url: str) -> Optional[Resolution]:
+        resolution = self._read(self._resolution_path(url), Resolution)
+        if resolution is None or resolution.url != url:
+            return None
+        return resolution
+
+    def set_resolution(self, url: str, location: Optional[str]) -> None:
+        resolution = Resolution(url, location, time.time())
+        self._store(self._resolution_path(url), asdict(resolution))
+
+    def last_serial(self) -> Optional[int]:
+        # high-water mark of the index changelog the entries have been checked against
+        try:
+            with open(self._serial_path(), "r") as file:
+                return int(json.load(file)["serial"])
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+    def set_last_serial(self, serial: int) -> None:
+        self._write(self._serial_path(), {"serial": serial})
+
+    def _read(self, path: str, entry_class: Type[T]) -> Optional[T]:
+        try:
+            with open(path, "r") as file:
+                entry = entry_class(**json.load(file))
+            # the modification time is what LRU eviction goes by
+            os.utime(path)
+        except (OSError, ValueError, TypeError):
+            return None
+        return entry
+
+    def _store(self, path: str, data: Any) -> None:
+        try:
+            previous_size = os.path.getsize(path)
+        except OSError:
+            previous_size = 0
+        size = self._write(path, data)
+        if size is None:
+            return
+
+        if self._size is not None:
+            # an overwritten entry doesn't take up its old size anymore
+            self._size += size - previous_size
+        if self._current_size() > self.max_size:
+            self._evict()
+
+    def _write(self, path: str, data: Any) -> Optional[int]:
+        # write to a temporary file first, so parallel runs never see half-written entries
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(data, file, separators=(",", ":"))
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.debug(f"Couldn't write cache file {path}. Error: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+        return size
+
+    def _serial_path(self) -> str:
+        # not a .json file, so it's never evicted
+        return os.path.join(self.directory, "last-serial")
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, f"{hashlib.sha256(url.encode()).hexdigest()}.json")
+
+    def _resolution_path(self, url: str) -> str:
+        return self._path(f"resolution {url}")
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._scan())
+        return self._size
+
+    def _scan(self):
+        with os.scandir(self.directory) as entries:
+            for dir_entry in entries:
+                if not dir_entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = dir_entry.stat()
+                except OSError:
+                    continue
+                yield dir_entry.path, stat.st_size, stat.st_mtime
+
+    def _evict(self) -> None:
+        # least recently used entries go first, until we're comfortably below the limit
+        files = sorted(self._scan(), key=lambda file: file[2])
+        total = sum(size for _, size, _ in files)
+        target = self.max_size * 0.9
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # another run might have evicted it already
+                pass
+            total -= size
+        self._size = total
@@ -0,0 +1,52 @@
+import xmlrpc.client
+
+from dataclasses import dataclass, field
+from piprot.utils.requirements import canonicalize_name
+from typing import Any, Dict, Iterable, Optional, Sequence
+from xml.parsers.expat import ExpatError
+
+
+# PyPI answers changelog_since_serial with at most this many events, a full page means
+# there's more we haven't seen
+MAX_CHANGELOG_EVENTS = 50_000
+
+
+class InvalidXmlRpcResponse(Exception):
+    pass
+
+
+@dataclass
+class Changelog:
+    # projects changed in the index between the `since` and `serial` serials
+    since: int
+    serial: int
+    changed: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_events(cls, since: int, events: Iterable[Sequence[Any]]) -> "Changelog":
+        # events are (name, version, timestamp, action, serial) lists
+        changelog = cls(since, since)
+        for name, _, _, _, serial in events:
+            key = canonicalize_name(name)
+            changelog.changed[key] = max(serial, changelog.changed.get(key, 0))
+            changelog.serial = max(serial, changelog.serial)
+        return changelog
+
+    def is_current(self, package: str, serial: Optional[int]) -> bool:
+        # an entry current as of a serial we have the changes since, and which none of them
+        # touched, is still current
+        if serial is None or serial < self.since:
+            return False
+        return self.changed.get(canonicalize_name(package), 0) <= serial
+
+
+def xmlrpc_request(method: str, *params: Any) -> bytes:
+    return xmlrpc.client.dumps(params, method).encode()
+
+
+def xmlrpc_response(body: bytes) -> Any:
+    try:
+        (result,), _ = xmlrpc.client.loads(body.decode())
+    except (xmlrpc.client.Fault, ExpatError, UnicodeDecodeError, ValueError) as e:
+        raise InvalidXmlRpcResponse(repr(e))
+    return result
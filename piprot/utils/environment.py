@@ -0,0 +1,119 @@
+import glob
+import logging
+import os
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from piprot.models import Requirement
+from piprot.utils.requirements_parser import display_path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+METADATA_SUFFIXES = (".dist-info", ".egg-info")
+# where site directories live in virtualenvs, system installs and container root filesystems,
+# relative to the scanned root
+SITE_PATTERNS = (
+    "lib/python*/site-packages",
+    "lib64/python*/site-packages",
+    "Lib/site-packages",
+    "usr/lib/python*/site-packages",
+    "usr/lib/python*/dist-packages",
+    "usr/lib64/python*/site-packages",
+    "usr/local/lib/python*/site-packages",
+    "usr/local/lib/python*/dist-packages",
+    "opt/*/lib/python*/site-packages",
+)
+
+
+def read_metadata_headers(path: str) -> Optional[Tuple[str, str]]:
+    # only reads as far as the Name and Version headers, never the long description
+    name = version = None
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        for line in file:
+            if not line.strip():
+                break
+            key, _, value = line.partition(":")
+            key = key.lower()
+            if key == "name":
+                name = value.strip()
+            elif key == "version":
+                version = value.strip()
+            if name and version:
+                return name, version
+    return None
+
+
+class EnvironmentScanner:
+    # lists the distributions installed in virtualenvs, Python installs or whole root
+    # filesystems, from their .dist-info and .egg-info metadata
+    def __init__(self, roots: Sequence[str], workers: Optional[int] = None) -> None:
+        self.roots = roots
+        self.workers = workers
+
+    def site_directories(self) -> Iterator[str]:
+        seen = set()
+        for root in self.roots:
+            candidates = []
+            for pattern in SITE_PATTERNS:
+                candidates.extend(sorted(glob.glob(os.path.join(glob.escape(root), pattern))))
+            # a root without any of the known layouts is taken for a site directory itself
+            candidates = candidates or [root]
+            for candidate in candidates:
+                real_path = os.path.realpath(candidate)
+                if real_path not in seen and os.path.isdir(candidate):
+                    seen.add(real_path)
+                    yield candidate
+
+    def metadata_files(self, site_directory: str) -> List[str]:
+        try:
+            entries = sorted(os.scandir(site_directory), key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning(f"Couldn't list {site_directory}. Error: {e}")
+            return []
+        return [path for path in map(self._metadata_file, entries) if path]
+
+    def requirements(self) -> Iterator[Requirement]:
+        # site directories are listed and metadata files read in parallel, a layer's worth
+        # of distributions is mostly waiting on the filesystem
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            site_directories = list(self.site_directories())
+            files = [
+                (site_directory, path)
+                for site_directory, paths in zip(
+                    site_directories, executor.map(self.metadata_files, site_directories)
+                )
+                for path in paths
+            ]
+            for requirement in executor.map(self._requirement, files):
+                if requirement:
+                    yield requirement
+
+    @staticmethod
+    def _metadata_file(entry: os.DirEntry) -> Optional[str]:
+        if not entry.name.endswith(METADATA_SUFFIXES):
+            return None
+        if entry.name.endswith(".dist-info"):
+            return os.path.join(entry.path, "METADATA")
+        # eggs installed by setup.py develop or old pip have a single PKG-INFO file instead
+        if entry.is_dir():
+            return os.path.join(entry.path, "PKG-INFO")
+        return entry.path
+
+    @staticmethod
+    def _requirement(site_file: Tuple[str, str]) -> Optional[Requirement]:
+        site_directory, path = site_file
+        try:
+            headers = read_metadata_headers(path)
+        except OSError as e:
+            logger.debug(f"Couldn't read metadata file: {path}. Error: {e}")
+            return None
+        if not headers:
+            logger.debug(f"No name or version in metadata file: {path}.")
+            return None
+        name, version = headers
+        # images share most of their packages, and every package of a site directory its path
+        return Requirement(
+            sys.intern(name), sys.intern(version), source=sys.intern(display_path(site_directory))
+        )
@@ -0,0 +1,59 @@
+from collections import deque
+from dataclasses import dataclass, field
+from piprot.utils.tracing import percentile
+from typing import Deque
+from urllib.parse import urlsplit
+
+
+# an index is hedged once it's slower than this share of its recent responses
+HEDGE_PERCENTILE = 0.95
+# how many recent response times the hedge delay is worked out from, and how many it needs
+# before the configured delay is replaced
+LATENCY_WINDOW = 256
+MIN_LATENCY_SAMPLES = 20
+# hedging sooner than this would mostly duplicate requests that were about to finish
+MIN_HEDGE_DELAY = 0.01
+
+
+@dataclass
+class IndexStats:
+    requests: int = 0
+    failures: int = 0
+    # requests that were duplicated to the next index because this one was slow
+    hedged: int = 0
+    # requests this index gave the answer to
+    wins: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def record(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+
+    def hedge_delay(self, default: float) -> float:
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return default
+        return max(MIN_HEDGE_DELAY, percentile(sorted(self.latencies), HEDGE_PERCENTILE))
+
+
+@dataclass
+class PackageIndex:
+    # an index serving the PyPI JSON API under url, like https://pypi.org/pypi or a mirror
+    # of it; lower priorities are asked first
+    url: str
+    priority: int = 0
+    stats: IndexStats = field(default_factory=IndexStats, compare=False, repr=False)
+
+    @property
+    def name(self) -> str:
+        return urlsplit(self.url).netloc or self.url
+
+    def project_url(self, package: str) -> str:
+        return f"{self.url.rstrip('/')}/{package}/json"
+
+    def summary(self) -> str:
+        latencies = sorted(self.stats.latencies)
+        return (
+            f"{self.name}: {self.stats.requests} requests, {self.stats.wins} answered, "
+            f"{self.stats.hedged} hedged, {self.stats.failures} failed, "
+            f"p50 {percentile(latencies, 0.5) * 1000:.0f}ms, "
+            f"p95 {percentile(latencies, 0.95) * 1000:.0f}ms"
+        )
@@ -0,0 +1,99 @@
+import json
+
+from datetime import date
+from piprot.models.release_index import ReleaseIndex
+from piprot.utils.requirements import canonicalize_name
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+JsonDecoder = Callable[[bytes], Any]
+
+SDIST_EXTENSIONS = (".tar.gz", ".tar.bz2", ".tar.xz", ".tar", ".tgz", ".zip")
+
+
+def _slim_object(obj: Dict[str, Any]) -> Any:
+    # file entries are the bulk of a project document (urls, digests, sizes...), but all we
+    # ever need from them is the upload time, so they're dropped as soon as they're decoded
+    if "filename" in obj:
+        if "upload_time" in obj:
+            return obj["upload_time"]
+        if "upload-time" in obj:
+            return obj["filename"], obj["upload-time"]
+    return obj
+
+
+_slim_decoder = json.JSONDecoder(object_hook=_slim_object)
+
+
+def slim_json_loads(body: bytes) -> Any:
+    return _slim_decoder.decode(body.decode("utf-8"))
+
+
+JSON_DECODERS: Dict[str, JsonDecoder] = {"json": slim_json_loads}
+if orjson is not None:  # pragma: no cover
+    JSON_DECODERS["orjson"] = orjson.loads
+DEFAULT_JSON_DECODER = "json"
+
+
+def _upload_ordinal(upload_time: Optional[str]) -> Optional[int]:
+    if not upload_time:
+        return None
+    return date.fromisoformat(upload_time[:10]).toordinal()
+
+
+def index_from_json_api(document: Dict[str, Any]) -> ReleaseIndex:
+    releases: Dict[str, Optional[int]] = {}
+    for version, files in document["releases"].items():
+        upload_time = None
+        if files:
+            upload_time = files[0]
+            if isinstance(upload_time, dict):
+                upload_time = upload_time.get("upload_time")
+        releases[version] = _upload_ordinal(upload_time)
+
+    info = document["info"]
+    return ReleaseIndex(info.get("name"), info.get("stable_version"), releases)
+
+
+def index_from_simple_api(document: Dict[str, Any]) -> ReleaseIndex:
+    name = document["name"]
+    releases: Dict[str, Optional[int]] = {version: None for version in document.get("versions", [])}
+    for file in document["files"]:
+        if isinstance(file, dict):
+            filename, upload_time = file["filename"], file.get("upload-time")
+        else:
+            filename, upload_time = file
+        version = version_from_filename(name, filename)
+        if version is None:
+            continue
+        # the first upload of any of the files is when the version got released
+        ordinal = _upload_ordinal(upload_time)
+        earliest = releases.get(version)
+        if earliest is None or (ordinal is not None and ordinal < earliest):
+            earliest = ordinal
+        releases[version] = earliest
+    return ReleaseIndex(name, None, releases)
+
+
+def version_from_filename(name: str, filename: str) -> Optional[str]:
+    if filename.endswith((".whl", ".egg")):
+        parts = filename.split("-")
+        return parts[1] if len(parts) > 2 else None
+
+    for extension in SDIST_EXTENSIONS:
+        if filename.endswith(extension):
+            stem = filename[: -len(extension)]
+            break
+    else:
+        return None
+
+    cut = len(name)
+    if stem[cut : cut + 1] == "-" and canonicalize_name(stem[:cut]) == canonicalize_name(name):
+        return stem[cut + 1 :] or None
+    _, separator, version = stem.rpartition("-")
+    return version if separator and version else None
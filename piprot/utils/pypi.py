@@ -1,80 +1,617 @@
-import aiohttp
+import asyncio
 import logging
+import time
 
-from datetime import datetime, date
-from piprot.models import Requirement, PiprotVersion
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import date
+from piprot.models import Requirement, PiprotVersion, PackageInfo, ReleaseIndex
+from piprot.utils.cache import CacheEntry, MetadataCache, Resolution
+from piprot.utils.changelog import (
+    MAX_CHANGELOG_EVENTS,
+    Changelog,
+    InvalidXmlRpcResponse,
+    xmlrpc_request,
+    xmlrpc_response,
+)
+from piprot.utils.indexes import PackageIndex
+from piprot.utils.metadata import (
+    DEFAULT_JSON_DECODER,
+    JSON_DECODERS,
+    JsonDecoder,
+    index_from_json_api,
+    index_from_simple_api,
+)
+from piprot.utils.release_db import DatabaseBackend
+from piprot.utils.requirements import canonicalize_name
+from piprot.utils.scheduler import FetchError, FetchScheduler, parse_retry_after
+from piprot.utils.tracing import Profiler
 
-from typing import Tuple, Optional
+from typing import TYPE_CHECKING, ContextManager, Dict, List, Sequence, Tuple, Optional
+
+if TYPE_CHECKING:
+    import aiohttp
 
 
 logger = logging.getLogger(__name__)
 
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+SIMPLE_API_CONTENT_TYPE = "application/vnd.pypi.simple.v1+json"
+# seconds an index is given before the next one is asked as well, until there are enough
+# response times to adapt it to
+DEFAULT_HEDGE_AFTER = 0.5
+
+
+@dataclass
+class ConnectionStats:
+    requests: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+
+    @property
+    def reuse_ratio(self) -> float:
+        if not self.requests:
+            return 0.0
+        return self.connections_reused / self.requests
+
 
 class PypiPackageInfoDownloader:
     PYPI_BASE_URL = "https://pypi.org/pypi"
+    SIMPLE_BASE_URL = "https://pypi.org/simple"
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_connections_per_host: int = 20,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: int = 300,
+        cache: Optional[MetadataCache] = None,
+        offline: bool = False,
+        scheduler: Optional[FetchScheduler] = None,
+        api: str = "json",
+        json_decoder: JsonDecoder = JSON_DECODERS[DEFAULT_JSON_DECODER],
+        profiler: Optional[Profiler] = None,
+        session: Optional["aiohttp.ClientSession"] = None,
+        use_changelog: bool = True,
+        backend: Optional[DatabaseBackend] = None,
+        indexes: Optional[Sequence[PackageIndex]] = None,
+        hedge_after: Optional[float] = DEFAULT_HEDGE_AFTER,
+    ) -> None:
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.cache = cache
+        self.offline = offline
+        self.scheduler = scheduler or FetchScheduler()
+        self.api = api
+        self.json_decoder = json_decoder
+        self.profiler = profiler
+        # with a cache, stale entries the index changelog says haven't changed are reused
+        self.use_changelog = use_changelog
+        self.changelog: Optional[Changelog] = None
+        # projects are resolved from the backend instead of PyPI when there's one
+        self.backend = backend
+        # JSON API indexes to ask instead of PYPI_BASE_URL, each with its own connection pool;
+        # with hedge_after set a slow index gets a duplicate request to the next one
+        self.indexes: List[PackageIndex] = sorted(indexes or [], key=lambda index: index.priority)
+        self.hedge_after = hedge_after
+        self.stats = ConnectionStats()
+        # a session handed in belongs to the caller, it's neither traced nor closed here
+        self._external_session = session
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._index_sessions: Dict[str, "aiohttp.ClientSession"] = {}
+        self._users = 0
+        self._projects: Dict[str, "asyncio.Future[Optional[ReleaseIndex]]"] = {}
+        # how many lookups wait for each of the fetches in _projects
+        self._waiters: Counter = Counter()
+        self._changelog_sync: Optional["asyncio.Future[Optional[Changelog]]"] = None
+
+    def __getstate__(self) -> dict:
+        # a copy for a worker process: the settings and stats, none of the sessions and lookups
+        state = self.__dict__.copy()
+        state.update(
+            profiler=None,
+            _external_session=None,
+            _session=None,
+            _index_sessions={},
+            _users=0,
+            _projects={},
+            _waiters=Counter(),
+            _changelog_sync=None,
+        )
+        return state
+
+    async def __aenter__(self) -> "PypiPackageInfoDownloader":
+        # nested and repeated uses share the session, it's closed when the last one exits;
+        # every use is a run of the scheduler's, with a total timeout of its own
+        await self.scheduler.__aenter__()
+        self._users += 1
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.scheduler.__aexit__(*exc_info)
+        self._users -= 1
+        if self._users <= 0:
+            await self.close()
+
+    async def close(self) -> None:
+        self._users = 0
+        # fetches still running have nobody to hand their result to, and no session to use
+        unfinished = [
+            future
+            for future in (*self._projects.values(), self._changelog_sync)
+            if future is not None and not future.done()
+        ]
+        for future in unfinished:
+            future.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+        self._projects.clear()
+        self._waiters.clear()
+        self._changelog_sync = None
+        if self._session is not None and self._session is not self._external_session:
+            await self._session.close()
+        self._session = None
+        for session in self._index_sessions.values():
+            await session.close()
+        self._index_sessions.clear()
+
+    @property
+    def session(self) -> "aiohttp.ClientSession":
+        self._check_entered()
+        # created on first use, runs that never go to the network don't need one
+        if self._session is None:
+            self._session = self._external_session or self._create_session()
+        return self._session
+
+    def _check_entered(self) -> None:
+        if self._users <= 0:
+            raise RuntimeError(
+                f"{self.__class__.__name__} has to be used as an async context manager."
+            )
+
+    def _index_session(self, index: PackageIndex) -> "aiohttp.ClientSession":
+        # the first index uses the main session, the others get a pool of their own
+        if index is self.indexes[0]:
+            return self.session
+        self._check_entered()
+        session = self._index_sessions.get(index.url)
+        if session is None:
+            session = self._index_sessions[index.url] = self._create_session()
+        return session
+
+    def _create_session(self) -> "aiohttp.ClientSession":
+        # aiohttp is only imported once a session is needed, which keeps startup fast
+        import aiohttp
+
+        trace_configs = [self._create_trace_config()]
+        if self.profiler:
+            trace_configs.append(self.profiler.trace_config())
+        return aiohttp.ClientSession(
+            connector=self._create_connector(), trace_configs=trace_configs
+        )
+
+    def _create_connector(self) -> "aiohttp.TCPConnector":
+        import aiohttp
+
+        return aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            resolver=aiohttp.AsyncResolver(),
+        )
+
+    def _create_trace_config(self) -> "aiohttp.TraceConfig":
+        import aiohttp
+
+        async def on_request_start(session, context, params) -> None:
+            self.stats.requests += 1
+
+        async def on_connection_create_end(session, context, params) -> None:
+            self.stats.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params) -> None:
+            self.stats.connections_reused += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
 
     async def version_and_release_date(
         self, requirement: Requirement
     ) -> Tuple[Optional[PiprotVersion], Optional[date]]:
 
-        info = await self._get_info_from_pypi(requirement)
-        if not info:
+        index = await self.project_info(requirement.package)
+        if not index:
             return None, None
+        return self._version_and_release_date(index, requirement.version)
 
-        if not requirement.version:
-            version = self._extract_version_from_response(info)
-        else:
-            version = PiprotVersion(requirement.version)
-        release_date = self._extract_release_date(info, version)
-        return version, release_date
-
-    def _extract_version_from_response(self, info: dict) -> PiprotVersion:
-        version = info["info"].get("stable_version")
-        if version:
-            return PiprotVersion(version)
-
-        all_versions = [PiprotVersion(v) for v in info["releases"].keys()]
-        stable_versions = list(filter(lambda v: not v.is_prerelease(), all_versions))
-        if stable_versions:
-            version = max(stable_versions)
-        else:
-            # if there are no stable versions, try with a prereleases
-            version = max(all_versions)
-        return version
+    async def package_info(self, requirement: Requirement) -> PackageInfo:
+        index = await self.project_info(requirement.package)
+        if not index:
+            return PackageInfo(requirement.package, None, None, None, None)
+
+        with self._timer("compare", canonicalize_name(requirement.package)):
+            latest_version, latest_ordinal = self._version_and_release_ordinal(index)
+            current_version, current_ordinal = self._version_and_release_ordinal(
+                index, requirement.version
+            )
+            releases_behind, first_newer_ordinal = None, 0
+            if latest_version and current_version:
+                timeline = index.timeline(
+                    latest_version.is_prerelease() or current_version.is_prerelease()
+                )
+                releases_behind = timeline.releases_between(current_version, latest_version)
+                first_newer_ordinal = timeline.first_ordinal_after(current_version)
+        return PackageInfo.from_ordinals(
+            name=requirement.package,
+            latest_version=latest_version,
+            latest_release_ordinal=latest_ordinal,
+            current_version=current_version,
+            current_release_ordinal=current_ordinal,
+            releases_behind=releases_behind,
+            first_newer_release_ordinal=first_newer_ordinal,
+        )
 
-    def _extract_release_date(self, info: dict, version: PiprotVersion) -> Optional[date]:
+    async def project_info(self, package: str) -> Optional[ReleaseIndex]:
+        # concurrent and repeated lookups of the same project share a single fetch
+        key = canonicalize_name(package)
+        future = self._projects.get(key)
+        if future is None:
+            future = self._projects[key] = asyncio.ensure_future(
+                self._get_info_from_pypi(Requirement(package))
+            )
+        self._waiters[key] += 1
         try:
-            release_date = info["releases"][str(version)][0]["upload_time"]
-        except (KeyError, IndexError):
-            name = info["info"].get("name")
+            return await asyncio.shield(future)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                # every lookup waiting for it was cancelled, e.g. by --fail-fast; a later
+                # lookup fetches the project again
+                if not future.done():
+                    future.cancel()
+                    if self._projects.get(key) is future:
+                        del self._projects[key]
+
+    async def refresh(self) -> None:
+        # fetches every known project again; lookups keep getting the previous data until
+        # the new one is in, and keep it if the refresh fails
+        keys = [key for key, future in self._projects.items() if future.done()]
+        self._changelog_sync = None
+        async with self.scheduler:
+            indexes = await asyncio.gather(
+                *(self._get_info_from_pypi(Requirement(key)) for key in keys)
+            )
+        loop = asyncio.get_running_loop()
+        for key, index in zip(keys, indexes):
+            if index is not None:
+                self._projects[key] = loop.create_future()
+                self._projects[key].set_result(index)
+
+    def _version_and_release_date(
+        self, index: ReleaseIndex, version_string: str = ""
+    ) -> Tuple[Optional[PiprotVersion], Optional[date]]:
+        version, ordinal = self._version_and_release_ordinal(index, version_string)
+        return version, date.fromordinal(ordinal) if ordinal else None
+
+    def _version_and_release_ordinal(
+        self, index: ReleaseIndex, version_string: str = ""
+    ) -> Tuple[Optional[PiprotVersion], int]:
+        if not version_string:
+            version = index.latest_version()
+        elif version_string not in index.releases:
+            return None, 0
+        else:
+            version = PiprotVersion(version_string)
+
+        if version is None:
+            return None, 0
+        ordinal = index.releases.get(str(version))
+        if not ordinal:
             logger.debug(
-                f"Failed to extract release date for version: {name} {version}. "
+                f"Failed to extract release date for version: {index.name} {version}. "
                 f"No upload time available."
             )
+        return version, ordinal or 0
+
+    async def _get_info_from_pypi(self, requirement: Requirement) -> Optional[ReleaseIndex]:
+        if self.backend:
+            index = await self.backend.lookup(requirement.package)
+            if index is None:
+                logger.debug(f"No release data for package: {requirement.package} in database.")
+            return index
+
+        # projects are asked for by their normalized name, which is what indexes serve them
+        # under, instead of being redirected there or not found
+        package = canonicalize_name(requirement.package)
+        project_url = url = self.project_url(package)
+        resolution = self._resolution(project_url)
+        if resolution and resolution.location is None:
+            logger.debug(f"Package: {package} wasn't found when last asked for.")
+            return None
+        if resolution and not self._uses_indexes:
+            url = resolution.location
+        cached = self._cached(url)
+        if cached and (self.offline or cached.is_fresh(self.cache.ttl)):
+            self.cache.stats.hits += 1
+            return ReleaseIndex.from_dict(cached.payload)
+        if self.offline:
+            if self.cache:
+                self.cache.stats.misses += 1
+            logger.debug(f"No cached PyPI info for package: {requirement.package} in offline mode.")
+            return None
+
+        changelog = await self._current_changelog()
+        if cached and changelog and changelog.is_current(requirement.package, cached.serial):
+            self.cache.stats.hits += 1
+            cached.serial = changelog.serial
+            self.cache.touch(cached)
+            return ReleaseIndex.from_dict(cached.payload)
+
+        fetch = self._hedged_fetch if self._uses_indexes else self._fetch
+        try:
+            index = await self.scheduler.run(lambda: fetch(url, cached, package), name=package)
+        except FetchError as e:
+            logger.warning(f"Couldn't get PyPI info for package: {requirement.package}. Error: {e}")
+            return None
+        if index is None and self.cache:
+            self.cache.set_resolution(project_url, None)
+        return index
+
+    def _resolution(self, project_url: str) -> Optional[Resolution]:
+        if not self.cache:
+            return None
+        resolution = self.cache.get_resolution(project_url)
+        if resolution is None:
             return None
-        return datetime.strptime(release_date, "%Y-%m-%dT%H:%M:%S").date()
+        if not (self.offline or resolution.is_fresh(self.cache.resolution_ttl)):
+            return None
+        self.cache.stats.resolved += 1
+        return resolution
+
+    async def _current_changelog(self) -> Optional[Changelog]:
+        # synced once per session, before the first request for a project; it's PyPI's, so it
+        # says nothing about projects on other indexes
+        if not (self.cache and self.use_changelog) or self._uses_indexes:
+            return None
+        if self._changelog_sync is None:
+            self._changelog_sync = asyncio.ensure_future(self._sync_changelog())
+        return await asyncio.shield(self._changelog_sync)
+
+    async def _sync_changelog(self) -> Optional[Changelog]:
+        since = self.cache.last_serial()
+        try:
+            if since is None:
+                serial = await self._xmlrpc("changelog_last_serial")
+                changelog = Changelog(serial, serial)
+            else:
+                events = await self._xmlrpc("changelog_since_serial", since)
+                changelog = Changelog.from_events(since, events)
+                if len(events) >= MAX_CHANGELOG_EVENTS:
+                    # too far behind to tell what changed, start over from here
+                    changelog = Changelog(changelog.serial, changelog.serial)
+        except (FetchError, InvalidXmlRpcResponse, TypeError, ValueError) as e:
+            logger.debug(f"Couldn't get the index changelog. Error: {e}")
+            return None
+
+        logger.debug(
+            f"Index changelog from serial {changelog.since} to {changelog.serial}: "
+            f"{len(changelog.changed)} changed projects."
+        )
+        self.changelog = changelog
+        self.cache.set_last_serial(changelog.serial)
+        return changelog
+
+    async def _xmlrpc(self, method: str, *params):
+        return await self.scheduler.run(lambda: self._call_xmlrpc(method, params), name=method)
+
+    async def _call_xmlrpc(self, method: str, params: tuple):
+        import aiohttp
 
-    async def _get_info_from_pypi(self, requirement: Requirement) -> Optional[dict]:
-        url = PypiPackageInfoDownloader.pypi_url(requirement)
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 404:
-                        return await self._handle_404(response, url)
-                    return await response.json()
+            async with self.session.post(
+                self.PYPI_BASE_URL,
+                data=xmlrpc_request(method, *params),
+                headers={"Content-Type": "text/xml"},
+            ) as response:
+                if response.status in RETRYABLE_STATUSES:
+                    raise FetchError(
+                        f"status_{response.status}",
+                        retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                    )
+                if response.status != 200:
+                    raise FetchError(f"status_{response.status}", retryable=False)
+                body = await response.read()
         except aiohttp.ClientError as e:
-            logger.debug(f"Couldn't get PyPI info for package: {requirement.package}. Error: {e}")
+            raise FetchError(type(e).__name__)
+        return xmlrpc_response(body)
+
+    def _serial(self, response: "aiohttp.ClientResponse") -> Optional[int]:
+        # the response is current as of the project's last serial, and of the changelog
+        # synced before it was requested
+        serials = []
+        header = response.headers.get("X-PyPI-Last-Serial", "")
+        if header.isdigit():
+            serials.append(int(header))
+        if self.changelog:
+            serials.append(self.changelog.serial)
+        return max(serials, default=None)
+
+    def _cached(self, url: str) -> Optional[CacheEntry]:
+        if not self.cache:
             return None
+        cached = self.cache.get(url)
+        try:
+            # also weeds out entries written in an older format
+            if cached:
+                ReleaseIndex.from_dict(cached.payload)
+        except (KeyError, TypeError):
+            return None
+        return cached
+
+    @property
+    def _uses_indexes(self) -> bool:
+        return bool(self.indexes) and self.api == "json"
 
-    async def _handle_404(self, response: aiohttp.ClientResponse, url: str) -> Optional[dict]:
-        root_url = url.rpartition("/")[0]
-        async with aiohttp.ClientSession() as session:
-            async with session.head(root_url) as res:
-                if res.status == 301:
-                    new_location = f"{res.headers['location']}/json"
-                    return await session.get(new_location).json()
+    async def _hedged_fetch(
+        self, url: str, cached: Optional[CacheEntry], package: str
+    ) -> Optional[ReleaseIndex]:
+        # indexes are asked in order of priority; the next one is asked as well when the last
+        # one asked takes longer than it usually does, or right away when all asked so far
+        # failed or don't have the project; the first index with an answer wins
+        pending: Dict["asyncio.Future[Optional[ReleaseIndex]]", PackageIndex] = {}
+        error: Optional[FetchError] = None
+        asked = 0
+
+        def ask_next() -> None:
+            nonlocal asked
+            index = self.indexes[asked]
+            asked += 1
+            future = asyncio.ensure_future(self._fetch(url, cached, package, index))
+            pending[future] = index
+
+        try:
+            while pending or asked < len(self.indexes):
+                if not pending:
+                    ask_next()
+                    continue
+                timeout = None
+                if self.hedge_after is not None and asked < len(self.indexes):
+                    timeout = self.indexes[asked - 1].stats.hedge_delay(self.hedge_after)
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    self.indexes[asked - 1].stats.hedged += 1
+                    ask_next()
+                    continue
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except FetchError as e:
+                        index.stats.failures += 1
+                        error = e
+                        continue
+                    if result is not None:
+                        index.stats.wins += 1
+                        return result
+        finally:
+            for future in pending:
+                future.cancel()
+        if error:
+            raise error
         return None
 
+    async def _fetch(
+        self,
+        url: str,
+        cached: Optional[CacheEntry],
+        package: str = "",
+        package_index: Optional[PackageIndex] = None,
+    ) -> Optional[ReleaseIndex]:
+        # url is what the response is cached under, it's also requested unless it's asked from
+        # one of the configured indexes
+        import aiohttp
+
+        label = canonicalize_name(package)
+        request_url, session = url, self.session
+        if package_index:
+            request_url = package_index.project_url(package)
+            session = self._index_session(package_index)
+            package_index.stats.requests += 1
+        headers = dict(self._accept_headers())
+        if cached and cached.origin == request_url:
+            headers.update(cached.conditional_headers())
+        started = time.perf_counter()
+        try:
+            async with session.get(
+                request_url, headers=headers, trace_request_ctx={"package": label}
+            ) as response:
+                if response.status in RETRYABLE_STATUSES:
+                    raise FetchError(
+                        f"status_{response.status}",
+                        retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                    )
+                if response.status == 304 and cached:
+                    self.cache.stats.revalidated += 1
+                    self._record_latency(package_index, started)
+                    cached.serial = self._serial(response)
+                    self.cache.touch(cached)
+                    return ReleaseIndex.from_dict(cached.payload)
+                if self.cache:
+                    self.cache.stats.misses += 1
+                if response.status == 404:
+                    return None
+                if response.status != 200:
+                    raise FetchError(f"status_{response.status}", retryable=False)
+                with self._timer("download", label):
+                    body = await response.read()
+                self._record_latency(package_index, started)
+                with self._timer("decode", label):
+                    index = self._decode(body)
+                if self.cache and response.history and request_url == url:
+                    # the project has moved, later runs go straight to where it is now
+                    url = str(response.url)
+                    self.cache.set_resolution(request_url, url)
+                if self.cache:
+                    self.cache.set(
+                        CacheEntry(
+                            url=url,
+                            payload=index.to_dict(),
+                            stored_at=time.time(),
+                            etag=response.headers.get("ETag"),
+                            last_modified=response.headers.get("Last-Modified"),
+                            serial=self._serial(response),
+                            origin=request_url if package_index else url,
+                        )
+                    )
+                return index
+        except aiohttp.ClientError as e:
+            logger.debug(f"Request to {request_url} failed. Error: {e!r}")
+            raise FetchError(type(e).__name__)
+
+    @staticmethod
+    def _record_latency(package_index: Optional[PackageIndex], started: float) -> None:
+        if package_index:
+            package_index.stats.record(time.perf_counter() - started)
+
+    def _decode(self, body: bytes) -> ReleaseIndex:
+        # the decoded document is only alive until it's boiled down to a release index
+        try:
+            document = self.json_decoder(body)
+            if self.api == "simple":
+                return index_from_simple_api(document)
+            return index_from_json_api(document)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.debug(f"Couldn't decode PyPI response. Error: {e!r}")
+            raise FetchError("invalid_response", retryable=False)
+
+    def _timer(self, phase: str, label: str) -> ContextManager[None]:
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.timer(phase, label)
+
+    def _accept_headers(self) -> Dict[str, str]:
+        if self.api == "simple":
+            return {"Accept": SIMPLE_API_CONTENT_TYPE}
+        return {}
+
+    def project_url(self, package: str) -> str:
+        package = canonicalize_name(package)
+        if self._uses_indexes:
+            return self.indexes[0].project_url(package)
+        if self.api == "simple":
+            return f"{self.SIMPLE_BASE_URL}/{package}/"
+        return self.pypi_url(Requirement(package))
+
     @classmethod
     def pypi_url(cls, requirement: Requirement) -> str:
         if requirement.version:
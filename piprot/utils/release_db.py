@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+
+from array import array
+from itertools import islice
+from piprot.models import ReleaseIndex
+from piprot.utils.metadata import index_from_json_api
+from piprot.utils.requirements import canonicalize_name
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT PRIMARY KEY,
+    display_name TEXT NOT NULL,
+    -- the latest stable version, or the latest one if there's no stable release
+    stable_version TEXT,
+    -- newline separated versions and their upload dates as packed ordinals, 0 for none;
+    -- a lot quicker to turn back into a release index than JSON
+    versions TEXT NOT NULL,
+    dates BLOB NOT NULL
+) WITHOUT ROWID
+"""
+
+IMPORT_BATCH_SIZE = 10_000
+# stays below SQLite's limit of host parameters in a statement
+LOOKUP_BATCH_SIZE = 500
+# how long lookups are collected before they're answered together, in seconds
+LOOKUP_BATCH_DELAY = 0.001
+
+
+def _batches(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def index_from_record(record: dict) -> ReleaseIndex:
+    # a dump line is either a PyPI JSON API document or a compact release index
+    if "info" in record:
+        return index_from_json_api(record)
+    return ReleaseIndex.from_dict(record)
+
+
+class PackedReleases(Mapping):
+    # version -> upload date ordinal mapping, decoded from its stored form only once it's
+    # actually used; plenty of looked up projects never need more than the stable version
+    __slots__ = ("_versions", "_dates", "_releases")
+
+    def __init__(self, versions: str, dates: bytes) -> None:
+        self._versions = versions
+        self._dates = dates
+        self._releases: Optional[Dict[str, Optional[int]]] = None
+
+    def _decoded(self) -> Dict[str, Optional[int]]:
+        if self._releases is None:
+            versions = self._versions.split("\n") if self._versions else []
+            self._releases = {
+                version: ordinal or None
+                for version, ordinal in zip(versions, array("i", self._dates))
+            }
+        return self._releases
+
+    def __getitem__(self, version: str) -> Optional[int]:
+        return self._decoded()[version]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._decoded())
+
+    def __len__(self) -> int:
+        return len(self._decoded())
+
+
+class ReleaseDatabase:
+    # local, indexed copy of the release data of many projects, one row per project
+    # keyed by its normalized name
+    def __init__(self, path: str) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(SCHEMA)
+        self._connection.commit()
+
+    def __getstate__(self) -> dict:
+        # a worker process opens a connection of its own
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"])
+
+    def import_lines(self, lines: Iterable[str]) -> int:
+        imported = 0
+        self._connection.execute("PRAGMA synchronous = OFF")
+        with self._connection:
+            for batch in _batches(self._rows(lines), IMPORT_BATCH_SIZE):
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?)", batch
+                )
+                imported += len(batch)
+        self._connection.execute("PRAGMA synchronous = FULL")
+        return imported
+
+    def _rows(
+        self, lines: Iterable[str]
+    ) -> Iterator[Tuple[str, str, Optional[str], str, bytes]]:
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            # the whole row is built before it's handed out, so a record without e.g. a name is
+            # skipped rather than failing the import
+            try:
+                index = index_from_record(json.loads(line))
+                # worked out once here rather than on every lookup
+                latest_version = index.latest_version()
+                row = (
+                    canonicalize_name(index.name),
+                    index.name,
+                    str(latest_version) if latest_version else None,
+                    "\n".join(index.releases),
+                    array("i", [ordinal or 0 for ordinal in index.releases.values()]).tobytes(),
+                )
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                logger.warning(f"Skipping invalid record on line {line_number}. Error: {e!r}")
+                continue
+            yield row
+
+    def get(self, name: str) -> Optional[ReleaseIndex]:
+        return self.get_many([name]).get(canonicalize_name(name))
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, ReleaseIndex]:
+        # keyed by normalized name, projects that aren't in the database are left out
+        indexes: Dict[str, ReleaseIndex] = {}
+        keys = {canonicalize_name(name) for name in names}
+        for batch in _batches(keys, LOOKUP_BATCH_SIZE):
+            rows = self._connection.execute(
+                "SELECT name, display_name, stable_version, versions, dates FROM projects "
+                f"WHERE name IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            for key, display_name, stable_version, versions, dates in rows:
+                releases = PackedReleases(versions, dates)
+                indexes[key] = ReleaseIndex(display_name, stable_version, releases)
+        return indexes
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class DatabaseBackend:
+    # resolves projects from a ReleaseDatabase instead of over HTTP; lookups made within
+    # LOOKUP_BATCH_DELAY of each other are answered by one batched query
+    def __init__(self, database: ReleaseDatabase) -> None:
+        self.database = database
+        self.queries = 0
+        self._pending: Dict[str, List["asyncio.Future[Optional[ReleaseIndex]]"]] = {}
+
+    def __getstate__(self) -> dict:
+        return {**self.__dict__, "_pending": {}}
+
+    async def lookup(self, name: str) -> Optional[ReleaseIndex]:
+        loop = asyncio.get_running_loop()
+        if not self._pending:
+            loop.call_later(LOOKUP_BATCH_DELAY, self._flush)
+        future = loop.create_future()
+        self._pending.setdefault(canonicalize_name(name), []).append(future)
+        return await future
+
+    def _flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        self.queries += 1
+        try:
+            indexes = self.database.get_many(pending)
+        except sqlite3.Error as e:
+            logger.warning(f"Couldn't read release database {self.database.path}. Error: {e}")
+            indexes = {}
+        for key, futures in pending.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(indexes.get(key))
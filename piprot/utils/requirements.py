@@ -1,2 +1,22 @@
+import re
+
+from functools import lru_cache
+
+
+CANONICAL_NAME_REGEX = re.compile(r"[-_.]+")
+OPTIONS_REGEX = re.compile(r"\s+--?[a-zA-Z]")
+
+
 def remove_comments(line: str) -> str:
     return line.split("#")[0].strip()
+
+
+def remove_options(line: str) -> str:
+    # per-requirement options, like the --hash ones pip-compile emits
+    return OPTIONS_REGEX.split(line, 1)[0]
+
+
+@lru_cache(maxsize=65536)
+def canonicalize_name(name: str) -> str:
+    # PEP 503 normalized form of a project name
+    return CANONICAL_NAME_REGEX.sub("-", name).lower()
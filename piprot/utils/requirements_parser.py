@@ -1,49 +1,149 @@
+import logging
 import os
+import re
 
-from io import FileIO
-from typing import List, Tuple
+from io import StringIO, TextIOBase
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
 
 from piprot.models import Requirement, NotFrozenRequirement
 from piprot.utils.requirements import remove_comments
 
 
+logger = logging.getLogger(__name__)
+
+INCLUDE_REGEX = re.compile(
+    r"^(?:-r|-c|--requirement|--constraint)(?:\s*=\s*|\s*)(?P<filename>\S+)$"
+)
+
+
+class Include(NamedTuple):
+    filename: str
+    line_number: int
+
+
+Entry = Union[Requirement, Include]
+
+
+class RequirementsGraph:
+    # resolves -r/-c includes; every physical file is read at most once, however many
+    # requirements files refer to it
+    def __init__(self) -> None:
+        self._texts: Dict[str, str] = {}
+        self.reads = 0
+
+    def requirements(self, filename: str) -> Iterator[Requirement]:
+        yield from self._requirements(os.path.abspath(filename), set(), [])
+
+    def load(self, filename: str) -> None:
+        # reads a file ahead of time, e.g. on another thread, without parsing it
+        path = os.path.abspath(filename)
+        if path not in self._texts:
+            self.reads += 1
+            with open(path, "r") as file:
+                self._texts[path] = file.read()
+
+    def _requirements(
+        self, path: str, visited: Set[str], stack: List[str]
+    ) -> Iterator[Requirement]:
+        visited.add(path)
+        stack.append(path)
+        for entry in self._entries(path):
+            if isinstance(entry, Requirement):
+                yield entry
+                continue
+
+            include_path = os.path.join(os.path.dirname(path), entry.filename)
+            include_path = os.path.abspath(include_path)
+            if include_path in stack:
+                logger.debug(f"Skipping circular include of {include_path} in {path}.")
+            elif include_path in visited:
+                continue
+            elif not os.path.isfile(include_path):
+                logger.warning(
+                    f"Couldn't find {entry.filename} included in {path}:{entry.line_number}."
+                )
+            else:
+                yield from self._requirements(include_path, visited, stack)
+        stack.pop()
+
+    def _entries(self, path: str) -> Iterator[Entry]:
+        # the text of a file is kept rather than the entries parsed out of it, which take
+        # several times the memory; a file that's included again is scanned again
+        text = self._texts.get(path)
+        if text is not None:
+            yield from self._scan(path, StringIO(text))
+            return
+
+        # entries are handed out while the file is still being read, its text is kept
+        # only once it's been read in full
+        lines: List[str] = []
+        self.reads += 1
+        with open(path, "r") as file:
+            yield from self._scan(path, self._kept(file, lines))
+        self._texts[path] = "".join(lines)
+
+    @staticmethod
+    def _kept(file: TextIOBase, lines: List[str]) -> Iterator[str]:
+        for line in file:
+            lines.append(line)
+            yield line
+
+    def _scan(self, path: str, file: Iterable[str]) -> Iterator[Entry]:
+        source = display_path(path)
+        for line_number, line in self._logical_lines(file):
+            include = INCLUDE_REGEX.match(remove_comments(line))
+            if include:
+                filename = include.group("filename")
+                if "://" in filename:
+                    logger.debug(f"Skipping remote include of {filename} in {path}.")
+                else:
+                    yield Include(filename, line_number)
+                continue
+
+            try:
+                yield Requirement.from_line(line, source, line_number)
+            except NotFrozenRequirement:
+                continue
+
+    @staticmethod
+    def _logical_lines(file: Iterable[str]) -> Iterator[Tuple[int, str]]:
+        # joins lines continued with a trailing backslash, a comment ends the continuation
+        parts: List[str] = []
+        start: Optional[int] = None
+        for line_number, line in enumerate(file, start=1):
+            line = line.rstrip("\r\n")
+            if start is None:
+                start = line_number
+            if line.endswith("\\") and not line.lstrip().startswith("#"):
+                parts.append(line[:-1])
+                continue
+            if parts and line.lstrip().startswith("#"):
+                yield start, "".join(parts)
+                parts, start = [], line_number
+            parts.append(line)
+            yield start, "".join(parts)
+            parts, start = [], None
+        if parts:
+            yield start, "".join(parts)
+
+
+def display_path(path: str) -> str:
+    try:
+        relative_path = os.path.relpath(path)
+    except ValueError:
+        return path
+    return path if relative_path.startswith(os.pardir) else relative_path
+
+
 class RequirementsParser:
-    def __init__(self, requirements_filename: str) -> None:
+    def __init__(
+        self, requirements_filename: str, graph: Optional[RequirementsGraph] = None
+    ) -> None:
         self.requirements_filename = requirements_filename
+        self.graph = graph or RequirementsGraph()
 
     def parse(self) -> List[Requirement]:
-        with open(self.requirements_filename, "r") as file:
-            requirements, to_recurse = self._parse_file(file)
-
-        for filename in to_recurse:
-            filename = self._clean_recursive_requirements_line(filename)
-            full_path = self._get_recursive_requirement_file_full_path(filename)
-            with open(full_path, "r") as file:
-                recursed_requirements, _ = self._parse_file(file)
-            requirements.extend(recursed_requirements)
-        return requirements
-
-    def _parse_file(self, file: FileIO) -> Tuple[List[Requirement], List[str]]:
-        requirements: List[Requirement] = []
-        to_recurse: List[str] = []
-
-        for line in file.readlines():
-            try:
-                requirements.append(Requirement.from_line(line))
-            except NotFrozenRequirement:
-                if line.startswith("-r "):
-                    to_recurse.append(remove_comments(line))
-                else:
-                    continue
-        return requirements, to_recurse
-
-    def _clean_recursive_requirements_line(self, line: str) -> str:
-        # we're sure that the line starts with "-r ", so we're
-        # just stripping first 3 characters
-        return line[3:]
-
-    def _get_recursive_requirement_file_full_path(
-        self, requirements_file_to_recurse_filename: str
-    ) -> str:
-        base_dir = os.path.dirname(os.path.abspath(self.requirements_filename))
-        return os.path.join(base_dir, requirements_file_to_recurse_filename)
+        return list(self)
+
+    def __iter__(self) -> Iterator[Requirement]:
+        return self.graph.requirements(self.requirements_filename)
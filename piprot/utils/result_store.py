@@ -0,0 +1,195 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from dataclasses import dataclass
+from piprot.models import PackageInfo, PiprotVersion, Requirement
+from piprot.utils.requirements import canonicalize_name
+from typing import Dict, Iterable, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    latest_version TEXT,
+    latest_release_date INTEGER,
+    current_version TEXT,
+    current_release_date INTEGER,
+    releases_behind INTEGER,
+    first_newer_release_date INTEGER,
+    stored_at REAL NOT NULL
+)
+"""
+# bumped whenever the results table changes, stored results of older versions are dropped
+SCHEMA_VERSION = 2
+
+# what earlier runs learned about each project, to check the likely rotten and the slow
+# ones first
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    name TEXT PRIMARY KEY,
+    rotten INTEGER NOT NULL DEFAULT 0,
+    fetch_seconds REAL
+)
+"""
+# stays below SQLite's limit of host parameters in a statement
+HISTORY_BATCH_SIZE = 500
+
+
+@dataclass
+class StoredResult:
+    package_info: PackageInfo
+    stored_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.stored_at < ttl
+
+
+@dataclass
+class ResultStoreStats:
+    hits: int = 0
+    stale: int = 0
+    misses: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.stale + self.misses
+
+
+def result_key(requirement: Requirement, delay_in_days: int) -> str:
+    normalized = [
+        canonicalize_name(requirement.package),
+        requirement.version,
+        requirement.ignore,
+        delay_in_days,
+    ]
+    return hashlib.sha256(json.dumps(normalized).encode()).hexdigest()
+
+
+class ResultStore:
+    # remembers the release data each requirement was checked against, so unchanged
+    # requirements don't need PyPI again; results are rebuilt from it, which keeps the
+    # rotten days current
+    def __init__(self, path: str, ttl: float = 3600, max_stale: float = 0) -> None:
+        self.path = path
+        self.ttl = ttl
+        # how long past the ttl a result is still handed out while it's being revalidated
+        self.max_stale = max_stale
+        self.stats = ResultStoreStats()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=10)
+        try:
+            # lets parallel runs read while one of them is writing
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.DatabaseError as e:
+            logger.debug(f"Couldn't switch {path} to WAL mode. Error: {e}")
+        if self._connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._connection.execute("DROP TABLE IF EXISTS results")
+            self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._connection.execute(SCHEMA)
+        self._connection.execute(HISTORY_SCHEMA)
+        self._connection.commit()
+
+    def get(self, requirement: Requirement, delay_in_days: int) -> Optional[StoredResult]:
+        row = self._connection.execute(
+            "SELECT name, latest_version, latest_release_date, current_version, "
+            "current_release_date, releases_behind, first_newer_release_date, stored_at "
+            "FROM results WHERE key = ?",
+            (result_key(requirement, delay_in_days),),
+        ).fetchone()
+        if row is None:
+            return None
+        (
+            name,
+            latest_version,
+            latest_release_date,
+            current_version,
+            current_release_date,
+            releases_behind,
+            first_newer_release_date,
+            stored_at,
+        ) = row
+        package_info = PackageInfo.from_ordinals(
+            name=name,
+            latest_version=_version(latest_version),
+            latest_release_ordinal=latest_release_date or 0,
+            current_version=_version(current_version),
+            current_release_ordinal=current_release_date or 0,
+            releases_behind=releases_behind,
+            first_newer_release_ordinal=first_newer_release_date or 0,
+        )
+        return StoredResult(package_info, stored_at)
+
+    def set(self, requirement: Requirement, delay_in_days: int, package_info: PackageInfo) -> None:
+        # committed in batches by flush()
+        self._connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                result_key(requirement, delay_in_days),
+                package_info.name,
+                _optional_str(package_info.latest_version),
+                package_info.latest_release_ordinal or None,
+                _optional_str(package_info.current_version),
+                package_info.current_release_ordinal or None,
+                package_info.releases_behind,
+                package_info.first_newer_release_ordinal or None,
+                time.time(),
+            ),
+        )
+
+    def record_status(self, package: str, rotten: bool) -> None:
+        self._connection.execute(
+            "INSERT INTO history (name, rotten) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET rotten = excluded.rotten",
+            (canonicalize_name(package), int(rotten)),
+        )
+
+    def record_fetch(self, package: str, seconds: float) -> None:
+        self._connection.execute(
+            "INSERT INTO history (name, fetch_seconds) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET fetch_seconds = excluded.fetch_seconds",
+            (canonicalize_name(package), seconds),
+        )
+
+    def history(self, packages: Iterable[str]) -> Dict[str, Tuple[bool, float]]:
+        # keyed by normalized name: whether it was rotten last time and how long fetching it
+        # took, projects without any history are left out
+        history: Dict[str, Tuple[bool, float]] = {}
+        names = list({canonicalize_name(package) for package in packages})
+        for start in range(0, len(names), HISTORY_BATCH_SIZE):
+            batch = names[start : start + HISTORY_BATCH_SIZE]
+            rows = self._connection.execute(
+                "SELECT name, rotten, fetch_seconds FROM history "
+                f"WHERE name IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            for name, rotten, fetch_seconds in rows:
+                history[name] = (bool(rotten), fetch_seconds or 0.0)
+        return history
+
+    def flush(self) -> None:
+        try:
+            self._connection.commit()
+        except sqlite3.OperationalError as e:
+            logger.debug(f"Couldn't write results to {self.path}. Error: {e}")
+
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
+
+
+def _version(version: Optional[str]) -> Optional[PiprotVersion]:
+    return PiprotVersion(version) if version is not None else None
+
+
+def _optional_str(value: Optional[PiprotVersion]) -> Optional[str]:
+    return str(value) if value is not None else None
+
@@ -0,0 +1,242 @@
+from array import array
+from datetime import date
+from functools import lru_cache
+from piprot.models import CheckResult, PackageInfo, PiprotVersion, Requirement, Status
+from piprot.models.package_info import libyears_between
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+STATUSES = list(Status)
+OUTDATED = array("b", [status in (Status.ROTTEN, Status.NO_DELAY_INFO) for status in STATUSES])
+# rotten days can be negative, when the current release was uploaded after the latest one
+NO_DAYS = -(2 ** 31)
+
+
+class Codes:
+    # interns strings as small integers, the columns only hold the integers
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class ResultTable:
+    # check results as parallel typed arrays, one entry per result: strings are codes into a
+    # single table of interned strings, dates are day ordinals, and 0, -1 or NO_DAYS stand for
+    # unknown; results are built back only when they're asked for
+    def __init__(self, results: Iterable[CheckResult] = ()) -> None:
+        self.strings = Codes()
+        self.package = array("i")
+        self.version = array("i")
+        self.ignore = array("b")
+        self.source = array("i")
+        self.line = array("i")
+        self.name = array("i")
+        self.latest_version = array("i")
+        self.latest_release = array("i")
+        self.current_version = array("i")
+        self.current_release = array("i")
+        self.releases_behind = array("i")
+        self.first_newer_release = array("i")
+        self.status = array("b")
+        self.message = array("i")
+        self.rotten_days = array("i")
+        self._status_codes = {status: code for code, status in enumerate(STATUSES)}
+        for result in results:
+            self.add(result)
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def add(self, result: CheckResult) -> None:
+        requirement, package = result.requirement, result.package
+        self._append(
+            requirement.package,
+            requirement.version,
+            requirement.ignore,
+            requirement.source,
+            requirement.line_number,
+            package.name,
+            str(package.latest_version or ""),
+            package.latest_release_ordinal,
+            str(package.current_version or ""),
+            package.current_release_ordinal,
+            _or(package.releases_behind, -1),
+            package.first_newer_release_ordinal,
+            self._status_codes[result.status],
+            result.message,
+            _or(result.rotten_days, NO_DAYS),
+        )
+
+    def add_dict(self, data: Dict[str, Any]) -> None:
+        # a CheckResult.to_dict() row, e.g. from a daemon's answer, packed without building
+        # the result; every value is converted before any column grows
+        requirement, package = data["requirement"], data["package"]
+        self._append(
+            str(requirement["package"]),
+            str(requirement["version"]),
+            bool(requirement["ignore"]),
+            str(requirement["source"]),
+            int(requirement["line_number"]),
+            str(package["name"]),
+            str(package["latest_version"] or ""),
+            _ordinal(package["latest_release_date"]),
+            str(package["current_version"] or ""),
+            _ordinal(package["current_release_date"]),
+            int(_or(package.get("releases_behind"), -1)),
+            _ordinal(package.get("first_newer_release_date")),
+            self._status_codes[Status(data["status"])],
+            str(data["message"]),
+            int(_or(data["rotten_days"], NO_DAYS)),
+        )
+
+    def _append(
+        self,
+        package: str,
+        version: str,
+        ignore: bool,
+        source: str,
+        line: int,
+        name: str,
+        latest_version: str,
+        latest_release: int,
+        current_version: str,
+        current_release: int,
+        releases_behind: int,
+        first_newer_release: int,
+        status: int,
+        message: str,
+        rotten_days: int,
+    ) -> None:
+        code = self.strings.code
+        self.package.append(code(package))
+        self.version.append(code(version))
+        self.ignore.append(ignore)
+        self.source.append(code(source))
+        self.line.append(line)
+        self.name.append(code(name))
+        self.latest_version.append(code(latest_version))
+        self.latest_release.append(latest_release)
+        self.current_version.append(code(current_version))
+        self.current_release.append(current_release)
+        self.releases_behind.append(releases_behind)
+        self.first_newer_release.append(first_newer_release)
+        self.status.append(status)
+        self.message.append(code(message))
+        self.rotten_days.append(rotten_days)
+
+    def truncate(self, length: int) -> None:
+        # drops the rows from length on; their strings stay interned
+        for column in self._columns():
+            del column[length:]
+
+    def _columns(self) -> List[array]:
+        return [
+            self.package,
+            self.version,
+            self.ignore,
+            self.source,
+            self.line,
+            self.name,
+            self.latest_version,
+            self.latest_release,
+            self.current_version,
+            self.current_release,
+            self.releases_behind,
+            self.first_newer_release,
+            self.status,
+            self.message,
+            self.rotten_days,
+        ]
+
+    def __getitem__(self, row: int) -> CheckResult:
+        strings = self.strings.names
+        requirement = Requirement(
+            strings[self.package[row]],
+            strings[self.version[row]],
+            bool(self.ignore[row]),
+            strings[self.source[row]],
+            self.line[row],
+        )
+        package = PackageInfo.from_ordinals(
+            name=strings[self.name[row]],
+            latest_version=_version(strings[self.latest_version[row]]),
+            latest_release_ordinal=self.latest_release[row],
+            current_version=_version(strings[self.current_version[row]]),
+            current_release_ordinal=self.current_release[row],
+            releases_behind=_unless(self.releases_behind[row], -1),
+            first_newer_release_ordinal=self.first_newer_release[row],
+        )
+        return CheckResult(
+            requirement,
+            package,
+            STATUSES[self.status[row]],
+            strings[self.message[row]],
+            _unless(self.rotten_days[row], NO_DAYS),
+        )
+
+    def __iter__(self) -> Iterator[CheckResult]:
+        for row in range(len(self)):
+            yield self[row]
+
+    @property
+    def outdated(self) -> int:
+        return sum(OUTDATED[status] for status in self.status)
+
+    def first_outdated(self) -> Optional[int]:
+        return next((row for row, status in enumerate(self.status) if OUTDATED[status]), None)
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        # the rows of CheckResult.as_record(), straight from the columns
+        strings = self.strings.names
+        for row in range(len(self)):
+            latest_release, current_release = self.latest_release[row], self.current_release[row]
+            libyears = libyears_between(latest_release, current_release)
+            yield {
+                "package": strings[self.package[row]],
+                "status": STATUSES[self.status[row]].value,
+                "current_version": strings[self.current_version[row]]
+                or strings[self.version[row]]
+                or None,
+                "current_release_date": _isoformat(current_release),
+                "latest_version": strings[self.latest_version[row]] or None,
+                "latest_release_date": _isoformat(latest_release),
+                "rotten_days": _unless(self.rotten_days[row], NO_DAYS),
+                "releases_behind": _unless(self.releases_behind[row], -1),
+                "libyears": round(libyears, 2) if libyears is not None else None,
+                "first_newer_release_date": _isoformat(self.first_newer_release[row]),
+                "source": strings[self.source[row]] or None,
+                "line": self.line[row] or None,
+            }
+
+
+def _or(value: Optional[int], missing: int) -> int:
+    return missing if value is None else value
+
+
+def _unless(value: int, missing: int) -> Optional[int]:
+    return None if value == missing else value
+
+
+def _version(version: str) -> Optional[PiprotVersion]:
+    return PiprotVersion(version) if version else None
+
+
+@lru_cache(maxsize=4096)
+def _ordinal(isoformat: Optional[str]) -> int:
+    return date.fromisoformat(isoformat).toordinal() if isoformat else 0
+
+
+@lru_cache(maxsize=4096)
+def _isoformat(ordinal: int) -> Optional[str]:
+    # there are only so many distinct release dates, however many results
+    return date.fromordinal(ordinal).isoformat() if ordinal else None
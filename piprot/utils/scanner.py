@@ -0,0 +1,83 @@
+import logging
+import os
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fnmatch import fnmatch
+from piprot.models import Requirement
+from piprot.utils.requirements_parser import RequirementsGraph, RequirementsParser
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INCLUDE = ("requirements*.txt", "requirements/*.txt")
+DEFAULT_EXCLUDE = (".git", ".hg", ".tox", ".nox", ".venv", "venv", "node_modules", "site-packages")
+
+
+class RequirementsScanner:
+    def __init__(
+        self,
+        root: str,
+        include: Sequence[str] = DEFAULT_INCLUDE,
+        exclude: Sequence[str] = DEFAULT_EXCLUDE,
+        workers: Optional[int] = None,
+        graph: Optional[RequirementsGraph] = None,
+    ) -> None:
+        self.root = root
+        self.include = include
+        self.exclude = exclude
+        self.workers = workers
+        self.graph = graph or RequirementsGraph()
+
+    def find_files(self) -> Iterator[str]:
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            # prune excluded directories, so we don't even walk into them
+            dirnames[:] = sorted(
+                dirname
+                for dirname in dirnames
+                if not self._matches(os.path.join(dirpath, dirname), self.exclude)
+            )
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                if self._matches(path, self.include) and not self._matches(path, self.exclude):
+                    yield path
+
+    def parse(self) -> Iterator[Tuple[str, List[Requirement]]]:
+        # files are read in parallel and parsed as they come in; includes are resolved from
+        # the already read files, so shared ones are still read just once
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._load_file, path): path for path in self.find_files()}
+            for future in as_completed(futures):
+                path = futures[future]
+                if future.result():
+                    yield path, self._parse_file(path)
+
+    def requirements(self) -> Iterator[Requirement]:
+        for _, requirements in self.parse():
+            yield from requirements
+
+    def _load_file(self, path: str) -> bool:
+        try:
+            self.graph.load(path)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning(f"Couldn't read requirements file: {path}. Error: {e}")
+            return False
+        return True
+
+    def _parse_file(self, path: str) -> List[Requirement]:
+        try:
+            return RequirementsParser(path, self.graph).parse()
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning(f"Couldn't parse requirements file: {path}. Error: {e}")
+            return []
+
+    def _matches(self, path: str, patterns: Iterable[str]) -> bool:
+        relative_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+        basename = os.path.basename(path)
+        for pattern in patterns:
+            if "/" not in pattern:
+                if fnmatch(basename, pattern):
+                    return True
+            elif fnmatch(relative_path, pattern) or fnmatch(relative_path, f"*/{pattern}"):
+                return True
+        return False
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import random
+import time
+
+from collections import Counter
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class FetchError(Exception):
+    def __init__(
+        self, reason: str, retry_after: Optional[float] = None, retryable: bool = True
+    ) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        # a negative balance is a queue of reservations, each waiter sleeps until its turn
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+@dataclass
+class SchedulerStats:
+    retries: Counter = field(default_factory=Counter)
+    failures: Counter = field(default_factory=Counter)
+
+
+class FetchScheduler:
+    def __init__(
+        self,
+        concurrency: int = 20,
+        rate_limit: Optional[float] = None,
+        request_timeout: Optional[float] = 30.0,
+        total_timeout: Optional[float] = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+    ) -> None:
+        self.concurrency = concurrency
+        self.request_timeout = request_timeout
+        self.total_timeout = total_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = SchedulerStats()
+        self._bucket = TokenBucket(rate_limit) if rate_limit else None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deadline: Optional[float] = None
+
+    def __getstate__(self) -> dict:
+        # the semaphore and the deadline belong to the event loop of the run that set them up
+        state = self.__dict__.copy()
+        state.update(_semaphore=None, _loop=None, _deadline=None)
+        return state
+
+    async def __aenter__(self) -> "FetchScheduler":
+        # starts a run: it gets total_timeout of its own, and a scheduler reused on another
+        # event loop, e.g. by a later asyncio.run(), a semaphore of that loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self.total_timeout is not None:
+            self._deadline = time.monotonic() + self.total_timeout
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        # the deadline is left to the next run, runs sharing the scheduler may still be going
+        pass
+
+    async def run(self, fetch: Callable[[], Awaitable[T]], name: str = "") -> T:
+        if self._loop is not asyncio.get_running_loop():
+            # used on its own, outside of any run
+            await self.__aenter__()
+
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(fetch)
+            except FetchError as e:
+                error = e
+
+            if not error.retryable or attempt >= self.max_retries:
+                self.stats.failures[error.reason] += 1
+                raise error
+
+            delay = self._backoff(attempt, error.retry_after)
+            remaining = self._remaining()
+            if remaining is not None and delay >= remaining:
+                self.stats.failures[error.reason] += 1
+                raise error
+
+            attempt += 1
+            self.stats.retries[error.reason] += 1
+            logger.debug(f"Retrying {name} in {delay:.2f}s ({error.reason}, attempt {attempt}).")
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, fetch: Callable[[], Awaitable[T]]) -> T:
+        async with self._semaphore:
+            if self._bucket:
+                await self._bucket.acquire()
+
+            timeout = self.request_timeout
+            remaining = self._remaining()
+            if remaining is not None:
+                if remaining <= 0:
+                    raise FetchError("total_timeout", retryable=False)
+                timeout = remaining if timeout is None else min(timeout, remaining)
+
+            try:
+                return await asyncio.wait_for(fetch(), timeout)
+            except asyncio.TimeoutError:
+                raise FetchError("timeout")
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        # "full jitter" exponential backoff, unless the server told us how long to wait
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _remaining(self) -> Optional[float]:
+        if self._deadline is None:
+            return None
+        return self._deadline - time.monotonic()
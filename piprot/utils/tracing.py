@@ -0,0 +1,193 @@
+import json
+import math
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+T = TypeVar("T")
+
+PHASES = ("parse", "queued", "dns", "connect", "ttfb", "download", "decode", "compare")
+
+
+@dataclass
+class Span:
+    phase: str
+    label: str
+    start: float
+    duration: float
+
+
+@dataclass
+class PackageTiming:
+    phases: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    bytes_received: int = 0
+    bytes_sent: int = 0
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    # nearest-rank percentile, values have to be sorted
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+        self.packages: Dict[str, PackageTiming] = defaultdict(PackageTiming)
+        self._origin = time.perf_counter()
+
+    def record(self, phase: str, label: str, start: float, duration: float) -> None:
+        self.spans.append(Span(phase, label, start - self._origin, duration))
+        if phase != "parse":
+            self.packages[label].phases[phase] += duration
+
+    @contextmanager
+    def timer(self, phase: str, label: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, label, start, time.perf_counter() - start)
+
+    def timed_iter(self, phase: str, label: str, iterable: Iterable[T]) -> Iterator[T]:
+        # the time spent producing items, leaving out the time the consumer holds on to them
+        iterator = iter(iterable)
+        first_start = time.perf_counter()
+        elapsed = 0.0
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                break
+            elapsed += time.perf_counter() - start
+            yield item
+        self.record(phase, label, first_start, elapsed)
+
+    def trace_config(self) -> "aiohttp.TraceConfig":
+        import aiohttp
+
+        def package(context) -> str:
+            return (context.trace_request_ctx or {}).get("package", "")
+
+        def started(phase: str):
+            async def on_start(session, context, params) -> None:
+                setattr(context, f"{phase}_start", time.perf_counter())
+
+            return on_start
+
+        def ended(phase: str):
+            async def on_end(session, context, params) -> None:
+                start = getattr(context, f"{phase}_start", None)
+                if start is not None:
+                    self.record(phase, package(context), start, time.perf_counter() - start)
+
+            return on_end
+
+        async def on_request_start(session, context, params) -> None:
+            context.request_start = time.perf_counter()
+            context.setup = 0.0
+
+        async def on_setup_end(session, context, params) -> None:
+            context.setup = time.perf_counter() - context.request_start
+
+        async def on_request_end(session, context, params) -> None:
+            # time to the response headers, without queueing and connection setup
+            start = context.request_start + context.setup
+            self.record("ttfb", package(context), start, time.perf_counter() - start)
+
+        async def on_request_chunk_sent(session, context, params) -> None:
+            self.packages[package(context)].bytes_sent += len(params.chunk)
+
+        async def on_response_chunk_received(session, context, params) -> None:
+            self.packages[package(context)].bytes_received += len(params.chunk)
+
+        trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=_TraceContext)
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_queued_start.append(started("queued"))
+        trace_config.on_connection_queued_end.append(ended("queued"))
+        trace_config.on_dns_resolvehost_start.append(started("dns"))
+        trace_config.on_dns_resolvehost_end.append(ended("dns"))
+        trace_config.on_connection_create_start.append(started("connect"))
+        trace_config.on_connection_create_end.append(ended("connect"))
+        trace_config.on_connection_create_end.append(on_setup_end)
+        trace_config.on_connection_reuseconn.append(on_setup_end)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_chunk_sent.append(on_request_chunk_sent)
+        trace_config.on_response_chunk_received.append(on_response_chunk_received)
+        return trace_config
+
+    def summary(self, slowest: int = 10) -> List[str]:
+        durations: Dict[str, List[float]] = defaultdict(list)
+        for span in self.spans:
+            durations[span.phase].append(span.duration)
+
+        lines = ["phase          count      p50      p90      p99      max    total (ms)"]
+        for phase in PHASES:
+            values = sorted(durations.get(phase, []))
+            if not values:
+                continue
+            stats = [percentile(values, p) for p in (0.5, 0.9, 0.99)] + [values[-1], sum(values)]
+            lines.append(
+                f"{phase:<12} {len(values):>7} " + " ".join(f"{v * 1000:8.1f}" for v in stats)
+            )
+
+        packages = sorted(self.packages.items(), key=lambda item: item[1].total, reverse=True)
+        lines.append("slowest packages (ms, bytes received):")
+        for name, timing in packages[:slowest]:
+            phases = ", ".join(
+                f"{phase} {timing.phases[phase] * 1000:.1f}"
+                for phase in PHASES
+                if timing.phases.get(phase)
+            )
+            lines.append(
+                f"  {name or '?':<30} {timing.total * 1000:8.1f}  "
+                f"{timing.bytes_received:>10}  ({phases})"
+            )
+        return lines
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        # one lane per label, so concurrent fetches show up side by side
+        lanes: Dict[str, int] = {}
+        events = []
+        for span in self.spans:
+            lane = lanes.setdefault(span.label, len(lanes))
+            events.append(
+                {
+                    "name": span.phase,
+                    "cat": span.phase,
+                    "ph": "X",
+                    "ts": round(span.start * 1_000_000, 1),
+                    "dur": round(span.duration * 1_000_000, 1),
+                    "pid": 1,
+                    "tid": lane,
+                    "args": {"label": span.label},
+                }
+            )
+        for label, lane in lanes.items():
+            events.append(
+                {"name": "thread_name", "ph": "M", "pid": 1, "tid": lane, "args": {"name": label}}
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump_chrome_trace(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.chrome_trace(), file)
+
+
+class _TraceContext:
+    def __init__(self, trace_request_ctx: Optional[Dict[str, Any]] = None) -> None:
+        self.trace_request_ctx = trace_request_ctx
@@ -0,0 +1,112 @@
+import asyncio
+
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from piprot.models import PackageInfo, PiprotVersion, Requirement
+from piprot.utils.pypi import PypiPackageInfoDownloader
+from piprot.utils.requirements import canonicalize_name
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# a (canonical name, version) pair a worker is asked about
+PackageKey = Tuple[str, str]
+# what a worker sends back for one: latest version, its release date ordinal, current version,
+# its release date ordinal, releases behind and first newer release date ordinal; 0 and ""
+# stand for unknown, which pickles a lot smaller than objects do
+CompactPackageInfo = Tuple[str, int, str, int, int, int]
+
+
+def compact(package_info: PackageInfo) -> CompactPackageInfo:
+    return (
+        str(package_info.latest_version or ""),
+        package_info.latest_release_ordinal,
+        str(package_info.current_version or ""),
+        package_info.current_release_ordinal,
+        -1 if package_info.releases_behind is None else package_info.releases_behind,
+        package_info.first_newer_release_ordinal,
+    )
+
+
+def expand(name: str, compact_info: Optional[CompactPackageInfo]) -> PackageInfo:
+    if compact_info is None:
+        return PackageInfo(name, None, None, None, None)
+    latest, latest_date, current, current_date, releases_behind, first_newer = compact_info
+    return PackageInfo.from_ordinals(
+        name=name,
+        latest_version=PiprotVersion(latest) if latest else None,
+        latest_release_ordinal=latest_date,
+        current_version=PiprotVersion(current) if current else None,
+        current_release_ordinal=current_date,
+        releases_behind=None if releases_behind < 0 else releases_behind,
+        first_newer_release_ordinal=first_newer,
+    )
+
+
+def shard(keys: Iterable[PackageKey], shards: int) -> List[List[PackageKey]]:
+    # all versions of a project go to the same worker, so it's fetched once; projects are
+    # dealt out in sorted order, which keeps the shards the same from run to run
+    versions: Dict[str, List[str]] = defaultdict(list)
+    for name, version in sorted(set(keys)):
+        versions[name].append(version)
+    sharded: List[List[PackageKey]] = [[] for _ in range(shards)]
+    for number, name in enumerate(versions):
+        sharded[number % shards].extend((name, version) for version in versions[name])
+    return [keys for keys in sharded if keys]
+
+
+def check_shard(
+    downloader: PypiPackageInfoDownloader, keys: List[PackageKey]
+) -> Tuple[Dict[PackageKey, CompactPackageInfo], PypiPackageInfoDownloader]:
+    # runs in a worker process, with an event loop and a session of its own; the downloader
+    # goes back too, for its stats
+    return asyncio.run(_check_shard(downloader, keys)), downloader
+
+
+async def _check_shard(
+    downloader: PypiPackageInfoDownloader, keys: List[PackageKey]
+) -> Dict[PackageKey, CompactPackageInfo]:
+    async with downloader:
+        infos = await asyncio.gather(
+            *(downloader.package_info(Requirement(name, version)) for name, version in keys)
+        )
+    return {
+        key: compact(info)
+        for key, info in zip(keys, infos)
+        if info.latest_version or info.current_version
+    }
+
+
+async def check_in_workers(
+    downloader: PypiPackageInfoDownloader, keys: Sequence[PackageKey], workers: int
+) -> Dict[PackageKey, CompactPackageInfo]:
+    results: Dict[PackageKey, CompactPackageInfo] = {}
+    shards = shard(keys, workers)
+    if not shards:
+        return results
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+        done = await asyncio.gather(
+            *(loop.run_in_executor(executor, check_shard, downloader, keys) for keys in shards)
+        )
+    for shard_results, worker_downloader in done:
+        results.update(shard_results)
+        _merge_stats(downloader, worker_downloader)
+    return results
+
+
+def package_key(requirement: Requirement) -> PackageKey:
+    return canonicalize_name(requirement.package), requirement.version
+
+
+def _merge_stats(downloader: PypiPackageInfoDownloader, worker: PypiPackageInfoDownloader) -> None:
+    pairs = [(downloader.stats, worker.stats), (downloader.scheduler.stats, worker.scheduler.stats)]
+    if downloader.cache and worker.cache:
+        pairs.append((downloader.cache.stats, worker.cache.stats))
+    for index, worker_index in zip(downloader.indexes, worker.indexes):
+        pairs.append((index.stats, worker_index.stats))
+    for stats, worker_stats in pairs:
+        for field in fields(stats):
+            value = getattr(stats, field.name)
+            if isinstance(value, (int, float, Counter)):
+                setattr(stats, field.name, value + getattr(worker_stats, field.name))
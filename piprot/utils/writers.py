@@ -0,0 +1,118 @@
+import csv
+import json
+import logging
+import sys
+
+from collections import Counter, defaultdict
+from piprot.models import CheckResult, Status
+from piprot.utils.requirements import canonicalize_name
+from piprot.utils.result_table import STATUSES, ResultTable
+from typing import Dict, Optional, Set, TextIO, Type
+
+
+logger = logging.getLogger(__name__)
+
+
+class ResultWriter:
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        self.stream = stream or sys.stdout
+
+    def write(self, result: CheckResult) -> None:
+        raise NotImplementedError
+
+    def write_table(self, table: ResultTable) -> None:
+        for result in table:
+            self.write(result)
+
+    def close(self) -> None:
+        pass
+
+
+class TextWriter(ResultWriter):
+    def write(self, result: CheckResult) -> None:
+        logger.error(result.message)
+
+    def write_table(self, table: ResultTable) -> None:
+        for message in table.message:
+            logger.error(table.strings.names[message])
+
+
+class JsonLinesWriter(ResultWriter):
+    def write(self, result: CheckResult) -> None:
+        self.stream.write(json.dumps(result.as_record()) + "\n")
+        self.stream.flush()
+
+    def write_table(self, table: ResultTable) -> None:
+        for record in table.records():
+            self.stream.write(json.dumps(record) + "\n")
+        self.stream.flush()
+
+
+class CsvWriter(ResultWriter):
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        super().__init__(stream)
+        self._writer = csv.DictWriter(self.stream, fieldnames=CheckResult.FIELDS)
+        self._header_written = False
+
+    def write(self, result: CheckResult) -> None:
+        self._write_header()
+        self._writer.writerow(result.as_record())
+        self.stream.flush()
+
+    def write_table(self, table: ResultTable) -> None:
+        self._write_header()
+        self._writer.writerows(table.records())
+        self.stream.flush()
+
+    def _write_header(self) -> None:
+        if not self._header_written:
+            self._writer.writeheader()
+            self._header_written = True
+
+
+class SummaryWriter(ResultWriter):
+    def __init__(self, writer: ResultWriter) -> None:
+        super().__init__(writer.stream)
+        self.writer = writer
+        self.per_file: Dict[str, Counter] = defaultdict(Counter)
+        self.packages: Set[str] = set()
+
+    def write(self, result: CheckResult) -> None:
+        self.writer.write(result)
+        self.per_file[result.requirement.source][result.status] += 1
+        self.packages.add(canonicalize_name(result.requirement.package))
+
+    def write_table(self, table: ResultTable) -> None:
+        self.writer.write_table(table)
+        strings = table.strings.names
+        counts = Counter(zip(table.source, table.status))
+        for (source, status), count in counts.items():
+            self.per_file[strings[source]][STATUSES[status]] += count
+        self.packages.update(canonicalize_name(strings[package]) for package in set(table.package))
+
+    def close(self) -> None:
+        self.writer.close()
+        total: Counter = Counter()
+        for source, statuses in sorted(self.per_file.items()):
+            total.update(statuses)
+            logger.info(f"{source}: {self._format_statuses(statuses)}")
+        logger.info(
+            f"Checked {len(self.per_file)} files, {len(self.packages)} distinct packages: "
+            f"{self._format_statuses(total)}"
+        )
+
+    @staticmethod
+    def _format_statuses(statuses: Counter) -> str:
+        counts = ", ".join(
+            f"{statuses[status]} {status.value.replace('_', ' ')}"
+            for status in Status
+            if statuses[status]
+        )
+        return f"{sum(statuses.values())} requirements ({counts})"
+
+
+WRITERS: Dict[str, Type[ResultWriter]] = {
+    "text": TextWriter,
+    "jsonl": JsonLinesWriter,
+    "csv": CsvWriter,
+}
@@ -0,0 +1,43 @@
+import unittest
+
+from datetime import date
+from piprot.models import PackageInfo, PiprotVersion
+
+
+class PackageInfoTest(unittest.TestCase):
+    def test_keeps_release_dates_as_ordinals(self):
+        package = PackageInfo(
+            name="test",
+            latest_version=PiprotVersion("2.0.0"),
+            latest_release_date=date(2018, 6, 1),
+            current_version=PiprotVersion("1.0.0"),
+            current_release_date=None,
+        )
+        self.assertEqual(package.latest_release_ordinal, date(2018, 6, 1).toordinal())
+        self.assertEqual(package.latest_release_date, date(2018, 6, 1))
+        self.assertEqual(package.current_release_ordinal, 0)
+        self.assertIsNone(package.current_release_date)
+        self.assertIsNone(package.libyears)
+
+    def test_from_ordinals_equals_from_dates(self):
+        from_dates = PackageInfo(
+            "test",
+            PiprotVersion("2.0.0"),
+            date(2019, 1, 1),
+            PiprotVersion("1.0.0"),
+            date(2018, 1, 1),
+            releases_behind=3,
+            first_newer_release_date=date(2018, 2, 1),
+        )
+        from_ordinals = PackageInfo.from_ordinals(
+            "test",
+            PiprotVersion("2.0.0"),
+            date(2019, 1, 1).toordinal(),
+            PiprotVersion("1.0.0"),
+            date(2018, 1, 1).toordinal(),
+            releases_behind=3,
+            first_newer_release_ordinal=date(2018, 2, 1).toordinal(),
+        )
+        self.assertEqual(from_dates, from_ordinals)
+        self.assertEqual(from_ordinals.first_newer_release_date, date(2018, 2, 1))
+        self.assertAlmostEqual(from_ordinals.libyears, 1.0, places=2)
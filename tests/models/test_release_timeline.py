@@ -0,0 +1,51 @@
+import unittest
+
+from datetime import date
+from piprot.models import PiprotVersion, ReleaseIndex
+
+
+def ordinal(year: int, month: int, day: int = 1) -> int:
+    return date(year, month, day).toordinal()
+
+
+class ReleaseTimelineTest(unittest.TestCase):
+    def setUp(self):
+        self.index = ReleaseIndex(
+            "test",
+            "2.1.0",
+            {
+                "1.0.0": ordinal(2018, 1),
+                "1.1.0": ordinal(2018, 3),
+                # a backport, uploaded after 2.0.0
+                "1.1.1": ordinal(2018, 9),
+                "2.0.0": ordinal(2018, 6),
+                "2.1.0a1": ordinal(2018, 10),
+                "2.1.0": ordinal(2018, 12),
+                # no files, never installable
+                "2.2.0": None,
+            },
+        )
+
+    def test_sorted_by_version(self):
+        timeline = self.index.timeline()
+        self.assertListEqual(timeline.versions, ["1.0.0", "1.1.0", "1.1.1", "2.0.0", "2.1.0"])
+        self.assertEqual(timeline.dates[0], ordinal(2018, 1))
+        self.assertIs(self.index.timeline(), timeline)
+
+    def test_releases_between(self):
+        timeline = self.index.timeline()
+        latest = PiprotVersion("2.1.0")
+        self.assertEqual(timeline.releases_between(PiprotVersion("1.0.0"), latest), 4)
+        self.assertEqual(timeline.releases_between(PiprotVersion("2.0.0"), latest), 1)
+        self.assertEqual(timeline.releases_between(latest, latest), 0)
+        # versions that aren't in the timeline still have a place in it
+        self.assertEqual(timeline.releases_between(PiprotVersion("1.0.5"), latest), 4)
+        prereleases = self.index.timeline(prereleases=True)
+        self.assertEqual(prereleases.releases_between(PiprotVersion("2.0.0"), latest), 2)
+
+    def test_first_release_after(self):
+        timeline = self.index.timeline()
+        self.assertEqual(timeline.first_release_after(PiprotVersion("1.0.0")), date(2018, 3, 1))
+        # the backport of 1.1.0 came out after 2.0.0
+        self.assertEqual(timeline.first_release_after(PiprotVersion("1.1.0")), date(2018, 6, 1))
+        self.assertIsNone(timeline.first_release_after(PiprotVersion("2.1.0")))
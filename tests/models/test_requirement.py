@@ -1,5 +1,6 @@
 import unittest
 
+from dataclasses import FrozenInstanceError
 from piprot.models import Requirement, NotFrozenRequirement
 
 
@@ -36,3 +37,14 @@ class RequirementTest(unittest.TestCase):
         invalid_line = "this is an invalid requirement line"
         with self.assertRaises(NotFrozenRequirement):
             Requirement.from_line(invalid_line)
+
+    def test_interns_package_and_version(self):
+        first = Requirement.from_line("test5==5.0.0")
+        second = Requirement.from_line("test5==5.0.0  # again")
+        self.assertIs(first.package, second.package)
+        self.assertIs(first.version, second.version)
+
+    def test_is_immutable(self):
+        requirement = Requirement("test", "1.0.0")
+        with self.assertRaises(FrozenInstanceError):
+            requirement.version = "2.0.0"
@@ -43,3 +43,42 @@ class PiprotVersionTest(unittest.TestCase):
         v1 = PiprotVersion("1.0")
         v2 = PiprotVersion("1.0.1")
         self.assertTrue(v1 < v2)
+
+    def test_follows_pep440_ordering(self):
+        ordered = [
+            "1.0.dev1",
+            "1.0a1",
+            "1.0a2.dev1",
+            "1.0a2",
+            "1.0b1",
+            "1.0rc1",
+            "1.0",
+            "1.0+local",
+            "1.0.post1.dev1",
+            "1.0.post1",
+            "1.1",
+            "2!0.1",
+        ]
+        versions = [PiprotVersion(version) for version in reversed(ordered)]
+        self.assertListEqual([str(version) for version in sorted(versions)], ordered)
+
+    def test_stable_release_is_greater_than_its_prerelease(self):
+        self.assertTrue(PiprotVersion("1.0.0") > PiprotVersion("1.0.0rc1"))
+
+    def test_trailing_zeros_are_equal(self):
+        self.assertTrue(PiprotVersion("1.0") == PiprotVersion("1.0.0"))
+        self.assertEqual(hash(PiprotVersion("1.0")), hash(PiprotVersion("1.0.0")))
+
+    def test_comparison_doesnt_mutate_parts(self):
+        v1 = PiprotVersion("1.0")
+        v2 = PiprotVersion("1.0.1")
+        self.assertTrue(v1 < v2)
+        self.assertEqual(v1.parts, (1, 0))
+
+    def test_versions_are_interned(self):
+        self.assertIs(PiprotVersion("3.1.4"), PiprotVersion("3.1.4"))
+
+    def test_detects_prereleases(self):
+        self.assertTrue(PiprotVersion("1.0.0b2").is_prerelease())
+        self.assertTrue(PiprotVersion("1.0.0.dev0").is_prerelease())
+        self.assertFalse(PiprotVersion("1.0.0.post1").is_prerelease())
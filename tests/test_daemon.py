@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+import socket
+
+from piprot import daemon as daemon_module
+from piprot.daemon import PiprotDaemon, check_with_daemon
+from piprot.models import Requirement, Status
+from piprot.testing import PypiStandIn
+from piprot.utils.pypi import PypiPackageInfoDownloader
+
+
+pytestmark = pytest.mark.asyncio
+
+
+async def ask(daemon, requirements, delay=5):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, check_with_daemon, daemon.address, requirements, delay
+    )
+
+
+async def test_answers_checks_from_warm_data():
+    requirements = [Requirement("first", "1.0.0", source="requirements.txt", line_number=3)]
+    async with PypiStandIn() as stand_in:
+        with stand_in.patch():
+            async with PiprotDaemon(PypiPackageInfoDownloader(), "127.0.0.1:0") as daemon:
+                first_results = await ask(daemon, requirements)
+                second_results = await ask(daemon, requirements + [Requirement("first", "1.2.9")])
+
+    [result] = first_results
+    assert result.status == Status.ROTTEN
+    assert result.requirement.line_number == 3
+    assert str(result.package.latest_version) == "1.2.9"
+    assert [result.status for result in second_results] == [Status.ROTTEN, Status.UP_TO_DATE]
+    assert stand_in.requests["first"] == 1
+
+
+async def test_refreshes_known_projects():
+    async with PypiStandIn() as stand_in:
+        with stand_in.patch():
+            async with PiprotDaemon(PypiPackageInfoDownloader(), "127.0.0.1:0") as daemon:
+                await ask(daemon, [Requirement("first", "1.0.0")])
+                await daemon.downloader.refresh()
+                [result] = await ask(daemon, [Requirement("first", "1.0.0")])
+
+    assert result.status == Status.ROTTEN
+    assert stand_in.requests["first"] == 2
+
+
+async def test_streams_requirements_in_batches(monkeypatch):
+    read = []
+
+    def requirements():
+        for version in ("1.0.0", "1.2.9", "1.0.0"):
+            read.append(version)
+            yield Requirement("first", version)
+
+    monkeypatch.setattr(daemon_module, "BATCH_SIZE", 2)
+    async with PypiStandIn() as stand_in:
+        with stand_in.patch():
+            async with PiprotDaemon(PypiPackageInfoDownloader(), "127.0.0.1:0") as daemon:
+                results = await ask(daemon, requirements())
+
+    assert read == ["1.0.0", "1.2.9", "1.0.0"]
+    assert [result.status for result in results] == [
+        Status.ROTTEN,
+        Status.UP_TO_DATE,
+        Status.ROTTEN,
+    ]
+
+
+async def test_no_daemon_running():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    requirements = iter([Requirement("first", "1.0.0")])
+    assert check_with_daemon(f"127.0.0.1:{port}", requirements, 5) is None
+    # nothing was read for a daemon that isn't there
+    assert next(requirements) == Requirement("first", "1.0.0")
@@ -0,0 +1,266 @@
+import aiohttp
+import asyncio
+import pytest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from piprot.models import Requirement, Status
+from piprot.piprot import Piprot, check, iter_check
+from piprot.testing import PypiStandIn, StandInConfig
+from piprot.utils.indexes import PackageIndex
+from piprot.utils.pypi import PypiPackageInfoDownloader
+from piprot.utils.result_store import ResultStore
+from piprot.utils.result_table import ResultTable
+from piprot.utils.scheduler import FetchScheduler
+from piprot.utils.writers import ResultWriter
+from typing import List
+
+
+pytestmark = pytest.mark.asyncio
+
+
+def project_app(delays: dict) -> web.Application:
+    async def project(request: web.Request) -> web.Response:
+        package = request.match_info["package"]
+        await asyncio.sleep(delays.get(package, 0))
+        return web.json_response(
+            {
+                "info": {"name": package, "stable_version": "2.0.0"},
+                "releases": {
+                    "1.0.0": [{"upload_time": "2018-01-01T00:00:00"}],
+                    "2.0.0": [{"upload_time": "2018-06-01T00:00:00"}],
+                },
+            }
+        )
+
+    app = web.Application()
+    app.router.add_get("/pypi/{package}/json", project)
+    return app
+
+
+@pytest.fixture
+def requirements_file(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text("slow==1.0.0\nfast==2.0.0\nignored==1.0.0  # norot\n")
+    return str(path)
+
+
+async def test_results_are_handed_out_in_completion_order(monkeypatch, requirements_file):
+    async with TestServer(project_app({"slow": 0.2})) as server:
+        monkeypatch.setattr(
+            PypiPackageInfoDownloader, "PYPI_BASE_URL", str(server.make_url("/pypi"))
+        )
+        piprot = Piprot([requirements_file])
+        results = [result async for result in piprot.results()]
+
+    assert [result.requirement.package for result in results] == ["ignored", "fast", "slow"]
+    assert [result.status for result in results] == [
+        Status.IGNORED,
+        Status.UP_TO_DATE,
+        Status.ROTTEN,
+    ]
+    assert [result.requirement.line_number for result in results] == [3, 2, 1]
+
+
+class TableWriter(ResultWriter):
+    def __init__(self) -> None:
+        super().__init__()
+        self.tables: List[ResultTable] = []
+
+    def write(self, result) -> None:
+        raise AssertionError("results are written out as a table")
+
+    def write_table(self, table: ResultTable) -> None:
+        self.tables.append(table)
+
+
+async def test_writes_results_as_a_table(monkeypatch, requirements_file):
+    async with TestServer(project_app({"slow": 0.2})) as server:
+        monkeypatch.setattr(
+            PypiPackageInfoDownloader, "PYPI_BASE_URL", str(server.make_url("/pypi"))
+        )
+        writer = TableWriter()
+        assert await Piprot([requirements_file], writer=writer)._main() == 1
+
+    [table] = writer.tables
+    assert [result.requirement.package for result in table] == ["ignored", "fast", "slow"]
+    assert table.outdated == 1
+
+
+async def test_limits_requirements_in_progress(monkeypatch, requirements_file):
+    async with TestServer(project_app({})) as server:
+        monkeypatch.setattr(
+            PypiPackageInfoDownloader, "PYPI_BASE_URL", str(server.make_url("/pypi"))
+        )
+        piprot = Piprot([requirements_file], max_pending=1)
+        results = [result async for result in piprot.results()]
+
+    assert [result.requirement.package for result in results] == ["slow", "fast", "ignored"]
+
+
+async def test_checks_against_stand_in(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text("first==1.0.0\nsecond==1.2.9\nfirst==1.2.9\nmissing-package==1.0.0\n")
+
+    config = StandInConfig(releases=30, throttle_rate=0.3, seed=1)
+    async with PypiStandIn(config) as stand_in:
+        with stand_in.patch():
+            pypi = PypiPackageInfoDownloader(scheduler=FetchScheduler(backoff_base=0.01))
+            results = [result async for result in Piprot([str(path)], pypi=pypi).results()]
+
+    statuses = {(r.requirement.package, r.requirement.version): r.status for r in results}
+    assert statuses == {
+        ("first", "1.0.0"): Status.ROTTEN,
+        ("first", "1.2.9"): Status.UP_TO_DATE,
+        ("second", "1.2.9"): Status.UP_TO_DATE,
+        ("missing-package", "1.0.0"): Status.CANNOT_FETCH,
+    }
+    assert stand_in.responses[429] == sum(pypi.scheduler.stats.retries.values())
+    assert stand_in.responses[200] == 2
+
+
+async def test_rerun_reuses_stored_results(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text("first==1.0.0\nsecond==1.2.9\nmissing-package==1.0.0\n")
+    store = ResultStore(str(tmp_path / "results.sqlite3"), ttl=60)
+
+    async def run():
+        piprot = Piprot([str(path)], pypi=PypiPackageInfoDownloader(), result_store=store)
+        return {r.requirement.package: r.status async for r in piprot.results()}
+
+    async with PypiStandIn() as stand_in:
+        with stand_in.patch():
+            first_run = await run()
+            requests = sum(stand_in.requests.values())
+            second_run = await run()
+
+    assert first_run == second_run
+    # only the failed lookup is retried
+    assert sum(stand_in.requests.values()) - requests == 1
+    assert (store.stats.hits, store.stats.misses) == (2, 4)
+    store.close()
+
+
+async def test_stale_results_are_revalidated(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text("first==1.0.0\n")
+    store = ResultStore(str(tmp_path / "results.sqlite3"), ttl=0, max_stale=60)
+
+    async with PypiStandIn() as stand_in:
+        with stand_in.patch():
+            for _ in range(2):
+                piprot = Piprot([str(path)], pypi=PypiPackageInfoDownloader(), result_store=store)
+                results = [result async for result in piprot.results()]
+
+    assert [result.status for result in results] == [Status.ROTTEN]
+    assert store.stats.stale == 1
+    assert stand_in.requests["first"] == 2
+    store.close()
+
+
+async def test_check_shares_an_open_downloader():
+    async with PypiStandIn() as stand_in:
+        with stand_in.patch():
+            async with PypiPackageInfoDownloader() as downloader:
+                results = await check(["first==1.0.0"], downloader=downloader)
+                results += [
+                    result
+                    async for result in iter_check(
+                        [Requirement("First", "1.2.9")], downloader=downloader
+                    )
+                ]
+                assert not downloader.session.closed
+
+    assert [result.status for result in results] == [Status.ROTTEN, Status.UP_TO_DATE]
+    # the second check found the project already fetched by the first one
+    assert sum(stand_in.requests.values()) == 1
+
+
+async def test_check_uses_callers_session():
+    async with PypiStandIn() as stand_in:
+        with stand_in.patch():
+            async with aiohttp.ClientSession() as session:
+                downloader = PypiPackageInfoDownloader(session=session)
+                [result] = await check(["first==1.2.9"], delay=0, downloader=downloader)
+                assert not session.closed
+
+    assert result.status == Status.UP_TO_DATE
+
+
+async def test_fail_fast_checks_previously_rotten_first(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text("".join(f"package-{n}==1.2.9\n" for n in range(20)) + "rotten==1.0.0\n")
+    store = ResultStore(str(tmp_path / "results.sqlite3"), ttl=0)
+
+    async def run(**kwargs) -> int:
+        pypi = PypiPackageInfoDownloader(scheduler=FetchScheduler(concurrency=1))
+        return await Piprot([str(path)], pypi=pypi, result_store=store, **kwargs)._main()
+
+    async with PypiStandIn() as stand_in:
+        with stand_in.patch():
+            assert await run() == 1
+            stand_in.requests.clear()
+            assert await run(fail_fast=True) == 1
+
+    assert stand_in.requests["rotten"] == 1
+    assert sum(stand_in.requests.values()) <= 2
+    store.close()
+
+
+async def test_fail_fast_stops_lookups_in_flight():
+    requirements = [Requirement(f"package-{n}", "1.0.0") for n in range(100)]
+
+    async with PypiStandIn(StandInConfig(latency=0.2)) as stand_in:
+        with stand_in.patch():
+            # an open downloader, like an application checking on its own loop would have
+            async with PypiPackageInfoDownloader() as downloader:
+                piprot = Piprot([], pypi=downloader, requirements=requirements, fail_fast=True)
+                assert await piprot._main() == 1
+                # requests already on the wire when the run stopped still reach the index
+                await asyncio.sleep(0.05)
+                sent = sum(stand_in.requests.values())
+                await asyncio.sleep(0.5)
+                assert sum(stand_in.requests.values()) == sent
+
+    assert sent < len(requirements)
+
+
+async def test_deadline_reports_unchecked_requirements(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text("first==1.0.0\nsecond==1.0.0\nignored==1.0.0  # norot\n")
+
+    async with PypiStandIn(StandInConfig(latency=1.0)) as stand_in:
+        with stand_in.patch():
+            piprot = Piprot([str(path)], pypi=PypiPackageInfoDownloader(), deadline=0.1)
+            started = asyncio.get_running_loop().time()
+            results = {r.requirement.package: r.status async for r in piprot.results()}
+            elapsed = asyncio.get_running_loop().time() - started
+
+    assert results == {
+        "first": Status.UNCHECKED,
+        "second": Status.UNCHECKED,
+        "ignored": Status.IGNORED,
+    }
+    assert elapsed < 0.5
+
+
+async def test_workers_check_in_requirements_order(tmp_path):
+    path = tmp_path / "requirements.txt"
+    lines = ["first==1.0.0", "second==1.2.9", "missing==1.0.0", "First==1.2.9", "third==9.9"]
+    path.write_text("\n".join(lines) + "\n")
+
+    async with PypiStandIn() as stand_in:
+        pypi = PypiPackageInfoDownloader(indexes=[PackageIndex(stand_in.pypi_url)])
+        piprot = Piprot([str(path)], pypi=pypi, workers=2)
+        results = [(r.requirement.package, r.status) async for r in piprot.results()]
+
+    assert results == [
+        ("first", Status.ROTTEN),
+        ("second", Status.UP_TO_DATE),
+        ("missing", Status.CANNOT_FETCH),
+        ("First", Status.UP_TO_DATE),
+        ("third", Status.CANNOT_FETCH),
+    ]
+    # each project is fetched once, by one of the workers
+    assert stand_in.requests["first"] == 1
+    assert pypi.stats.requests >= 4
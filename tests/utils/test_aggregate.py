@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from contextlib import redirect_stdout
+from piprot.entrypoint import report
+from piprot.utils.aggregate import ResultColumns, aggregate, numpy, service_of
+
+
+RUNS = {
+    "monday.jsonl": [
+        b'{"package": "Django", "status": "rotten", "libyears": 1.5, '
+        b'"source": "shop/requirements.txt"}',
+        b'{"package": "django", "status": "up_to_date", "libyears": 0.0, '
+        b'"source": "blog/requirements/prod.txt"}',
+        b'{"package": "requests", "status": "cannot_fetch", "libyears": null, '
+        b'"source": "shop/requirements.txt"}',
+        b"",
+        b"not json",
+    ],
+    "tuesday.jsonl": [
+        b'{"package": "django", "status": "rotten", "libyears": 3.0, '
+        b'"source": "shop/requirements.txt"}',
+        b'{"package": "flask", "status": "no_delay_info", "libyears": 0.5, '
+        b'"source": "requirements.txt"}',
+    ],
+}
+
+
+class AggregateTest(unittest.TestCase):
+    def setUp(self):
+        self.columns = ResultColumns()
+        with self.assertLogs("piprot.utils.aggregate", level="WARNING"):
+            for run, lines in RUNS.items():
+                self.columns.read_jsonl(lines, run)
+
+    def test_service_of(self):
+        self.assertEqual(service_of("shop/requirements/prod.txt"), "shop")
+        self.assertEqual(service_of("shop/requirements/prod.txt", depth=2), "shop/requirements")
+        self.assertEqual(service_of("requirements.txt"), "requirements.txt")
+        self.assertEqual(service_of(None), "")
+
+    def assert_report(self, use_numpy):
+        report = aggregate(self.columns, top=2, use_numpy=use_numpy)
+        self.assertEqual(report.requirements, 5)
+
+        django = report.packages[0]
+        self.assertEqual((django.package, django.requirements, django.outdated), ("django", 3, 2))
+        self.assertEqual(
+            (django.libyears, django.p50, django.p90, django.max), (4.5, 1.5, 3.0, 3.0)
+        )
+        requests = report.packages[1]
+        self.assertEqual((requests.libyears, requests.p50, requests.max), (0.0, None, None))
+        self.assertListEqual(
+            [package.package for package in report.most_lagging], ["django", "flask"]
+        )
+
+        self.assertListEqual(
+            [(s.name, s.requirements, s.outdated, s.libyears) for s in report.services],
+            [("shop", 3, 2, 4.5), ("blog", 1, 0, 0.0), ("requirements.txt", 1, 1, 0.5)],
+        )
+        self.assertListEqual(
+            [(run.name, run.requirements, run.outdated, run.libyears) for run in report.runs],
+            [("monday.jsonl", 3, 1, 1.5), ("tuesday.jsonl", 2, 2, 3.5)],
+        )
+
+    def test_aggregates_in_python(self):
+        self.assert_report(use_numpy=False)
+
+    @unittest.skipIf(numpy is None, "NumPy isn't installed")
+    def test_aggregates_with_numpy(self):
+        self.assert_report(use_numpy=True)
+
+
+class ReportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results.jsonl")
+        with open(self.path, "wb") as file:
+            file.write(
+                b'{"package": "django", "status": "rotten", "libyears": 2.0}\n'
+                b'{"package": "flask", "status": "unknown", "libyears": 9.0}\n'
+                b'{"package": "flask", "status": "rotten", "libyears": "a lot"}\n'
+                b'{"package": "requests", "status": "up_to_date", "libyears": 0.5}\n'
+            )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def report(self, *argv):
+        output = io.StringIO()
+        with redirect_stdout(output), self.assertLogs("piprot.utils.aggregate", "WARNING"):
+            report([self.path, "--format", "json", *argv])
+        return json.loads(output.getvalue())
+
+    def assert_skips_invalid_results(self, *argv):
+        summary = self.report(*argv)
+        self.assertEqual(summary["requirements"], 2)
+        self.assertListEqual(
+            [
+                (package["package"], package["requirements"], package["outdated"])
+                for package in summary["packages"]
+            ],
+            [("django", 1, 1), ("requests", 1, 0)],
+        )
+        self.assertListEqual(
+            [package["libyears"] for package in summary["packages"]], [2.0, 0.5]
+        )
+
+    def test_skips_invalid_results_in_python(self):
+        self.assert_skips_invalid_results("--no-numpy")
+
+    @unittest.skipIf(numpy is None, "NumPy isn't installed")
+    def test_skips_invalid_results_with_numpy(self):
+        self.assert_skips_invalid_results()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import time
+import unittest
+
+from piprot.utils.cache import CacheEntry, MetadataCache
+
+
+class MetadataCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = MetadataCache(self.directory.name, ttl=60)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_returns_stored_entry(self):
+        self.cache.set(CacheEntry("https://pypi/a/json", {"info": {}}, time.time(), etag='"a"'))
+        entry = self.cache.get("https://pypi/a/json")
+        self.assertEqual(entry.payload, {"info": {}})
+        self.assertEqual(entry.conditional_headers(), {"If-None-Match": '"a"'})
+        self.assertTrue(entry.is_fresh(self.cache.ttl))
+
+    def test_missing_entry(self):
+        self.assertIsNone(self.cache.get("https://pypi/missing/json"))
+
+    def test_stale_entry(self):
+        self.cache.set(CacheEntry("https://pypi/a/json", {}, time.time() - 120))
+        self.assertFalse(self.cache.get("https://pypi/a/json").is_fresh(self.cache.ttl))
+
+    def test_leaves_no_temporary_files(self):
+        self.cache.set(CacheEntry("https://pypi/a/json", {}, time.time()))
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+
+    def test_evicts_least_recently_used_entries(self):
+        cache = MetadataCache(self.directory.name, max_size=2500)
+        # two entries fit, with room to spare for their other fields; three don't
+        payload = "x" * 900
+        cache.set(CacheEntry("https://pypi/a/json", payload, time.time()))
+        cache.set(CacheEntry("https://pypi/b/json", payload, time.time()))
+        os.utime(cache._path("https://pypi/a/json"), (0, 0))
+        os.utime(cache._path("https://pypi/b/json"), (1, 1))
+        cache.get("https://pypi/a/json")
+
+        cache.set(CacheEntry("https://pypi/c/json", payload, time.time()))
+
+        self.assertIsNotNone(cache.get("https://pypi/a/json"))
+        self.assertIsNone(cache.get("https://pypi/b/json"))
+        self.assertIsNotNone(cache.get("https://pypi/c/json"))
+
+    def test_overwritten_entries_count_once(self):
+        cache = MetadataCache(self.directory.name)
+        cache.set(CacheEntry("https://pypi/a/json", "x" * 1000, time.time()))
+        for _ in range(5):
+            cache.touch(cache.get("https://pypi/a/json"))
+        cache.set_resolution("https://pypi/b/json", None)
+        cache.set_resolution("https://pypi/b/json", "https://pypi/c/json")
+
+        self.assertEqual(cache._size, sum(size for _, size, _ in cache._scan()))
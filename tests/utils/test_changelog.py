@@ -0,0 +1,43 @@
+import unittest
+
+from piprot.utils.changelog import (
+    Changelog,
+    InvalidXmlRpcResponse,
+    xmlrpc_request,
+    xmlrpc_response,
+)
+from xmlrpc.client import Fault, dumps, loads
+
+
+class ChangelogTest(unittest.TestCase):
+    def setUp(self):
+        self.changelog = Changelog.from_events(
+            100,
+            [
+                ["Django", "2.0.1", 1517443200, "new release", 101],
+                ["flask", "1.0", 1517443201, "new release", 102],
+                ["django", "2.0.1", 1517443202, "add py3 file", 103],
+            ],
+        )
+
+    def test_from_events(self):
+        self.assertEqual(self.changelog.serial, 103)
+        self.assertEqual(self.changelog.changed, {"django": 103, "flask": 102})
+
+    def test_is_current(self):
+        self.assertTrue(self.changelog.is_current("requests", 100))
+        self.assertTrue(self.changelog.is_current("Flask", 102))
+        self.assertFalse(self.changelog.is_current("flask", 101))
+        # the changes before the entry's serial are unknown
+        self.assertFalse(self.changelog.is_current("requests", 99))
+        self.assertFalse(self.changelog.is_current("requests", None))
+
+    def test_xmlrpc(self):
+        self.assertEqual(
+            loads(xmlrpc_request("changelog_since_serial", 100)), ((100,), "changelog_since_serial")
+        )
+        self.assertEqual(xmlrpc_response(dumps((42,), methodresponse=True).encode()), 42)
+        with self.assertRaises(InvalidXmlRpcResponse):
+            xmlrpc_response(dumps(Fault(1, "error")).encode())
+        with self.assertRaises(InvalidXmlRpcResponse):
+            xmlrpc_response(b"<html>")
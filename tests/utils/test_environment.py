@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+from piprot.utils.environment import EnvironmentScanner, read_metadata_headers
+
+
+class EnvironmentScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.files = {
+            "venv/lib/python3.11/site-packages/Django-4.2.1.dist-info/METADATA": (
+                "Metadata-Version: 2.1\nName: Django\nVersion: 4.2.1\n\nLong description\n"
+            ),
+            "venv/lib/python3.11/site-packages/django/__init__.py": "",
+            "venv/lib/python3.11/site-packages/legacy.egg-info/PKG-INFO": (
+                "Metadata-Version: 1.0\nName: legacy\nVersion: 0.1\n"
+            ),
+            "venv/lib/python3.11/site-packages/develop.egg-info": (
+                "Metadata-Version: 1.0\nName: develop\nVersion: 1.0.dev0\n"
+            ),
+            "venv/lib/python3.11/site-packages/broken.dist-info/METADATA": (
+                "Metadata-Version: 2.1\nName: broken\n"
+            ),
+            "venv/lib/python3.11/site-packages/empty.dist-info/RECORD": "",
+            "rootfs/usr/lib/python3/dist-packages/requests-2.31.0.dist-info/METADATA": (
+                "Name: requests\nVersion: 2.31.0\n"
+            ),
+        }
+        for path, content in self.files.items():
+            full_path = os.path.join(self.directory.name, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w") as file:
+                file.write(content)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, path):
+        return os.path.join(self.directory.name, path)
+
+    def test_finds_installed_distributions(self):
+        scanner = EnvironmentScanner([self.path("venv"), self.path("rootfs")], workers=4)
+        requirements = list(scanner.requirements())
+        self.assertListEqual(
+            [(r.package, r.version) for r in requirements],
+            [
+                ("Django", "4.2.1"),
+                ("develop", "1.0.dev0"),
+                ("legacy", "0.1"),
+                ("requests", "2.31.0"),
+            ],
+        )
+        self.assertTrue(
+            requirements[0].source.endswith(os.path.join("python3.11", "site-packages"))
+        )
+        self.assertTrue(requirements[-1].source.endswith("dist-packages"))
+
+    def test_accepts_site_directory_and_skips_duplicates(self):
+        site_packages = self.path("venv/lib/python3.11/site-packages")
+        scanner = EnvironmentScanner([site_packages, self.path("venv")])
+        self.assertListEqual(list(scanner.site_directories()), [site_packages])
+
+    def test_reads_headers_only(self):
+        path = self.path("venv/lib/python3.11/site-packages/broken.dist-info/METADATA")
+        self.assertIsNone(read_metadata_headers(path))
+        with open(path, "a") as file:
+            file.write("\nVersion: 1.0 in the description\n")
+        self.assertIsNone(read_metadata_headers(path))
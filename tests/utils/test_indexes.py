@@ -0,0 +1,24 @@
+import unittest
+
+from piprot.utils.indexes import MIN_LATENCY_SAMPLES, IndexStats, PackageIndex
+
+
+class PackageIndexTest(unittest.TestCase):
+    def test_project_url(self):
+        index = PackageIndex("https://mirror.example.org/pypi/")
+        self.assertEqual(index.name, "mirror.example.org")
+        self.assertEqual(
+            index.project_url("django"), "https://mirror.example.org/pypi/django/json"
+        )
+
+    def test_hedge_delay_adapts_to_latencies(self):
+        stats = IndexStats()
+        for _ in range(MIN_LATENCY_SAMPLES - 1):
+            stats.record(0.02)
+        self.assertEqual(stats.hedge_delay(0.5), 0.5)
+
+        stats.record(0.02)
+        self.assertEqual(stats.hedge_delay(0.5), 0.02)
+        for _ in range(MIN_LATENCY_SAMPLES):
+            stats.record(0.2)
+        self.assertEqual(stats.hedge_delay(0.5), 0.2)
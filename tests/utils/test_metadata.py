@@ -0,0 +1,76 @@
+import copy
+import json
+import unittest
+
+from datetime import date
+from piprot.models import PiprotVersion
+from piprot.utils.metadata import (
+    index_from_json_api,
+    index_from_simple_api,
+    slim_json_loads,
+    version_from_filename,
+)
+
+JSON_API_DOCUMENT = {
+    "info": {"name": "some-package", "description": "long text"},
+    "releases": {
+        "1.0.0": [
+            {"filename": "some-package-1.0.0.tar.gz", "upload_time": "2018-01-01T10:00:00"},
+            {
+                "filename": "some_package-1.0.0-py3-none-any.whl",
+                "upload_time": "2018-01-02T10:00:00",
+            },
+        ],
+        "1.1.0": [{"filename": "some-package-1.1.0.tar.gz", "upload_time": "2018-02-01T10:00:00"}],
+        "2.0.0b1": [
+            {"filename": "some-package-2.0.0b1.tar.gz", "upload_time": "2018-03-01T10:00:00"}
+        ],
+        "0.1.0": [],
+    },
+}
+
+SIMPLE_API_DOCUMENT = {
+    "meta": {"api-version": "1.1"},
+    "name": "some-package",
+    "versions": ["0.1.0", "1.0.0", "1.1.0"],
+    "files": [
+        {"filename": "some_package-1.0.0-py3-none-any.whl", "upload-time": "2018-01-02T10:00:00Z"},
+        {"filename": "Some.Package-1.0.0.tar.gz", "upload-time": "2018-01-01T10:00:00Z"},
+        {"filename": "some-package-1.1.0.zip", "upload-time": "2018-02-01T10:00:00Z"},
+    ],
+}
+
+
+class MetadataTest(unittest.TestCase):
+    def test_builds_index_from_json_api(self):
+        index = index_from_json_api(JSON_API_DOCUMENT)
+        self.assertEqual(index.name, "some-package")
+        self.assertEqual(index.latest_version(), PiprotVersion("1.1.0"))
+        self.assertEqual(index.release_date(PiprotVersion("1.0.0")), date(2018, 1, 1))
+        self.assertIsNone(index.release_date(PiprotVersion("0.1.0")))
+
+    def test_slim_decoding_gives_the_same_index(self):
+        body = json.dumps(JSON_API_DOCUMENT).encode()
+        self.assertEqual(
+            index_from_json_api(slim_json_loads(body)), index_from_json_api(JSON_API_DOCUMENT)
+        )
+
+    def test_builds_index_from_simple_api(self):
+        body = json.dumps(SIMPLE_API_DOCUMENT).encode()
+        for document in [SIMPLE_API_DOCUMENT, slim_json_loads(body)]:
+            index = index_from_simple_api(document)
+            self.assertEqual(index.latest_version(), PiprotVersion("1.1.0"))
+            self.assertEqual(index.release_date(PiprotVersion("1.0.0")), date(2018, 1, 1))
+            self.assertIsNone(index.release_date(PiprotVersion("0.1.0")))
+
+    def test_prefers_stable_versions(self):
+        document = copy.deepcopy(JSON_API_DOCUMENT)
+        del document["releases"]["1.0.0"], document["releases"]["1.1.0"]
+        self.assertEqual(index_from_json_api(document).latest_version(), PiprotVersion("0.1.0"))
+
+    def test_extracts_version_from_filename(self):
+        self.assertEqual(version_from_filename("foo-bar", "foo_bar-1.0-py3-none-any.whl"), "1.0")
+        self.assertEqual(version_from_filename("foo-bar", "Foo.Bar-1.0rc1.tar.gz"), "1.0rc1")
+        self.assertEqual(version_from_filename("foo-bar", "foo-1.0-py2.7.egg"), "1.0")
+        self.assertIsNone(version_from_filename("foo-bar", "foo_bar.tar.gz"))
+        self.assertIsNone(version_from_filename("foo-bar", "foo_bar-1.0.exe"))
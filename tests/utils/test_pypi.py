@@ -1,31 +1,314 @@
+import asyncio
 import pytest
+import time
 
+from aiohttp import web
+from datetime import date, timedelta
+from aiohttp.test_utils import TestServer
 from piprot.models import Requirement
+from piprot.testing import FIRST_RELEASE_DATE, PypiStandIn, StandInConfig
+from piprot.utils.cache import MetadataCache
+from piprot.utils.indexes import PackageIndex
 from piprot.utils.pypi import PypiPackageInfoDownloader
+from typing import List
 
 
 pytestmark = pytest.mark.asyncio
 
 
 async def test_fresh_package():
-    downloader = PypiPackageInfoDownloader()
-    r = Requirement("requests", "", False)
-    version, release_date = await downloader.version_and_release_date(r)
+    async with PypiPackageInfoDownloader() as downloader:
+        r = Requirement("requests", "", False)
+        version, release_date = await downloader.version_and_release_date(r)
 
-    r2 = Requirement("requests", str(version), False)
-    version2, release_date2 = await downloader.version_and_release_date(r2)
+        r2 = Requirement("requests", str(version), False)
+        version2, release_date2 = await downloader.version_and_release_date(r2)
 
     assert version == version2
     assert release_date == release_date2
 
 
 async def test_rotten_package():
-    downloader = PypiPackageInfoDownloader()
-    r = Requirement("requests", "1.1.0", False)
-    version, release_date = await downloader.version_and_release_date(r)
+    async with PypiPackageInfoDownloader() as downloader:
+        r = Requirement("requests", "1.1.0", False)
+        version, release_date = await downloader.version_and_release_date(r)
 
-    r2 = Requirement("requests", "", False)
-    version2, release_date2 = await downloader.version_and_release_date(r2)
+        r2 = Requirement("requests", "", False)
+        version2, release_date2 = await downloader.version_and_release_date(r2)
 
     assert version != version2
     assert release_date != release_date2
+
+
+async def test_package_info_places_current_version_in_the_timeline():
+    async with PypiStandIn() as stand_in:
+        with stand_in.patch():
+            async with PypiPackageInfoDownloader() as downloader:
+                package_info = await downloader.package_info(Requirement("package", "1.0.5"))
+
+    # the stand-in releases 1.0.0 to 1.2.9, one a week
+    assert package_info.releases_behind == 24
+    assert package_info.first_newer_release_date == FIRST_RELEASE_DATE + timedelta(weeks=6)
+    assert package_info.libyears == 24 * 7 / 365.25
+
+
+async def test_hedges_slow_index():
+    async with PypiStandIn(StandInConfig(latency=1.0)) as slow, PypiStandIn() as fast:
+        indexes = [PackageIndex(slow.pypi_url), PackageIndex(fast.pypi_url, priority=1)]
+        async with PypiPackageInfoDownloader(indexes=indexes, hedge_after=0.05) as downloader:
+            started = time.perf_counter()
+            infos = await asyncio.gather(
+                *(downloader.package_info(Requirement(f"package-{n}")) for n in range(10))
+            )
+            elapsed = time.perf_counter() - started
+
+    assert all(info.latest_version for info in infos)
+    assert elapsed < 1.0
+    assert (indexes[0].stats.hedged, indexes[1].stats.wins) == (10, 10)
+
+
+async def test_fails_over_to_next_index():
+    async with PypiStandIn(StandInConfig(error_rate=1.0)) as broken, PypiStandIn() as working:
+        indexes = [PackageIndex(working.pypi_url, priority=1), PackageIndex(broken.pypi_url)]
+        async with PypiPackageInfoDownloader(indexes=indexes, hedge_after=None) as downloader:
+            info = await downloader.package_info(Requirement("package", "1.0.0"))
+
+    assert info.latest_version
+    assert broken.requests["package"] == 1
+    assert [index.stats.failures for index in downloader.indexes] == [1, 0]
+
+
+async def test_indexes_skip_pypi_changelog(tmp_path):
+    cache = MetadataCache(str(tmp_path), ttl=0)
+
+    async def check(index_url):
+        indexes = [PackageIndex(index_url)]
+        async with PypiPackageInfoDownloader(cache=cache, indexes=indexes) as downloader:
+            return await downloader.package_info(Requirement("private", "1.0.0"))
+
+    async with PypiStandIn() as pypi, PypiStandIn() as private:
+        with pypi.patch():
+            await check(private.pypi_url)
+            private.release("private")
+            info = await check(private.pypi_url)
+
+    # PyPI's changelog never mentions the private project, stale entries are revalidated
+    assert pypi.requests == {}
+    assert private.requests == {"private": 2}
+    assert str(info.latest_version) == "1.3.0"
+
+
+async def test_revalidates_only_with_the_index_it_came_from(tmp_path):
+    cache = MetadataCache(str(tmp_path), ttl=0, resolution_ttl=0)
+
+    async with PypiStandIn() as first, PypiStandIn() as second:
+
+        async def check():
+            indexes = [PackageIndex(first.pypi_url), PackageIndex(second.pypi_url, priority=1)]
+            async with PypiPackageInfoDownloader(
+                cache=cache, indexes=indexes, hedge_after=None
+            ) as downloader:
+                return await downloader.package_info(Requirement("package", "1.0.0"))
+
+        await check()
+        first.config.error_rate = 1.0
+        await check()
+        first.config.error_rate = 0.0
+        info = await check()
+
+    # both serve the same document under the same ETag, yet neither is handed the other's
+    assert second.responses == {200: 1}
+    assert first.responses == {200: 2, 500: 1}
+    assert str(info.latest_version) == "1.2.9"
+
+
+async def test_requires_context_manager():
+    downloader = PypiPackageInfoDownloader()
+    with pytest.raises(RuntimeError):
+        await downloader.version_and_release_date(Requirement("requests"))
+
+
+def project_app(requested: List[str], throttled: int = 0) -> web.Application:
+    async def project(request: web.Request) -> web.Response:
+        requested.append(request.match_info["package"])
+        if len(requested) <= throttled:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.json_response(
+            {
+                "info": {"name": request.match_info["package"], "stable_version": "1.1.0"},
+                "releases": {
+                    "1.0.0": [{"upload_time": "2018-01-01T00:00:00"}],
+                    "1.1.0": [{"upload_time": "2018-02-01T00:00:00"}],
+                },
+            },
+            headers={"ETag": '"v1"'},
+        )
+
+    app = web.Application()
+    app.router.add_get("/pypi/{package}/json", project)
+    return app
+
+
+async def test_reuses_connections(monkeypatch):
+    async with TestServer(project_app([])) as server:
+        monkeypatch.setattr(
+            PypiPackageInfoDownloader, "PYPI_BASE_URL", str(server.make_url("/pypi"))
+        )
+        async with PypiPackageInfoDownloader() as downloader:
+            for package in ["first", "second", "third"]:
+                await downloader.version_and_release_date(Requirement(package))
+
+    assert downloader.stats.requests == 3
+    assert downloader.stats.connections_created == 1
+    assert downloader.stats.connections_reused == 2
+
+
+async def test_coalesces_lookups_of_the_same_project(monkeypatch):
+    requested: List[str] = []
+    async with TestServer(project_app(requested)) as server:
+        monkeypatch.setattr(
+            PypiPackageInfoDownloader, "PYPI_BASE_URL", str(server.make_url("/pypi"))
+        )
+        async with PypiPackageInfoDownloader() as downloader:
+            infos = await asyncio.gather(
+                downloader.package_info(Requirement("Some_Package", "1.0.0")),
+                downloader.package_info(Requirement("some-package", "1.1.0")),
+                downloader.package_info(Requirement("some.package", "0.0.1")),
+            )
+
+    assert requested == ["some-package"]
+    assert [str(info.latest_version) for info in infos] == ["1.1.0"] * 3
+    assert str(infos[0].current_version) == "1.0.0"
+    assert str(infos[1].current_version) == "1.1.0"
+    assert infos[2].current_version is None
+
+
+async def test_revalidates_cached_responses(monkeypatch, tmp_path):
+    requested: List[str] = []
+    cache = MetadataCache(str(tmp_path), ttl=0)
+    async with TestServer(project_app(requested)) as server:
+        monkeypatch.setattr(
+            PypiPackageInfoDownloader, "PYPI_BASE_URL", str(server.make_url("/pypi"))
+        )
+        for _ in range(2):
+            async with PypiPackageInfoDownloader(cache=cache) as downloader:
+                info = await downloader.package_info(Requirement("package", "1.0.0"))
+
+    assert requested == ["package", "package"]
+    assert str(info.latest_version) == "1.1.0"
+    assert (cache.stats.misses, cache.stats.revalidated) == (1, 1)
+
+
+async def test_changelog_refreshes_only_changed_projects(tmp_path):
+    cache = MetadataCache(str(tmp_path), ttl=0)
+    requirements = [Requirement(f"package-{number}", "1.0.0") for number in range(500)]
+
+    async def check():
+        async with PypiPackageInfoDownloader(cache=cache) as downloader:
+            return await asyncio.gather(*map(downloader.package_info, requirements))
+
+    async with PypiStandIn() as stand_in:
+        with stand_in.patch():
+            await check()
+            assert stand_in.requests["changelog_last_serial"] == 1
+            stand_in.release("package-7")
+            stand_in.requests.clear()
+            infos = await check()
+
+    # every cached entry is stale, but the changelog says only one project has changed
+    assert stand_in.requests == {"changelog_since_serial": 1, "package-7": 1}
+    assert str(infos[7].latest_version) == "1.3.0"
+    assert str(infos[8].latest_version) == "1.2.9"
+    assert cache.last_serial() == stand_in.serial
+
+
+async def test_offline_uses_only_cache(tmp_path):
+    cache = MetadataCache(str(tmp_path))
+    async with PypiPackageInfoDownloader(cache=cache, offline=True) as downloader:
+        info = await downloader.package_info(Requirement("package", "1.0.0"))
+
+    assert info.latest_version is None
+    assert downloader.stats.requests == 0
+    assert cache.stats.misses == 1
+
+
+async def test_remembers_missing_projects(tmp_path):
+    async def check(cache):
+        async with PypiPackageInfoDownloader(cache=cache, use_changelog=False) as downloader:
+            return await downloader.package_info(Requirement("Missing_Package", "1.0.0"))
+
+    async with PypiStandIn() as stand_in:
+        with stand_in.patch():
+            await check(MetadataCache(str(tmp_path)))
+            cache = MetadataCache(str(tmp_path))
+            info = await check(cache)
+            assert stand_in.requests == {"missing-package": 1}
+            await check(MetadataCache(str(tmp_path), resolution_ttl=0))
+
+    assert info.latest_version is None
+    assert cache.stats.resolved == 1
+    assert stand_in.requests == {"missing-package": 2}
+
+
+async def test_remembers_moved_projects(tmp_path):
+    cache = MetadataCache(str(tmp_path), ttl=0)
+
+    async def check():
+        async with PypiPackageInfoDownloader(cache=cache, use_changelog=False) as downloader:
+            return await downloader.package_info(Requirement("old-name", "1.0.0"))
+
+    async with PypiStandIn() as stand_in:
+        stand_in.moved["old-name"] = "new-name"
+        with stand_in.patch():
+            await check()
+            info = await check()
+
+    # the second run goes straight to the new name, and revalidates what's cached for it
+    assert stand_in.requests == {"old-name": 1, "new-name": 2}
+    assert stand_in.responses == {200: 1, 301: 1, 304: 1}
+    assert str(info.latest_version) == "1.2.9"
+
+
+async def test_retries_throttled_requests(monkeypatch):
+    requested: List[str] = []
+    async with TestServer(project_app(requested, throttled=1)) as server:
+        monkeypatch.setattr(
+            PypiPackageInfoDownloader, "PYPI_BASE_URL", str(server.make_url("/pypi"))
+        )
+        async with PypiPackageInfoDownloader() as downloader:
+            info = await downloader.package_info(Requirement("package", "1.0.0"))
+
+    assert requested == ["package", "package"]
+    assert str(info.latest_version) == "1.1.0"
+    assert downloader.scheduler.stats.retries == {"status_429": 1}
+
+
+async def test_uses_simple_api(monkeypatch):
+    async def simple(request: web.Request) -> web.Response:
+        assert request.headers["Accept"] == "application/vnd.pypi.simple.v1+json"
+        return web.json_response(
+            {
+                "name": request.match_info["package"],
+                "versions": ["1.0.0", "1.1.0"],
+                "files": [
+                    {"filename": "package-1.0.0.tar.gz", "upload-time": "2018-01-01T00:00:00Z"},
+                    {"filename": "package-1.1.0.tar.gz", "upload-time": "2018-02-01T00:00:00Z"},
+                ],
+            },
+            content_type="application/vnd.pypi.simple.v1+json",
+        )
+
+    app = web.Application()
+    app.router.add_get("/simple/{package}/", simple)
+
+    async with TestServer(app) as server:
+        monkeypatch.setattr(
+            PypiPackageInfoDownloader, "SIMPLE_BASE_URL", str(server.make_url("/simple"))
+        )
+        async with PypiPackageInfoDownloader(api="simple") as downloader:
+            info = await downloader.package_info(Requirement("package", "1.0.0"))
+
+    assert str(info.latest_version) == "1.1.0"
+    assert info.current_release_date == date(2018, 1, 1)
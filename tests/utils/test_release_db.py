@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+import pytest
+import tempfile
+import unittest
+
+from piprot.models import ReleaseIndex, Requirement
+from piprot.testing import project_document
+from piprot.utils.pypi import PypiPackageInfoDownloader
+from piprot.utils.release_db import DatabaseBackend, ReleaseDatabase
+
+
+DUMP = [
+    json.dumps(project_document("Django", releases=3)),
+    json.dumps(ReleaseIndex("Flask_Login", "0.4.1", {"0.4.0": 736000, "0.4.1": 736100}).to_dict()),
+    "{not json",
+    "",
+]
+
+
+class ReleaseDatabaseTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = ReleaseDatabase(os.path.join(self.directory.name, "releases.sqlite3"))
+        with self.assertLogs("piprot.utils.release_db", "WARNING"):
+            self.imported = self.database.import_lines(DUMP)
+
+    def tearDown(self):
+        self.database.close()
+        self.directory.cleanup()
+
+    def test_imports_valid_records(self):
+        self.assertEqual(self.imported, 2)
+        self.assertEqual(len(self.database), 2)
+
+    def test_lookups_are_normalized(self):
+        index = self.database.get("flask-login")
+        self.assertEqual(index.name, "Flask_Login")
+        self.assertEqual(str(index.latest_version()), "0.4.1")
+        self.assertEqual(sorted(self.database.get("DJANGO").releases), ["1.0.0", "1.0.1", "1.0.2"])
+
+    def test_get_many_leaves_out_missing_projects(self):
+        indexes = self.database.get_many(["django", "flask.login", "missing"])
+        self.assertEqual(sorted(indexes), ["django", "flask-login"])
+
+    def test_reimport_replaces_projects(self):
+        self.database.import_lines([json.dumps(project_document("django", releases=5))])
+        self.assertEqual(len(self.database), 2)
+        self.assertEqual(len(self.database.get("django").releases), 5)
+
+    def test_skips_records_without_a_name(self):
+        lines = [
+            json.dumps(project_document("requests", releases=2)),
+            json.dumps({"info": {}, "releases": {}}),
+            json.dumps(project_document("flask", releases=2)),
+        ]
+        with self.assertLogs("piprot.utils.release_db", "WARNING"):
+            self.assertEqual(self.database.import_lines(lines), 2)
+        self.assertEqual(len(self.database), 4)
+        indexes = self.database.get_many(["requests", "flask"])
+        self.assertEqual(sorted(indexes), ["flask", "requests"])
+
+
+@pytest.mark.asyncio
+async def test_downloader_resolves_from_database(tmp_path):
+    database = ReleaseDatabase(str(tmp_path / "releases.sqlite3"))
+    database.import_lines(DUMP[:2])
+    backend = DatabaseBackend(database)
+
+    async with PypiPackageInfoDownloader(backend=backend) as downloader:
+        infos = await asyncio.gather(
+            downloader.package_info(Requirement("django", "1.0.0")),
+            downloader.package_info(Requirement("flask-login", "0.4.1")),
+            downloader.package_info(Requirement("missing", "1.0")),
+        )
+        # nothing went over HTTP, so no session was even created
+        assert downloader._session is None
+
+    assert [str(info.latest_version) for info in infos] == ["1.0.2", "0.4.1", "None"]
+    assert backend.queries == 1
+    database.close()
@@ -1,7 +1,7 @@
 import unittest
 
 from piprot.models import Requirement
-from piprot.utils.requirements_parser import RequirementsParser
+from piprot.utils.requirements_parser import RequirementsGraph, RequirementsParser
 
 
 class ParseRequirementsFileTest(unittest.TestCase):
@@ -29,3 +29,38 @@ class ParseRequirementsFileTest(unittest.TestCase):
         ).parse()
 
         self.assertListEqual(actual_requirements, expected_requirements)
+
+    def test_parses_continuation_lines_and_hashes(self):
+        expected_requirements = [
+            Requirement("aiohttp", "3.4.4", False),
+            Requirement("async-timeout", "3.0.1", False),
+            Requirement("multidict", "4.4.2", True),
+        ]
+
+        actual_requirements = RequirementsParser(
+            "tests/utils/fixtures/requirements-locked.txt"
+        ).parse()
+
+        self.assertListEqual(actual_requirements, expected_requirements)
+        self.assertListEqual([r.line_number for r in actual_requirements], [4, 8, 1])
+
+    def test_follows_nested_includes_once(self):
+        expected_requirements = [
+            Requirement("shared", "1.0.0", False),
+            Requirement("left", "1.0.0", False),
+            Requirement("right", "1.0.0", False),
+            Requirement("top", "1.0.0", False),
+        ]
+
+        actual_requirements = RequirementsParser(
+            "tests/utils/fixtures/requirements-diamond.txt"
+        ).parse()
+
+        self.assertListEqual(actual_requirements, expected_requirements)
+
+    def test_reads_each_file_once(self):
+        graph = RequirementsGraph()
+        for filename in ["requirements-diamond.txt", "requirements-diamond-left.txt"]:
+            RequirementsParser(f"tests/utils/fixtures/{filename}", graph).parse()
+
+        self.assertEqual(graph.reads, 4)
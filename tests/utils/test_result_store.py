@@ -0,0 +1,53 @@
+import os
+import tempfile
+import time
+import unittest
+
+from datetime import date
+from piprot.models import PackageInfo, PiprotVersion, Requirement
+from piprot.utils.result_store import ResultStore, result_key
+
+
+class ResultStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results.sqlite3")
+        self.store = ResultStore(self.path, ttl=60)
+        self.package_info = PackageInfo(
+            "Django", PiprotVersion("2.0.1"), date(2018, 2, 1), PiprotVersion("2.0"), None
+        )
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_key_is_normalized(self):
+        self.assertEqual(
+            result_key(Requirement("Django", "2.0"), 5), result_key(Requirement("django", "2.0"), 5)
+        )
+        self.assertNotEqual(
+            result_key(Requirement("django", "2.0"), 5), result_key(Requirement("django", "2.0"), 7)
+        )
+        self.assertNotEqual(
+            result_key(Requirement("django", "2.0"), 5),
+            result_key(Requirement("django", "2.0", ignore=True), 5),
+        )
+
+    def test_round_trip(self):
+        self.store.set(Requirement("django", "2.0"), 5, self.package_info)
+        stored = self.store.get(Requirement("Django", "2.0"), 5)
+        self.assertEqual(stored.package_info, self.package_info)
+        self.assertTrue(stored.is_fresh(self.store.ttl))
+        self.assertIsNone(self.store.get(Requirement("django", "2.0.1"), 5))
+
+    def test_persists_across_runs(self):
+        self.store.set(Requirement("django", "2.0"), 5, self.package_info)
+        self.store.flush()
+
+        store = ResultStore(self.path)
+        try:
+            stored = store.get(Requirement("django", "2.0"), 5)
+        finally:
+            store.close()
+        self.assertEqual(stored.package_info, self.package_info)
+        self.assertLess(time.time() - stored.stored_at, 60)
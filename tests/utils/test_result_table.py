@@ -0,0 +1,93 @@
+import io
+import unittest
+
+from datetime import date
+from piprot.models import CheckResult, PackageInfo, PiprotVersion, Requirement, Status
+from piprot.utils.result_table import ResultTable
+from piprot.utils.writers import CsvWriter, JsonLinesWriter, SummaryWriter
+
+
+def results():
+    rotten = CheckResult(
+        Requirement("test", "1.0.0", source="service/requirements.txt", line_number=3),
+        PackageInfo(
+            name="test",
+            latest_version=PiprotVersion("2.0.0"),
+            latest_release_date=date(2018, 6, 1),
+            current_version=PiprotVersion("1.0.0"),
+            current_release_date=date(2018, 7, 1),
+            releases_behind=4,
+            first_newer_release_date=date(2018, 2, 1),
+        ),
+        Status.ROTTEN,
+        "test is rotten",
+        -30,
+    )
+    cannot_fetch = CheckResult(
+        Requirement("missing", "0.1"),
+        PackageInfo("missing", None, None, None, None),
+        Status.CANNOT_FETCH,
+        "missing can't be fetched",
+    )
+    return [rotten, cannot_fetch, rotten]
+
+
+class ResultTableTest(unittest.TestCase):
+    def test_round_trips_results(self):
+        table = ResultTable(results())
+        self.assertEqual(len(table), 3)
+        self.assertEqual(list(table), results())
+        self.assertEqual(table[1].requirement.source, "")
+        self.assertEqual(table.outdated, 2)
+
+    def test_packs_wire_dicts_like_results(self):
+        table = ResultTable()
+        for result in results():
+            table.add_dict(result.to_dict())
+        self.assertEqual(list(table), results())
+        self.assertEqual(list(table.records()), [result.as_record() for result in results()])
+
+    def test_invalid_wire_dicts_leave_columns_aligned(self):
+        table = ResultTable(results())
+        invalid = dict(results()[0].to_dict(), status="unknown")
+        with self.assertRaises(ValueError):
+            table.add_dict(invalid)
+        self.assertEqual({len(column) for column in table._columns()}, {3})
+
+    def test_truncates_to_first_outdated(self):
+        table = ResultTable(results()[1:])
+        self.assertEqual(table.first_outdated(), 1)
+        table.truncate(table.first_outdated() + 1)
+        self.assertEqual(list(table), results()[1:])
+        table.truncate(1)
+        self.assertEqual(list(table), results()[1:2])
+        self.assertIsNone(table.first_outdated())
+
+    def test_interns_strings(self):
+        table = ResultTable(results())
+        self.assertEqual(table.package[0], table.package[2])
+        self.assertEqual(table.message[0], table.message[2])
+
+    def test_records_match_results(self):
+        table = ResultTable(results())
+        self.assertEqual(list(table.records()), [result.as_record() for result in results()])
+
+    def test_writers_write_tables_like_results(self):
+        for writer_class in (JsonLinesWriter, CsvWriter):
+            with self.subTest(writer=writer_class.__name__):
+                table_stream, results_stream = io.StringIO(), io.StringIO()
+                writer_class(table_stream).write_table(ResultTable(results()))
+                writer = writer_class(results_stream)
+                for result in results():
+                    writer.write(result)
+                self.assertEqual(table_stream.getvalue(), results_stream.getvalue())
+
+    def test_summarizes_tables(self):
+        writer = SummaryWriter(JsonLinesWriter(io.StringIO()))
+        writer.write_table(ResultTable(results()))
+        with self.assertLogs("piprot.utils.writers", level="INFO") as logs:
+            writer.close()
+        self.assertEqual(
+            logs.records[-1].getMessage(),
+            "Checked 2 files, 2 distinct packages: 3 requirements (2 rotten, 1 cannot fetch)",
+        )
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from piprot.models import Requirement
+from piprot.utils.scanner import DEFAULT_EXCLUDE, RequirementsScanner
+from unittest import mock
+
+
+class RequirementsScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.files = {
+            "service-a/requirements.txt": "first==1.0.0\n",
+            "service-a/requirements/dev.txt": "second==2.0.0\n",
+            "service-b/requirements-prod.txt": "first==1.1.0\n",
+            "service-b/setup.py": "",
+            "service-b/.venv/requirements.txt": "vendored==0.1.0\n",
+            "legacy/requirements.txt": "old==0.0.1\n",
+        }
+        for path, content in self.files.items():
+            full_path = os.path.join(self.directory.name, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w") as file:
+                file.write(content)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def relative(self, paths):
+        return sorted(os.path.relpath(path, self.directory.name) for path in paths)
+
+    def test_finds_requirements_files(self):
+        scanner = RequirementsScanner(self.directory.name)
+        self.assertListEqual(
+            self.relative(scanner.find_files()),
+            [
+                "legacy/requirements.txt",
+                "service-a/requirements.txt",
+                "service-a/requirements/dev.txt",
+                "service-b/requirements-prod.txt",
+            ],
+        )
+
+    def test_applies_include_and_exclude_patterns(self):
+        scanner = RequirementsScanner(
+            self.directory.name, include=["requirements*.txt"], exclude=[*DEFAULT_EXCLUDE, "legacy"]
+        )
+        self.assertListEqual(
+            self.relative(scanner.find_files()),
+            ["service-a/requirements.txt", "service-b/requirements-prod.txt"],
+        )
+
+    def test_parses_all_files(self):
+        scanner = RequirementsScanner(self.directory.name, workers=2)
+        parsed = dict(scanner.parse())
+        self.assertEqual(len(parsed), 4)
+        self.assertListEqual(
+            sorted(scanner.requirements(), key=lambda requirement: requirement.package),
+            [
+                Requirement("first", "1.0.0"),
+                Requirement("first", "1.1.0"),
+                Requirement("old", "0.0.1"),
+                Requirement("second", "2.0.0"),
+            ],
+        )
+
+    def test_parses_each_line_once(self):
+        scanner = RequirementsScanner(self.directory.name, workers=2)
+        from_line = Requirement.from_line
+        with mock.patch.object(Requirement, "from_line", side_effect=from_line) as parse:
+            requirements = list(scanner.requirements())
+        self.assertEqual(parse.call_count, len(requirements))
+        self.assertEqual(scanner.graph.reads, 4)
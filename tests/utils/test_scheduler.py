@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+
+from piprot.utils.scheduler import FetchError, FetchScheduler, TokenBucket, parse_retry_after
+
+
+def failing(failures: int, reason: str = "status_503", retry_after=None):
+    attempts = []
+
+    async def fetch() -> int:
+        attempts.append(reason)
+        if len(attempts) <= failures:
+            raise FetchError(reason, retry_after=retry_after)
+        return len(attempts)
+
+    return fetch
+
+
+@pytest.mark.asyncio
+async def test_retries_until_success():
+    scheduler = FetchScheduler(backoff_base=0.001)
+    assert await scheduler.run(failing(2)) == 3
+    assert scheduler.stats.retries == {"status_503": 2}
+    assert not scheduler.stats.failures
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries():
+    scheduler = FetchScheduler(max_retries=1, backoff_base=0.001)
+    with pytest.raises(FetchError):
+        await scheduler.run(failing(5, "timeout"))
+    assert scheduler.stats.retries == {"timeout": 1}
+    assert scheduler.stats.failures == {"timeout": 1}
+
+
+@pytest.mark.asyncio
+async def test_honors_retry_after():
+    scheduler = FetchScheduler(backoff_base=0.001)
+    loop = asyncio.get_event_loop()
+    started = loop.time()
+    await scheduler.run(failing(1, "status_429", retry_after=0.1))
+    assert loop.time() - started >= 0.1
+
+
+@pytest.mark.asyncio
+async def test_times_out_single_request():
+    async def slow() -> None:
+        await asyncio.sleep(1)
+
+    scheduler = FetchScheduler(request_timeout=0.01, max_retries=0)
+    with pytest.raises(FetchError):
+        await scheduler.run(slow)
+    assert scheduler.stats.failures == {"timeout": 1}
+
+
+@pytest.mark.asyncio
+async def test_caps_concurrency():
+    in_flight = []
+    peak = []
+
+    async def fetch() -> None:
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+
+    scheduler = FetchScheduler(concurrency=3)
+    await asyncio.gather(*[scheduler.run(fetch) for _ in range(10)])
+    assert max(peak) == 3
+
+
+@pytest.mark.asyncio
+async def test_every_run_gets_its_own_total_timeout():
+    async def fetch() -> int:
+        await asyncio.sleep(0.01)
+        return 1
+
+    scheduler = FetchScheduler(total_timeout=0.1)
+    async with scheduler:
+        assert await scheduler.run(fetch) == 1
+    await asyncio.sleep(0.15)
+    async with scheduler:
+        assert await scheduler.run(fetch) == 1
+    assert not scheduler.stats.failures
+
+
+def test_reused_on_another_event_loop():
+    async def fetch() -> int:
+        await asyncio.sleep(0.01)
+        return 1
+
+    async def check() -> list:
+        return await asyncio.gather(*[scheduler.run(fetch) for _ in range(3)])
+
+    scheduler = FetchScheduler(concurrency=1)
+    assert asyncio.run(check()) == [1, 1, 1]
+    assert asyncio.run(check()) == [1, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=100, burst=1)
+    loop = asyncio.get_event_loop()
+    started = loop.time()
+    for _ in range(6):
+        await bucket.acquire()
+    assert loop.time() - started >= 0.05
+
+
+def test_parses_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
@@ -0,0 +1,66 @@
+import json
+import pytest
+
+from piprot.piprot import Piprot
+from piprot.testing import PypiStandIn
+from piprot.utils.pypi import PypiPackageInfoDownloader
+from piprot.utils.tracing import Profiler, percentile
+
+
+def test_percentile():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 0.5) == 2.0
+    assert percentile(values, 0.99) == 4.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_timed_iter_counts_only_producer_time():
+    profiler = Profiler()
+    items = list(profiler.timed_iter("parse", "requirements.txt", range(3)))
+
+    assert items == [0, 1, 2]
+    [span] = profiler.spans
+    assert (span.phase, span.label) == ("parse", "requirements.txt")
+    # parsing isn't attributed to any package
+    assert not profiler.packages
+
+
+def test_chrome_trace():
+    profiler = Profiler()
+    with profiler.timer("decode", "django"):
+        pass
+    with profiler.timer("decode", "flask"):
+        pass
+
+    events = profiler.chrome_trace()["traceEvents"]
+    spans = [event for event in events if event["ph"] == "X"]
+    assert [(span["name"], span["tid"]) for span in spans] == [("decode", 0), ("decode", 1)]
+    lanes = {event["args"]["name"] for event in events if event["ph"] == "M"}
+    assert lanes == {"django", "flask"}
+
+
+@pytest.mark.asyncio
+async def test_profiled_run(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text("first==1.0.0\nSecond==1.2.9\n")
+
+    profiler = Profiler()
+    async with PypiStandIn() as stand_in:
+        with stand_in.patch():
+            pypi = PypiPackageInfoDownloader(profiler=profiler)
+            results = [result async for result in Piprot([str(path)], pypi=pypi).results()]
+
+    assert len(results) == 2
+    assert set(profiler.packages) == {"first", "second"}
+    for timing in profiler.packages.values():
+        assert {"connect", "ttfb", "download", "decode", "compare"} <= set(timing.phases)
+    assert profiler.packages["first"].bytes_received == len(stand_in.document("first"))
+    assert profiler.packages["second"].bytes_received == len(stand_in.document("Second"))
+
+    summary = profiler.summary()
+    assert any(line.startswith("parse") for line in summary)
+    assert any(line.strip().startswith("first") for line in summary)
+
+    trace_file = tmp_path / "trace.json"
+    profiler.dump_chrome_trace(str(trace_file))
+    assert json.loads(trace_file.read_text())["traceEvents"]
@@ -0,0 +1,27 @@
+import unittest
+
+from datetime import date
+from piprot.models import PackageInfo, PiprotVersion
+from piprot.utils.workers import compact, expand, shard
+
+
+class WorkersTest(unittest.TestCase):
+    def test_shards_keep_versions_of_a_project_together(self):
+        keys = [("b", "1.0"), ("a", "1.0"), ("c", "2.0"), ("a", "2.0"), ("a", "1.0")]
+        self.assertListEqual(
+            shard(keys, 2), [[("a", "1.0"), ("a", "2.0"), ("c", "2.0")], [("b", "1.0")]]
+        )
+        self.assertListEqual(shard(keys[:1], 4), [[("b", "1.0")]])
+
+    def test_compact_round_trip(self):
+        package_info = PackageInfo(
+            name="Test",
+            latest_version=PiprotVersion("2.0.0"),
+            latest_release_date=date(2018, 6, 1),
+            current_version=PiprotVersion("1.0.0"),
+            current_release_date=None,
+            releases_behind=3,
+            first_newer_release_date=date(2018, 2, 1),
+        )
+        self.assertEqual(expand("Test", compact(package_info)), package_info)
+        self.assertEqual(expand("Test", None), PackageInfo("Test", None, None, None, None))
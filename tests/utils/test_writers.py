@@ -0,0 +1,86 @@
+import io
+import json
+import unittest
+
+from datetime import date
+from piprot.models import CheckResult, PackageInfo, PiprotVersion, Requirement, Status
+from piprot.utils.writers import CsvWriter, JsonLinesWriter, SummaryWriter
+
+
+def rotten_result() -> CheckResult:
+    requirement = Requirement("test", "1.0.0", source="requirements.txt", line_number=3)
+    package = PackageInfo(
+        name="test",
+        latest_version=PiprotVersion("2.0.0"),
+        latest_release_date=date(2018, 6, 1),
+        current_version=PiprotVersion("1.0.0"),
+        current_release_date=date(2018, 1, 1),
+        releases_behind=4,
+        first_newer_release_date=date(2018, 2, 1),
+    )
+    return CheckResult(requirement, package, Status.ROTTEN, "test is rotten", 151)
+
+
+class JsonLinesWriterTest(unittest.TestCase):
+    def test_writes_one_record_per_line(self):
+        stream = io.StringIO()
+        writer = JsonLinesWriter(stream)
+        writer.write(rotten_result())
+        writer.write(rotten_result())
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(
+            json.loads(lines[0]),
+            {
+                "package": "test",
+                "status": "rotten",
+                "current_version": "1.0.0",
+                "current_release_date": "2018-01-01",
+                "latest_version": "2.0.0",
+                "latest_release_date": "2018-06-01",
+                "rotten_days": 151,
+                "releases_behind": 4,
+                "libyears": 0.41,
+                "first_newer_release_date": "2018-02-01",
+                "source": "requirements.txt",
+                "line": 3,
+            },
+        )
+
+
+class CsvWriterTest(unittest.TestCase):
+    def test_writes_header_once(self):
+        stream = io.StringIO()
+        writer = CsvWriter(stream)
+        writer.write(rotten_result())
+        writer.write(rotten_result())
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0], ",".join(CheckResult.FIELDS))
+        self.assertEqual(
+            lines[1],
+            "test,rotten,1.0.0,2018-01-01,2.0.0,2018-06-01,151,4,0.41,2018-02-01,"
+            "requirements.txt,3",
+        )
+
+
+class SummaryWriterTest(unittest.TestCase):
+    def test_summarizes_per_file(self):
+        stream = io.StringIO()
+        writer = SummaryWriter(JsonLinesWriter(stream))
+        writer.write(rotten_result())
+        writer.write(rotten_result())
+
+        with self.assertLogs("piprot.utils.writers", level="INFO") as logs:
+            writer.close()
+
+        self.assertEqual(len(stream.getvalue().splitlines()), 2)
+        self.assertListEqual(
+            [record.getMessage() for record in logs.records],
+            [
+                "requirements.txt: 2 requirements (2 rotten)",
+                "Checked 1 files, 1 distinct packages: 2 requirements (2 rotten)",
+            ],
+        )